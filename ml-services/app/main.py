@@ -1,7 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from app.routes import chatbot
 from app.routes.report_processor import router as report_router
 from app.routes.food_recognition import router as food_router
+from app.services.executors import shutdown_executors
+from app.services import deadline
 import os
 from dotenv import load_dotenv
 
@@ -15,6 +17,19 @@ app.include_router(chatbot.router)
 app.include_router(report_router)
 app.include_router(food_router)
 
+# Stop the worker pools that route handlers offload blocking work to
+app.add_event_handler("shutdown", shutdown_executors)
+
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    # Every stage serving the request can check the time left (see services/deadline.py)
+    token = deadline.start(deadline.budget_seconds(request.headers.get(deadline.DEADLINE_HEADER)))
+    try:
+        return await call_next(request)
+    finally:
+        deadline.reset(token)
+
 
 @app.get("/")
 async def root():
@@ -7,6 +7,11 @@ from app.services.faiss_service import get_store
 from app.services.web_scraper import scrape_website_features
 from app.services.report_service import get_user_latest_report, extract_report_summary
 from app.services.context_aggregator import create_aggregator
+from app.services.retrieval_cache import cached_search, get_retrieval_cache
+from app.services.report_fact_cache import get_report_fact_cache
+from app.services.executors import executor_stats, run_cpu, run_io
+from app.services import deadline
+from app.services.deadline import DeadlineExceeded
 import os
 import logging
 
@@ -39,6 +44,11 @@ class ChatResponse(BaseModel):
     metadata: Optional[dict] = None
 
 
+def _response_metadata(aggregated_context: Dict[str, Any]) -> Dict[str, Any]:
+    # Aggregator metadata plus the stages the request deadline made us skip
+    return {**(aggregated_context.get('metadata') or {}), 'degraded': deadline.degraded()}
+
+
 @router.post("/query", response_model=ChatResponse)
 async def process_chat_query(chat_query: ChatQuery):
     """
@@ -57,11 +67,16 @@ async def process_chat_query(chat_query: ChatQuery):
     Returns:
         ChatResponse with AI-generated advice, sources, confidence, and diet plan
     """
-    import hashlib
-    
     if not chat_query.query or not chat_query.user_id:
         raise HTTPException(status_code=400, detail="Missing query or user_id")
-    
+    # Backend fetch, scraping, retrieval and the LLM call all block; keep them off the event loop
+    return await run_io(answer_chat_query, chat_query)
+
+
+def answer_chat_query(chat_query: ChatQuery) -> ChatResponse:
+    """Blocking body of `process_chat_query`, run on the I/O pool."""
+    import hashlib
+
     # Generate deterministic query ID
     key = (chat_query.query + chat_query.user_id).encode('utf-8')
     query_id = hashlib.md5(key).hexdigest()
@@ -78,8 +93,10 @@ async def process_chat_query(chat_query: ChatQuery):
         logger.warning(f"Failed to fetch user report: {e}")
     
     # ========== STEP 2: Scrape and extract website features ==========
+    # Scraping, knowledge-base retrieval and the LLM call are skipped when the request
+    # deadline is too close; the response then falls back to what is available
     website_features = None
-    if chat_query.website_url:
+    if chat_query.website_url and deadline.should_run('scrape'):
         try:
             logger.info(f"Scraping website: {chat_query.website_url}")
             website_features = scrape_website_features(chat_query.website_url, extract_features=True)
@@ -89,13 +106,13 @@ async def process_chat_query(chat_query: ChatQuery):
     
     # ========== STEP 3: Retrieve relevant documents from knowledge base ==========
     retrieved_docs = []
-    try:
-        store = get_store()
-        q_emb = embed_text(chat_query.query)
-        retrieved_docs = store.search(q_emb, k=4)
-        logger.info(f"Retrieved {len(retrieved_docs)} documents from knowledge base")
-    except Exception as e:
-        logger.warning(f"Failed to retrieve documents: {e}")
+    if deadline.should_run('retrieval'):
+        try:
+            store = get_store()
+            retrieved_docs = cached_search(store, chat_query.query, k=4, embed=embed_text)
+            logger.info(f"Retrieved {len(retrieved_docs)} documents from knowledge base")
+        except Exception as e:
+            logger.warning(f"Failed to retrieve documents: {e}")
     
     # ========== STEP 4: Aggregate all context ==========
     aggregator = create_aggregator()
@@ -127,6 +144,8 @@ async def process_chat_query(chat_query: ChatQuery):
     
     # ========== STEP 6: Call LLM or fallback ==========
     try:
+        if not deadline.should_run('llm'):
+            raise DeadlineExceeded('no time left for the LLM call')
         logger.info("Calling LLM for response generation")
         llm_response = call_gemini(prompt_ctx)
         
@@ -160,11 +179,13 @@ async def process_chat_query(chat_query: ChatQuery):
             diet_plan=diet_plan,
             used_api=used_api,
             model=model
-            ,metadata=aggregated_context.get('metadata')
+            ,metadata=_response_metadata(aggregated_context)
         )
     
     except Exception as e:
         logger.error(f"Error calling LLM: {e}")
+        if isinstance(e, DeadlineExceeded):
+            deadline.mark_degraded('llm')
         
         # Fallback: provide a safe generic response
         fallback_response = (
@@ -191,7 +212,7 @@ async def process_chat_query(chat_query: ChatQuery):
             diet_plan=[],
             used_api=False,
             model='fallback'
-            ,metadata=aggregated_context.get('metadata')
+            ,metadata=_response_metadata(aggregated_context)
         )
 
 
@@ -210,7 +231,10 @@ async def service_status():
         "status": "running",
         "model": "not_configured",
         "vector_db": "faiss",
-        "rag_enabled": bool(store.docs)
+        "rag_enabled": bool(store.docs),
+        "retrieval_cache": get_retrieval_cache().stats(),
+        "report_fact_cache": get_report_fact_cache().stats(),
+        "executors": executor_stats()
     }
 
 
@@ -227,10 +251,10 @@ async def ingest_user_doc(payload: dict):
         raise HTTPException(status_code=400, detail='Missing user_id or text')
     # Build small doc
     doc_id = f'user_{user_id}_processing_result'
-    vector = embed_text(text)
+    vector = await run_cpu(embed_text, text)
     store = get_store()
     try:
-        store.add(doc_id, text, { **metadata, 'user_id': user_id }, vector)
+        await run_io(store.add, doc_id, text, { **metadata, 'user_id': user_id }, vector)
         return { 'status': 'ok', 'id': doc_id }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -7,6 +7,8 @@ import numpy as np
 from PIL import Image
 import logging
 
+from app.services.executors import run_cpu
+
 router = APIRouter(prefix="/food", tags=["food-recognition"])
 logger = logging.getLogger(__name__)
 
@@ -144,6 +146,17 @@ def analyze_image_features(image_array: np.ndarray) -> dict:
     return food_scores
 
 
+def score_image(content: bytes) -> Optional[dict]:
+    """Decode an uploaded image and score it per food (None if it cannot be decoded)."""
+    nparr = np.frombuffer(content, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    # Convert BGR to RGB
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return analyze_image_features(img_rgb)
+
+
 @router.post("/recognize", response_model=FoodRecognitionResponse)
 async def recognize_food(image: UploadFile = File(...)):
     """
@@ -163,18 +176,12 @@ async def recognize_food(image: UploadFile = File(...)):
         
         # Read image
         content = await image.read()
-        nparr = np.frombuffer(content, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decoding and analysis are CPU-bound; run them off the event loop
+        food_scores = await run_cpu(score_image, content)
         
-        if img is None:
+        if food_scores is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Convert BGR to RGB
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Analyze image features
-        food_scores = analyze_image_features(img_rgb)
-        
         # Find top matches
         sorted_foods = sorted(food_scores.items(), key=lambda x: x[1], reverse=True)
         top_food_key = sorted_foods[0][0]
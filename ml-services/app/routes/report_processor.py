@@ -1,19 +1,28 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Tuple
 import logging
-from app.services.ocr_service import extract_text
-from app.services.fact_parser import extract_facts_and_evidence
-from app.services.chunker import chunk_text
+import os
+from app.services.ocr_service import extract_document
+from app.services.fact_parser import extract_facts_and_spans
+from app.services.chunker import chunk_text, chunk_report
 from app.services.vector_db import Indexer
-from app.services.retriever import retrieve_candidates
+from app.services.retriever import retrieve_candidates, build_fact_query
 from app.services.reranker import rerank_candidates
+from app.services import cross_encoder
 from app.services.prompt_builder import build_prompt, REQUIRED_FIELDS
 from app.services.gemini_api import call_gemini
 from app.services.verifier import verify_output
 from app.services.scorer import score_output
 from app.services.formatter import format_output
-from app.services.meal_recommender import generate_diet_plan_from_report
+from app.services.meal_recommender import generate_diet_plan_from_report, extract_conditions_from_report
+from app.services.analytes import unit_for
+from app.services.report_jobs import ReportJobQueue, callback_allowed, request_key
+from app.services.pipeline_dag import Halt, Stage, run_dag
+from app.services.report_result_cache import get_report_result_cache, report_result_key
+from app.services.executors import run_io
+from app.services import deadline
+from app.services.deadline import DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="", tags=["report-processor"]) 
@@ -44,129 +53,294 @@ class ProcessReportResponse(BaseModel):
     lab_values: List[Dict[str, Any]] = []  # Optional lab values for display
 
 
-@router.post("/process-report", response_model=ProcessReportResponse)
-async def process_report(request: ProcessReportRequest):
-    try:
-        # 1. OCR -> raw text
-        raw_text = extract_text(request.filePath)
+class ProcessReportJobRequest(ProcessReportRequest):
+    callbackUrl: Optional[str] = None  # POSTed the final job status when the job finishes
+
+
+def _lab_values(facts: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert extracted facts to a formatted table for display."""
+    lab_values = []
+    for field, value in facts.items():
+        # Format field name from snake_case to readable format
+        readable_name = field.replace('_', ' ').title()
+        lab_values.append({
+            'parameter': readable_name,
+            'value': value,
+            'unit': unit_for(field),
+            'field': field
+        })
+    return lab_values
+
+
+def run_report_pipeline(request: ProcessReportRequest, progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Run the full report pipeline; `progress(stage)` is called as each stage starts.
+
+    A document already processed with the same pipeline signature (prompt template, model,
+    extraction settings) is answered from the result cache without running any stage.
+    """
+    cache = get_report_result_cache()
+    key = None
+    if cache.enabled:
+        try:
+            key = report_result_key(request.filePath)
+        except OSError:
+            logger.debug('Result cache: could not hash %s', request.filePath, exc_info=True)
+    if key:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info('[Pipeline] Returning cached response for %s', request.filePath)
+            cached['metadata'] = {**(cached.get('metadata') or {}), 'cached': True}
+            return cached
+    response, cacheable = _run_pipeline_dag(request, progress)
+    if key and cacheable:
+        cache.put(key, response)
+    return response
+
+
+# Model output used when the LLM stage is skipped for lack of time
+_NO_LLM_OUTPUT = {'text': '', 'summary': '', 'diet_plan': [], 'used_api': False, 'model': 'fallback'}
+
+
+def _run_pipeline_dag(request: ProcessReportRequest, progress: Optional[Callable[[str], None]] = None
+                      ) -> Tuple[Dict[str, Any], bool]:
+    """Run the pipeline stages; returns (response, cacheable).
+
+    The pipeline is a dependency graph (see `pipeline_dag`): chunking/indexing run alongside
+    fact extraction, and the lab-value diet plan is prepared while the LLM call is in flight.
+    Per-stage timings are returned in `metadata.timings_ms`. When the request deadline runs
+    short, embedding retrieval, the cross-encoder and the LLM call are skipped (the formatter
+    then builds the summary from the facts) and listed in `metadata.degraded`. Only complete
+    responses from a real LLM call are cacheable.
+    """
+    # 'layout' keeps lab-table rows together with their header; 'flat' is the plain splitter
+    layout = os.getenv('CHUNK_MODE', 'layout') != 'flat'
+
+    # 1. OCR -> raw text
+    def ocr():
+        # Text and tables come from a single parse of the PDF
+        raw_text, tables = extract_document(request.filePath, with_tables=layout)
         # Add debug length and snippet for diagnostic metadata
         logger.debug('OCR extracted length=%s from %s', len(raw_text), request.filePath)
         logger.info('[OCR] Extracted text (first 500 chars): %s', raw_text[:500] if raw_text else 'empty')
+        return raw_text, tables
 
-        # 2. Chunk text and extract facts/evidence
-        chunks = chunk_text(raw_text)
-        facts, evidence = extract_facts_and_evidence(raw_text)
-        logger.info('[Facts] Extracted facts: %s', list(facts.keys()))
-        logger.info('[Evidence] Found %d evidence snippets', len(evidence))
+    # 2. Chunk text and extract facts/evidence
+    def chunking(ocr):
+        raw_text, tables = ocr
+        return chunk_report(raw_text, tables=tables) if layout else chunk_text(raw_text)
 
+    def facts(ocr):
+        raw_text = ocr[0]
+        facts, evidence_spans = extract_facts_and_spans(raw_text)
+        logger.info('[Facts] Extracted facts: %s', list(facts.keys()))
+        logger.info('[Evidence] Found %d evidence spans', len(evidence_spans))
         # Check for missing required fields - but don't fail completely, still process what we have
         missing = [f for f in REQUIRED_FIELDS if f not in facts]
         if not facts:  # Only fail if NO facts were extracted at all
-            return {
+            return Halt({
                 'summary': 'Could not extract medical data from report. Please ensure the report contains lab values (glucose, cholesterol, blood pressure, etc.).',
                 'diet_plan': [],
                 'sources': [],
                 'lab_values': [],
                 'confidence': 0.0,
                 'metadata': {'missing_fields': missing, 'debug': {'raw_text_len': len(raw_text), 'sample': raw_text[:400] if raw_text else 'empty'}}
-            }
+            })
+        return facts, evidence_spans
 
-        # 3. Index & retrieve
+    # 3. Index & retrieve
+    def indexing(chunking):
+        # Embedding the chunks is optional: without an index retrieval ranks by TF-IDF alone
+        if not deadline.should_run('retrieval'):
+            return None
         indexer = Indexer()
-        indexer.index_chunks(chunks)
-        candidates = retrieve_candidates(indexer, chunks, facts)
+        indexer.index_chunks(chunking)
+        return indexer
 
-        # 4. Rerank
-        reranked = rerank_candidates(candidates, facts)
+    def retrieval(indexing, chunking, facts):
+        return retrieve_candidates(indexing, chunking, facts[0])
 
-        # 5. Build prompt with FACTS and evidence snippets (only pass verified evidence snippets)
-        # Pick top K evidence by whether their text appears in reranked snippets
-        top_ids = {c['id'] for c in reranked[:12]}
-        top_evidence = [e for e in evidence if any(e['text'] in c['snippet'] or c['id'] == e.get('id') for c in reranked)]
-        
-        # Allow processing even with partial data - don't fail if some fields are missing
-        prompt = build_prompt(facts, top_evidence)
+    # 4. Rerank (lexical boosts, then the optional cross-encoder stage within its latency budget),
+    # then keep the evidence spans overlapping the reranked chunks (both are offsets into
+    # raw_text) and serialize them once for the prompt, verification and response sources
+    def rerank(retrieval, facts):
+        facts, evidence_spans = facts
+        reranked = rerank_candidates(retrieval, facts)
+        if cross_encoder.is_enabled() and deadline.should_run('rerank'):
+            reranked, ce_applied = cross_encoder.cross_encoder_rerank(build_fact_query(facts), reranked)
+            if ce_applied:
+                # Higher precision at small k: only the best candidates feed the prompt
+                reranked = reranked[:cross_encoder.KEEP]
+        chunk_ranges = [(c['start'], c['end']) for c in reranked if c.get('start', -1) >= 0]
+        return evidence_spans.materialize(evidence_spans.overlapping(chunk_ranges))
 
-        # 6. Call Gemini (placeholder)
+    # 5. Build prompt with FACTS and evidence snippets (only pass verified evidence snippets)
+    # and 6. call Gemini. Partial data is allowed - don't fail if some fields are missing
+    def llm(rerank, facts):
+        # Out of time: an empty model output makes the formatter fall back to the facts
+        if not deadline.should_run('llm'):
+            return dict(_NO_LLM_OUTPUT)
+        prompt = build_prompt(facts[0], rerank)
         try:
             logger.debug('Calling Gemini with prompt keys: %s', list(prompt.keys()))
-            model_output = call_gemini(prompt)
+            return call_gemini(prompt)
+        except DeadlineExceeded as e:
+            logger.warning('Gemini call cut short by the request deadline: %s', e)
+            deadline.mark_degraded('llm')
+            return dict(_NO_LLM_OUTPUT)
         except Exception as gerr:
             # Log details and re-raise to be handled by the outer exception handler
             logger.exception('Gemini API call failed: %s', str(gerr))
             raise
 
-        # 7. Verify and score using the evidence passed into the prompt
-        verified, issues = verify_output(model_output, facts, top_evidence)
-        score = score_output(model_output, verified, issues)
-
+    # 7. Verify and score using the evidence passed into the prompt
+    def verify(llm, rerank, facts):
+        verified, issues = verify_output(llm, facts[0], rerank)
         # Log verification issues but don't fail - return the output anyway
         # (Users should see the AI summary even if it has minor verification issues)
         if issues:
             logger.warning('Verification issues detected (non-fatal): %s', issues)
+        return issues, score_output(llm, verified, issues)
 
-        # 8. Format output
-        formatted = format_output(model_output, top_evidence, facts)
-
-        # Return top evidence snippets as 'sources' in the response (format for API consumers)
-        sources = [
-            {'id': e.get('id', ''), 'text': e.get('text', ''), 'start': e.get('start', 0), 'end': e.get('end', 0)} for e in top_evidence
-        ]
-        
-        # Convert extracted facts to a formatted table for display
-        lab_values = []
-        for field, value in facts.items():
-            # Format field name from snake_case to readable format
-            readable_name = field.replace('_', ' ').title()
-            # Add appropriate units
-            units = {
-                'fasting_glucose': 'mg/dL',
-                'hba1c': '%',
-                'total_cholesterol': 'mg/dL',
-                'ldl': 'mg/dL',
-                'hdl': 'mg/dL',
-                'triglycerides': 'mg/dL',
-                'systolic_bp': 'mmHg',
-                'diastolic_bp': 'mmHg',
-                'bmi': 'kg/m²',
-                'hemoglobin': 'g/dL'
-            }
-            unit = units.get(field, '')
-            lab_values.append({
-                'parameter': readable_name,
-                'value': value,
-                'unit': unit,
-                'field': field
-            })
-        
-        # Generate personalized diet plan based on detected conditions
-        personalized_diet_plan = generate_diet_plan_from_report({
-            "summary": formatted['summary'],
-            "metadata": {"issues": issues, "extracted_fields": list(facts.keys())},
+    # 8. Format output
+    def formatting(llm, rerank, facts):
+        return format_output(llm, rerank, facts[0])
+
+    def lab_values(facts):
+        return _lab_values(facts[0])
+
+    # Diet plan from the lab values alone, prepared while the LLM call is in flight; it is
+    # final unless the summary mentions conditions the labs do not show
+    def lab_diet_plan(lab_values):
+        report = {"summary": "", "lab_values": lab_values}
+        return extract_conditions_from_report(report), generate_diet_plan_from_report(report)
+
+    # Generate personalized diet plan based on detected conditions
+    def diet_plan(format, verify, lab_values, lab_diet_plan, facts):
+        report = {
+            "summary": format['summary'],
+            "metadata": {"issues": verify[0], "extracted_fields": list(facts[0].keys())},
             "lab_values": lab_values
-        })
-        
-        return {
-            "summary": formatted['summary'],
-            "diagnosis": formatted.get('diagnosis', ''),
-            "patient_name": facts.get('patient_name', ''),
-            "diet_plan": formatted['diet_plan'],
-            "personalized_diet_plan": personalized_diet_plan,
-            "sources": sources,
-            "confidence": score,
-            "lab_values": lab_values,  # Add extracted lab values for table display
-            "metadata": {"issues": issues, "extracted_fields": list(facts.keys())}
         }
+        conditions, plan = lab_diet_plan
+        if extract_conditions_from_report(report) == conditions:
+            return plan
+        return generate_diet_plan_from_report(report)
+
+    run = run_dag([
+        Stage('ocr', ocr),
+        Stage('chunking', chunking, ('ocr',)),
+        Stage('facts', facts, ('ocr',)),
+        Stage('indexing', indexing, ('chunking',)),
+        Stage('retrieval', retrieval, ('indexing', 'chunking', 'facts')),
+        Stage('rerank', rerank, ('retrieval', 'facts')),
+        Stage('llm', llm, ('rerank', 'facts')),
+        Stage('verify', verify, ('llm', 'rerank', 'facts')),
+        Stage('format', formatting, ('llm', 'rerank', 'facts')),
+        Stage('lab_values', lab_values, ('facts',)),
+        Stage('lab_diet_plan', lab_diet_plan, ('lab_values',)),
+        Stage('diet_plan', diet_plan, ('format', 'verify', 'lab_values', 'lab_diet_plan', 'facts')),
+    ], on_start=progress)
+    logger.info('[Pipeline] Stage timings (ms): %s', run.timings_ms)
+    if run.halted is not None:
+        return run.halted.value, False
+
+    results = run.results
+    # Stages skipped or cut short by the request deadline
+    degraded = deadline.degraded()
+    extracted = results['facts'][0]
+    top_evidence = results['rerank']
+    formatted = results['format']
+    issues, score = results['verify']
+
+    # Return top evidence snippets as 'sources' in the response (format for API consumers)
+    sources = [
+        {'id': e.get('id', ''), 'text': e.get('text', ''), 'start': e.get('start', 0), 'end': e.get('end', 0)} for e in top_evidence
+    ]
+
+    return {
+        "summary": formatted['summary'],
+        "diagnosis": formatted.get('diagnosis', ''),
+        "patient_name": extracted.get('patient_name', ''),
+        "diet_plan": formatted['diet_plan'],
+        "personalized_diet_plan": results['diet_plan'],
+        "sources": sources,
+        "confidence": score,
+        "lab_values": results['lab_values'],  # Add extracted lab values for table display
+        "metadata": {"issues": issues, "extracted_fields": list(extracted.keys()), "timings_ms": run.timings_ms,
+                     "degraded": degraded}
+    }, bool(results['llm'].get('used_api')) and not degraded
+
+
+def _error_detail(e: Exception) -> Dict[str, Any]:
+    import traceback
+    error_msg = f"{type(e).__name__}: {str(e)}"
+    tb = traceback.format_exc()
+    # Log detailed stack trace server-side
+    logger.exception('Error processing report: %s', error_msg)
+    # In development include the stack trace in the response; avoid leaking stack in production
+    if os.environ.get('DEBUG') or os.environ.get('ENV') == 'development':
+        return {"error": error_msg, "type": type(e).__name__, "traceback": tb}
+    return {"error": error_msg, "type": type(e).__name__}
+
+
+@router.post("/process-report", response_model=ProcessReportResponse)
+async def process_report(request: ProcessReportRequest):
+    try:
+        return await run_io(run_report_pipeline, request)
     except HTTPException as e:
         raise e
     except Exception as e:
-        import traceback, os
-        error_msg = f"{type(e).__name__}: {str(e)}"
-        tb = traceback.format_exc()
-        # Log detailed stack trace server-side
-        logger.exception('Error processing report: %s', error_msg)
-        # In development include the stack trace in the response; avoid leaking stack in production
-        if os.environ.get('DEBUG') or os.environ.get('ENV') == 'development':
-            raise HTTPException(status_code=500, detail={"error": error_msg, "type": type(e).__name__, "traceback": tb})
-        else:
-            raise HTTPException(status_code=500, detail={"error": error_msg, "type": type(e).__name__})
+        raise HTTPException(status_code=500, detail=_error_detail(e))
+
+
+# --- Job-based variant: accept now, poll (or get a webhook) for the result -------------------
+
+_job_queue: Optional[ReportJobQueue] = None
+
+
+def _run_job(request: Dict[str, Any], progress: Callable[[str], None]) -> Dict[str, Any]:
+    return run_report_pipeline(ProcessReportRequest(**request), progress)
+
+
+def _submit_job(queue: ReportJobQueue, payload: Dict[str, Any], callback_url: Optional[str]) -> str:
+    # The request only names the file; key duplicates on its content (and the pipeline
+    # signature) so a new document uploaded to the same path is not answered from an old job
+    try:
+        key = request_key(payload) + ':' + report_result_key(payload['filePath'])
+    except OSError:
+        key = None
+    return queue.submit(payload, callback_url, key=key)
+
+
+def get_job_queue() -> ReportJobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = ReportJobQueue(_run_job)
+    return _job_queue
+
+
+def resume_report_jobs():
+    # Pick up jobs a previous process accepted but did not finish
+    get_job_queue().resume()
+
+
+router.add_event_handler("startup", resume_report_jobs)
+
+
+@router.post("/process-report/jobs", status_code=202)
+async def submit_report_job(request: ProcessReportJobRequest):
+    if request.callbackUrl and not callback_allowed(request.callbackUrl):
+        raise HTTPException(status_code=400, detail={"error": "callbackUrl must be an http(s) URL on an allowed host"})
+    payload = request.model_dump(exclude={'callbackUrl'})
+    queue = get_job_queue()
+    job_id = await run_io(_submit_job, queue, payload, request.callbackUrl)
+    job = await run_io(queue.get, job_id)
+    return {"jobId": job_id, "status": job['status'], "statusUrl": f"/process-report/jobs/{job_id}"}
+
+
+@router.get("/process-report/jobs/{job_id}")
+async def get_report_job(job_id: str):
+    job = await run_io(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"error": f"Unknown job {job_id}"})
+    return job
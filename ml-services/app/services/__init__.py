@@ -1,14 +1,29 @@
 # Package marker for services
-from .ocr_service import extract_text
-from .fact_parser import extract_facts_and_evidence
-from .chunker import chunk_text
-from .vector_db import Indexer
-from .retriever import retrieve_candidates
-from .reranker import rerank_candidates
-from .prompt_builder import build_prompt
-from .gemini_api import call_gemini
-from .verifier import verify_output
-from .scorer import score_output
-from .formatter import format_output
-
-__all__ = ['extract_text', 'extract_facts_and_evidence', 'chunk_text', 'Indexer', 'retrieve_candidates', 'rerank_candidates', 'build_prompt', 'call_gemini', 'verify_output', 'score_output', 'format_output']
+#
+# The names below are resolved on first access rather than imported here: importing any one
+# service (e.g. ocr_service in the OCR pool's spawned worker processes) would otherwise load
+# every service and its dependencies (sklearn, vector DB, Gemini client) as well.
+import importlib
+
+_EXPORTS = {
+    'extract_text': 'ocr_service',
+    'extract_facts_and_evidence': 'fact_parser',
+    'chunk_text': 'chunker',
+    'Indexer': 'vector_db',
+    'retrieve_candidates': 'retriever',
+    'rerank_candidates': 'reranker',
+    'build_prompt': 'prompt_builder',
+    'call_gemini': 'gemini_api',
+    'verify_output': 'verifier',
+    'score_output': 'scorer',
+    'format_output': 'formatter',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
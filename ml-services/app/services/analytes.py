@@ -0,0 +1,212 @@
+"""
+analytes: Single catalog of the lab analytes the services know about.
+
+Each analyte has its field name (as used in extracted facts), display label, canonical
+unit, aliases, unit conversion factors to the canonical unit and clinical cut-offs. The
+lookup tables derived from it - alias token trie, unit converters, threshold and condition
+tables - are built once at import, so callers resolve names, units and flags with
+dictionary lookups instead of re-deriving them per call.
+
+Cut-off levels: 'high' and 'elevated' are upper limits (value > cut-off), 'low' is a lower
+limit (value < cut-off).
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import re
+
+
+class Analyte(NamedTuple):
+    field: str
+    label: str
+    unit: str
+    aliases: Tuple[str, ...]
+    # unit (lower-case) -> factor converting a value in that unit to `unit`
+    conversions: Dict[str, float]
+    # level -> cut-off in `unit`
+    thresholds: Dict[str, float]
+    # (level, condition) pairs: crossing the level's cut-off indicates the condition
+    conditions: Tuple[Tuple[str, str], ...] = ()
+
+
+_MG_DL = {'mg/dl': 1.0, 'mgdl': 1.0}
+
+CATALOG: Tuple[Analyte, ...] = (
+    Analyte('fasting_glucose', 'Fasting Glucose', 'mg/dL',
+            ('fasting glucose', 'fasting plasma glucose', 'fpg', 'fasting blood sugar', 'fbs', 'glucose',
+             'blood glucose', 'blood sugar'),
+            {**_MG_DL, 'mmol/l': 18.016, 'mmol': 18.016},
+            {'high': 126, 'elevated': 100}, (('high', 'diabetes'),)),
+    Analyte('hba1c', 'HbA1c', '%',
+            ('hba1c', 'hemoglobin a1c', 'hb a1c', 'ha1c', 'a1c'),
+            {'%': 1.0},
+            {'high': 6.5, 'elevated': 5.7}, (('high', 'diabetes'),)),
+    Analyte('total_cholesterol', 'Total Cholesterol', 'mg/dL',
+            ('total cholesterol', 'cholesterol'),
+            {**_MG_DL, 'mmol/l': 38.67, 'mmol': 38.67},
+            {'high': 240, 'elevated': 200}, (('elevated', 'hyperlipidemia'),)),
+    Analyte('ldl', 'LDL Cholesterol', 'mg/dL',
+            ('ldl', 'ldl-c', 'ldl cholesterol', 'bad cholesterol'),
+            {**_MG_DL, 'mmol/l': 38.67, 'mmol': 38.67},
+            {'elevated': 100}, (('elevated', 'hyperlipidemia'),)),
+    Analyte('hdl', 'HDL Cholesterol', 'mg/dL',
+            ('hdl', 'hdl-c', 'hdl cholesterol', 'good cholesterol'),
+            {**_MG_DL, 'mmol/l': 38.67, 'mmol': 38.67},
+            {}),
+    Analyte('triglycerides', 'Triglycerides', 'mg/dL',
+            ('triglycerides', 'triglyceride', 'tg'),
+            {**_MG_DL, 'mmol/l': 88.57, 'mmol': 88.57},
+            {'elevated': 150}, (('elevated', 'hyperlipidemia'),)),
+    Analyte('systolic_bp', 'Systolic BP', 'mmHg',
+            ('systolic', 'systolic blood pressure', 'systolic bp', 'sbp', 'blood pressure', 'bp'),
+            {'mmhg': 1.0},
+            {'high': 140, 'elevated': 130}, (('high', 'hypertension'),)),
+    Analyte('diastolic_bp', 'Diastolic BP', 'mmHg',
+            ('diastolic', 'diastolic blood pressure', 'diastolic bp', 'dbp'),
+            {'mmhg': 1.0},
+            {'high': 90}, (('high', 'hypertension'),)),
+    Analyte('bmi', 'BMI', 'kg/m²',
+            ('bmi', 'body mass index'),
+            {'kg/m2': 1.0, 'kg/m²': 1.0},
+            {}),
+    Analyte('hemoglobin', 'Hemoglobin', 'g/dL',
+            ('hemoglobin', 'haemoglobin', 'hgb', 'hb'),
+            {'g/dl': 1.0, 'gdl': 1.0, 'g/l': 0.1},
+            {'low': 12}, (('low', 'anemia'),)),
+    Analyte('hematocrit', 'Hematocrit', '%',
+            ('hematocrit', 'haematocrit', 'hct'),
+            {'%': 1.0},
+            {'low': 36}, (('low', 'anemia'),)),
+    Analyte('iron', 'Serum Iron', 'mcg/dL',
+            ('iron', 'serum iron'),
+            {'mcg/dl': 1.0, 'ug/dl': 1.0, 'µg/dl': 1.0, 'umol/l': 5.585},
+            {'low': 60}, (('low', 'anemia'),)),
+)
+
+REQUIRED_FIELDS = ['fasting_glucose', 'hba1c', 'total_cholesterol', 'ldl', 'hdl', 'triglycerides', 'systolic_bp', 'diastolic_bp']
+
+# Keywords used by fact_parser's line scan to map unlabeled unit values (table cells) to
+# fields. Order matters: the first keyword found on a line wins.
+LINE_SCAN_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ('glucose', 'fasting_glucose'),
+    ('fasting glucose', 'fasting_glucose'),
+    ('fpg', 'fasting_glucose'),
+    ('blood glucose', 'fasting_glucose'),
+    ('a1c', 'hba1c'),
+    ('hba1c', 'hba1c'),
+    ('hemoglobin a1c', 'hba1c'),
+    ('cholesterol', 'total_cholesterol'),
+    ('total cholesterol', 'total_cholesterol'),
+    ('ldl', 'ldl'),
+    ('hdl', 'hdl'),
+    ('triglyceride', 'triglycerides'),
+    ('triglycerides', 'triglycerides'),
+    ('tg', 'triglycerides'),
+    ('systolic', 'systolic_bp'),
+    ('diastolic', 'diastolic_bp'),
+    ('bp', 'systolic_bp'),
+)
+
+# ---- Lookup tables built once at import ---------------------------------------------------
+
+ANALYTES: Dict[str, Analyte] = {a.field: a for a in CATALOG}
+UNITS: Dict[str, str] = {a.field: a.unit for a in CATALOG}
+# (field, unit lower-case) -> factor to the canonical unit
+UNIT_CONVERTERS: Dict[Tuple[str, str], float] = {
+    (a.field, u): factor for a in CATALOG for u, factor in {**a.conversions, a.unit.lower(): 1.0}.items()
+}
+# field -> ((level, cut-off, condition), ...)
+CONDITION_RULES: Dict[str, Tuple[Tuple[str, float, str], ...]] = {
+    a.field: tuple((level, a.thresholds[level], cond) for level, cond in a.conditions) for a in CATALOG
+}
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_END = ''
+
+
+def _tokens(name: str) -> List[str]:
+    return _TOKEN.findall(str(name).lower())
+
+
+def _build_alias_trie() -> Dict[str, Any]:
+    """Token trie over every alias, label and field name; `_END` marks the analyte field."""
+    trie: Dict[str, Any] = {}
+    for a in CATALOG:
+        for alias in a.aliases + (a.label, a.field):
+            node = trie
+            for tok in _tokens(alias):
+                node = node.setdefault(tok, {})
+            node.setdefault(_END, a.field)
+    return trie
+
+
+_ALIAS_TRIE = _build_alias_trie()
+# Exact normalized alias -> field, the common case of lab names produced by this service
+_ALIAS_INDEX: Dict[str, str] = {
+    ' '.join(_tokens(alias)): a.field for a in reversed(CATALOG) for alias in a.aliases + (a.label, a.field)
+}
+
+
+def resolve(name: str) -> Optional[str]:
+    """Map a lab name ('LDL Cholesterol', 'Hba1C', 'fasting_glucose') to its analyte field.
+
+    Exact aliases are a dictionary lookup; otherwise the longest alias found anywhere in the
+    name wins (leftmost on ties), e.g. 'Serum LDL-C (calc.)' -> 'ldl'.
+    """
+    tokens = _tokens(name)
+    field = _ALIAS_INDEX.get(' '.join(tokens))
+    if field is not None:
+        return field
+    best, best_len = None, 0
+    for i in range(len(tokens)):
+        node = _ALIAS_TRIE
+        for j in range(i, len(tokens)):
+            node = node.get(tokens[j])
+            if node is None:
+                break
+            if _END in node and j - i + 1 > best_len:
+                best, best_len = node[_END], j - i + 1
+    return best
+
+
+def unit_for(field: str) -> str:
+    return UNITS.get(field, '')
+
+
+def to_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_canonical(field: str, value: Any, unit: Optional[str] = None) -> Optional[float]:
+    """Numeric value converted to the analyte's canonical unit (None if not convertible)."""
+    num = to_number(value)
+    if num is None:
+        return None
+    if not unit:
+        return num
+    factor = UNIT_CONVERTERS.get((field, unit.strip().lower()))
+    return num * factor if factor is not None else None
+
+
+def crosses(field: str, level: str, value: Any) -> bool:
+    """True when the value crosses the analyte's `level` cut-off."""
+    cutoff = ANALYTES[field].thresholds.get(level) if field in ANALYTES else None
+    num = to_number(value)
+    if cutoff is None or num is None:
+        return False
+    return num < cutoff if level == 'low' else num > cutoff
+
+
+def conditions_for(field: str, value: Any, unit: Optional[str] = None) -> List[str]:
+    """Conditions indicated by a lab value, e.g. conditions_for('ldl', 160) -> ['hyperlipidemia']."""
+    rules = CONDITION_RULES.get(field)
+    if not rules:
+        return []
+    # Values in a unit the catalog cannot convert are compared as given
+    num = to_canonical(field, value, unit)
+    if num is None:
+        num = to_number(value)
+        if num is None:
+            return []
+    return [cond for level, cutoff, cond in rules if (num < cutoff if level == 'low' else num > cutoff)]
@@ -1,25 +1,286 @@
-from typing import List, Dict
-import uuid
+from typing import List, Dict, Iterator, Tuple, Optional
+import hashlib
+import re
 
+# Preferred break points, strongest first: line breaks keep lab-table rows intact,
+# then sentence ends, then any whitespace
+_SENTENCE_ENDS = ('. ', '? ', '! ', '; ')
 
-def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> List[Dict]:
-    """Split a long text into overlapping chunks and return list of dicts {id, text, start, end}.
-    This simple chunker is adequate for initial retrieval; replace with a smarter tokenizer for production.
-    """
-    if not text:
-        return []
 
-    chunks = []
-    start = 0
+def _find_break(text: str, lo: int, hi: int) -> int:
+    """Return the best chunk end in (lo, hi]: after a newline, a sentence end or a space."""
+    i = text.rfind('\n', lo, hi)
+    if i != -1:
+        return i + 1
+    i = max(text.rfind(p, lo, hi - 1) for p in _SENTENCE_ENDS)
+    if i != -1:
+        return i + 2
+    i = text.rfind(' ', lo, hi)
+    if i != -1:
+        return i + 1
+    return hi
+
+
+def _find_start(text: str, lo: int, hi: int) -> int:
+    """Return the first line/word start in [lo, hi), or lo if there is none."""
+    i = text.find('\n', lo, hi)
+    if i != -1 and i + 1 < hi:
+        return i + 1
+    i = text.find(' ', lo, hi)
+    if i != -1 and i + 1 < hi:
+        return i + 1
+    return lo
+
+
+def iter_chunk_spans(text: str, chunk_size: int = 800, overlap: int = 100) -> Iterator[Tuple[int, int]]:
+    """Lazily yield (start, end) offsets of overlapping chunks without copying the text.
+
+    Chunks end on a line break, sentence end or space where one exists in the second half
+    of the window, and the overlap restarts at a line/word start.
+    """
     length = len(text)
+    start = 0
     while start < length:
-        end = min(start + chunk_size, length)
-        chunk_text = text[start:end]
-        chunks.append({
-            'id': str(uuid.uuid4()),
-            'text': chunk_text,
-            'start': start,
-            'end': end
-        })
-        start += (chunk_size - overlap)
-    return chunks
+        hi = min(start + chunk_size, length)
+        end = hi if hi == length else _find_break(text, start + chunk_size // 2, hi)
+        yield start, end
+        if end >= length:
+            break
+        nxt = _find_start(text, max(start + 1, end - overlap), end) if overlap > 0 else end
+        start = max(nxt, start + 1)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _make_chunk(piece: str, start: int, end: int, seen: set, **extra) -> Dict:
+    digest = content_hash(piece)
+    cid = digest[:20]
+    if cid in seen:
+        cid = f'{cid}-{start}'
+    seen.add(cid)
+    chunk = {'id': cid, 'hash': digest, 'text': piece, 'start': start, 'end': end}
+    chunk.update(extra)
+    return chunk
+
+
+def iter_chunks(text: str, chunk_size: int = 800, overlap: int = 100) -> Iterator[Dict]:
+    """Lazily yield chunk dicts {id, hash, text, start, end}.
+
+    `hash` is the SHA-1 of the chunk text and `id` is derived from it, so the same report
+    always yields the same ids and downstream caches can key on them. A chunk whose text
+    repeats earlier in the same document gets its start offset appended to keep ids unique.
+    """
+    if not text:
+        return
+    seen = set()
+    for start, end in iter_chunk_spans(text, chunk_size, overlap):
+        yield _make_chunk(text[start:end], start, end, seen)
+
+
+def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> List[Dict]:
+    """Split a long text into overlapping chunks and return list of dicts {id, hash, text, start, end}.
+    Use `iter_chunks` / `iter_chunk_spans` to consume chunks lazily on very long documents.
+    """
+    return list(iter_chunks(text, chunk_size, overlap))
+
+
+# --- Layout-aware chunking for lab-result tables -------------------------------------------
+
+# Column separators in text-layer/OCR tables: tabs, pipes or runs of 2+ spaces
+_CELL_SPLIT = re.compile(r'\t|\s*\|\s*|\s{2,}')
+# "Label: value unit" / "Label  value" rows as found in simple lab printouts: the value must
+# be followed by a column gap, a unit or a reference range, so prose with numbers
+# ("Patient was seen 3 times") is not taken for a table row
+_KV_ROW = re.compile(
+    r'^\s*[A-Za-z][A-Za-z0-9 ,()/%\-\.]{0,60}?[:\s]\s*[<>]?\d+(?:[.,]\d+)?'
+    r'(?:\t|\s*\||\s{2,}'                                   # column gap
+    r'|\s*(?:%|mmhg\b|[a-zµμ]*/[a-z0-9²]+)'                  # unit (mg/dL, g/L, %, mmHg) or BP pair
+    r'|\s*\(?\s*(?:ref[a-z.]*\s*)?[<>]?\d+(?:\.\d+)?\s*[-–]\s*\d)',  # reference range
+    re.IGNORECASE)
+_HEADER_WORDS = ('test', 'parameter', 'investigation', 'analyte', 'result', 'value', 'unit', 'reference', 'range', 'normal')
+
+
+def _cells(line: str) -> List[str]:
+    return [c for c in _CELL_SPLIT.split(line.strip()) if c]
+
+
+def _is_table_row(line: str) -> bool:
+    if not line.strip() or len(line) > 200 or not any(ch.isdigit() for ch in line):
+        return False
+    return len(_cells(line)) >= 2 or bool(_KV_ROW.match(line))
+
+
+def _is_table_header(line: str) -> bool:
+    if not line.strip() or any(ch.isdigit() for ch in line):
+        return False
+    lowered = line.lower()
+    return len(_cells(line)) >= 2 and sum(w in lowered for w in _HEADER_WORDS) >= 2
+
+
+def find_table_blocks(text: str, min_rows: int = 2) -> List[Dict]:
+    """Detect lab-table blocks from line heuristics.
+
+    Returns dicts {start, end, header, rows} where `rows` is a list of (start, end) line
+    offsets and `header` the header line text ('' when the block has none).
+    """
+    blocks = []
+    rows: List[Tuple[int, int]] = []
+    header = ''
+    header_line = ''
+    pos = 0
+
+    def flush():
+        if len(rows) >= min_rows:
+            blocks.append({'start': rows[0][0], 'end': rows[-1][1], 'header': header, 'rows': list(rows)})
+
+    for line in text.splitlines(keepends=True):
+        start, end = pos, pos + len(line)
+        pos = end
+        if _is_table_row(line):
+            if not rows:
+                header = header_line
+            rows.append((start, end))
+            continue
+        flush()
+        rows = []
+        header = ''
+        header_line = line.strip() if _is_table_header(line) else ''
+    flush()
+    return blocks
+
+
+def _row_groups(rows: List[Tuple[int, int]], rows_per_chunk: int, chunk_size: int) -> Iterator[List[Tuple[int, int]]]:
+    group: List[Tuple[int, int]] = []
+    size = 0
+    for row in rows:
+        length = row[1] - row[0]
+        if group and (len(group) >= rows_per_chunk or size + length > chunk_size):
+            yield group
+            group, size = [], 0
+        group.append(row)
+        size += length
+    if group:
+        yield group
+
+
+def _format_table_row(cells: List[Optional[str]]) -> str:
+    return ' | '.join((c or '').replace('\n', ' ').strip() for c in cells)
+
+
+_ROW_TOKEN_SPLIT = re.compile(r'[\s|]+')
+
+
+def _row_tokens(row: str) -> List[str]:
+    return [t for t in _ROW_TOKEN_SPLIT.split(row.lower()) if t]
+
+
+def _is_subsequence(needle: List[str], haystack: List[str]) -> bool:
+    it = iter(haystack)
+    return all(tok in it for tok in needle)
+
+
+def _locate_rows(text: str, rows: List[str], taken: set) -> List[Optional[Tuple[int, int]]]:
+    """(start, end) of the text-layer line holding each extracted row, in order (None when not found).
+
+    A line holds a row when it starts with the row's first cell and contains all of its cells
+    in order (the text layer may carry extra columns such as reference ranges). Matched line
+    offsets are added to `taken`.
+    """
+    lines = []
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        lines.append((pos, pos + len(line), _row_tokens(line)))
+        pos += len(line)
+    found: List[Optional[Tuple[int, int]]] = []
+    i = 0
+    for row in rows:
+        tokens = _row_tokens(row)
+        hit = None
+        # Rows appear in table order, so search onwards from the previous match
+        for j in range(i, len(lines)):
+            start, end, line_tokens = lines[j]
+            if tokens and line_tokens[:1] == tokens[:1] and _is_subsequence(tokens, line_tokens):
+                hit, i = (start, end), j + 1
+                break
+        if hit is not None:
+            taken.add(hit[0])
+        found.append(hit)
+    return found
+
+
+def _contiguous(rows: List[Tuple[int, int]]) -> Iterator[List[Tuple[int, int]]]:
+    run: List[Tuple[int, int]] = []
+    for row in rows:
+        if run and row[0] != run[-1][1]:
+            yield run
+            run = []
+        run.append(row)
+    if run:
+        yield run
+
+
+def iter_layout_chunks(text: str, tables: Optional[List[List[List[Optional[str]]]]] = None,
+                       chunk_size: int = 800, overlap: int = 100, rows_per_chunk: int = 8) -> Iterator[Dict]:
+    """Lazily yield layout-aware chunks: one chunk per group of table rows, header attached.
+
+    Table blocks come from `tables` (pdfplumber `extract_tables()` output: tables of rows of
+    cells) when given, otherwise from line heuristics over `text`. Narrative text between
+    table blocks is chunked like `iter_chunks`. With `tables`, heuristic rows that match no
+    extracted row (tables pdfplumber missed) are still emitted as table chunks. Chunks carry
+    `type` ('table' or 'text') and, for table chunks, the `header` line; `start`/`end` are
+    offsets of the rows in `text` (-1 for extracted rows that cannot be located in the text
+    layer).
+    """
+    if not text and not tables:
+        return
+    seen = set()
+    blocks = find_table_blocks(text or '')
+
+    extracted = []
+    for table in tables or []:
+        rows = [_format_table_row(r) for r in table if r and any(c for c in r)]
+        if len(rows) < 2:
+            continue
+        extracted.append((rows[0], rows[1:]))
+    # Text-layer lines already covered by an extracted table row (by line start offset)
+    covered: set = set()
+    # The text layer holds the same tables; chunk the extracted structure, and below only the
+    # heuristic rows no extracted table accounts for, so no row is emitted twice or dropped
+    for header, rows in extracted:
+        located = _locate_rows(text or '', rows, covered)
+        for group in _row_groups([(0, len(r) + 1) for r in rows], rows_per_chunk, chunk_size):
+            body = '\n'.join(rows[:len(group)])
+            rows = rows[len(group):]
+            spans, located = located[:len(group)], located[len(group):]
+            if spans[0] is not None and spans[-1] is not None and spans[0][0] < spans[-1][1]:
+                start, end = spans[0][0], spans[-1][1]
+            else:
+                start = end = -1
+            yield _make_chunk(header + '\n' + body, start, end, seen, type='table', header=header)
+
+    cursor = 0
+    for block in blocks:
+        narrative = text[cursor:block['start']]
+        if narrative.strip():
+            for s, e in iter_chunk_spans(narrative, chunk_size, overlap):
+                yield _make_chunk(narrative[s:e], cursor + s, cursor + e, seen, type='text')
+        header = block['header']
+        for run in _contiguous([r for r in block['rows'] if r[0] not in covered]):
+            for group in _row_groups(run, rows_per_chunk, chunk_size):
+                start, end = group[0][0], group[-1][1]
+                body = text[start:end]
+                piece = header + '\n' + body if header else body
+                yield _make_chunk(piece, start, end, seen, type='table', header=header)
+        cursor = block['end']
+    narrative = text[cursor:] if text else ''
+    if narrative.strip():
+        for s, e in iter_chunk_spans(narrative, chunk_size, overlap):
+            yield _make_chunk(narrative[s:e], cursor + s, cursor + e, seen, type='text')
+
+
+def chunk_report(text: str, tables: Optional[List[List[List[Optional[str]]]]] = None,
+                 chunk_size: int = 800, overlap: int = 100, rows_per_chunk: int = 8) -> List[Dict]:
+    """Layout-aware counterpart of `chunk_text`; see `iter_layout_chunks`."""
+    return list(iter_layout_chunks(text, tables, chunk_size, overlap, rows_per_chunk))
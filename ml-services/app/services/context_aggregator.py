@@ -14,6 +14,7 @@ import logging
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from . import fact_parser, prompt_builder
+from .report_fact_cache import get_report_fact_cache, report_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -62,8 +63,7 @@ class ContextAggregator:
 
         # Derived metadata and checks
         missing_fields, follow_up_questions = self.check_profile_completeness(user_profile)
-        facts, evidence = self.extract_report_facts(user_report)
-        danger_flags = self.detect_dangerous_values(user_report, facts)
+        facts, evidence, danger_flags = self.analyze_report(user_report)
         needs_professional_review = bool(danger_flags)
 
         context = {
@@ -186,6 +186,30 @@ class ContextAggregator:
         
         return "\n".join(parts)
 
+    def analyze_report(self, report: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return (facts, evidence, danger_flags) for the report, memoized across chat turns.
+
+        The same report is analysed on every query; results are cached by a hash of its text
+        and lab results (see `report_fact_cache`), so only the first turn parses it.
+        """
+        if not report:
+            return {}, [], []
+        text = report.get('processing_result') or report.get('text') or ''
+        if not text:
+            return {}, [], self.detect_dangerous_values(report, {})
+
+        cache = get_report_fact_cache()
+        key = report_cache_key(report, text)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        facts, evidence, complete = self._parse_report_text(text)
+        entry = facts, evidence, self.detect_dangerous_values(report, facts)
+        # A parse that failed or stopped at the time budget is not reused on later turns
+        if complete:
+            cache.put(key, entry)
+        return entry
+
     def extract_report_facts(self, report: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
         """Extract numeric facts and supporting evidence from the report text using fact_parser.
 
@@ -198,12 +222,16 @@ class ContextAggregator:
         if not text:
             return {}, []
 
+        return self._parse_report_text(text)[:2]
+
+    def _parse_report_text(self, text: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]], bool]:
+        """(facts, evidence, complete); complete is False when parsing failed or ran out of time."""
         try:
-            facts, evidence = fact_parser.extract_facts_and_evidence(text)
-            return facts, evidence
+            facts, spans = fact_parser.extract_facts_and_spans(text)
+            return facts, spans.materialize(), not spans.truncated
         except Exception as e:
             logger.exception('Error parsing facts from report: %s', e)
-            return {}, []
+            return {}, [], False
 
     def detect_dangerous_values(self, report: Optional[Dict[str, Any]], facts: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Check facts against any provided reference ranges in the report and return flags.
@@ -0,0 +1,148 @@
+"""
+cross_encoder: Optional cross-encoder reranking stage run after `retrieve_candidates`.
+
+Only the top-N lexically reranked candidates are scored, in one batched forward pass of a
+(dynamically int8-quantized, when torch is available) CPU cross-encoder. The stage has a
+latency budget: if the model is still loading, busy, or the forward pass does not finish in
+time, the lexical order is returned unchanged. Scores are cached per
+(query hash, chunk hash) so repeated reports and retries skip the model entirely.
+
+Configuration (environment):
+- CROSS_ENCODER_ENABLED: '1' to enable the stage (default off)
+- CROSS_ENCODER_MODEL: sentence-transformers cross-encoder name
+- CROSS_ENCODER_TOP_N: number of candidates scored (default 8)
+- CROSS_ENCODER_KEEP: candidates kept for the prompt when scoring succeeded (default 4)
+- CROSS_ENCODER_BUDGET_MS: latency budget in milliseconds (default 300)
+- CROSS_ENCODER_QUANTIZE: '0' to disable dynamic quantization
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = os.getenv('CROSS_ENCODER_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+TOP_N = int(os.getenv('CROSS_ENCODER_TOP_N', '8'))
+KEEP = int(os.getenv('CROSS_ENCODER_KEEP', '4'))
+BUDGET_MS = float(os.getenv('CROSS_ENCODER_BUDGET_MS', '300'))
+QUANTIZE = os.getenv('CROSS_ENCODER_QUANTIZE', '1') != '0'
+CACHE_SIZE = int(os.getenv('CROSS_ENCODER_CACHE_SIZE', '4096'))
+
+_model = None
+_model_failed = False
+_model_lock = threading.Lock()
+# A single worker: one forward pass at a time, and a pass that overruns its budget keeps
+# running in the background (its scores still land in the cache) without blocking callers
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cross-encoder')
+# The pass in flight, if any; read and replaced under `_pending_lock` only
+_pending: Optional[Future] = None
+_pending_lock = threading.Lock()
+_cache: 'OrderedDict[Tuple[str, str], float]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return os.getenv('CROSS_ENCODER_ENABLED', '0') == '1'
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _load_model():
+    """Load (and quantize) the cross-encoder once; returns None if unavailable."""
+    global _model, _model_failed
+    with _model_lock:
+        if _model is not None or _model_failed:
+            return _model
+        try:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(MODEL_NAME, device='cpu')
+            if QUANTIZE:
+                try:
+                    import torch
+                    model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+                except Exception:
+                    logger.debug('Cross-encoder quantization failed; using float model', exc_info=True)
+            _model = model
+        except Exception:
+            logger.warning('Cross-encoder model %s unavailable; reranking stays lexical', MODEL_NAME, exc_info=True)
+            _model_failed = True
+        return _model
+
+
+def _score_pairs(qhash: str, query: str, pending: List[Tuple[str, str]]) -> None:
+    """Score (chunk hash, text) pairs in one batch and store them in the cache."""
+    model = _load_model()
+    if model is None:
+        return
+    scores = model.predict([(query, text) for _, text in pending], batch_size=len(pending), show_progress_bar=False)
+    with _cache_lock:
+        for (chash, _), s in zip(pending, scores):
+            _cache[(qhash, chash)] = float(s)
+            _cache.move_to_end((qhash, chash))
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _cached(qhash: str, chash: str) -> Optional[float]:
+    with _cache_lock:
+        score = _cache.get((qhash, chash))
+        if score is not None:
+            _cache.move_to_end((qhash, chash))
+        return score
+
+
+def cross_encoder_rerank(query: str, candidates: List[Dict[str, Any]], top_n: Optional[int] = None,
+                         budget_ms: Optional[float] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """Rerank the top-N candidates with the cross-encoder within a latency budget.
+
+    Returns (candidates, applied). When `applied` is False the input order is returned
+    unchanged (stage disabled, model unavailable/busy, or budget exceeded). Scored
+    candidates carry a 'ce_score' key and come first; the rest keep their lexical order.
+    """
+    global _pending
+    top_n = TOP_N if top_n is None else top_n
+    budget_ms = BUDGET_MS if budget_ms is None else budget_ms
+    if not candidates or top_n <= 0 or _model_failed:
+        return candidates, False
+
+    head, tail = candidates[:top_n], candidates[top_n:]
+    qhash = _hash(query)
+    # Chunks carry a content hash from the chunker; fall back to hashing the snippet
+    chashes = [c.get('hash') or _hash(c.get('snippet', '')) for c in head]
+    missing = [(h, c.get('snippet', '')) for h, c in zip(chashes, head) if _cached(qhash, h) is None]
+
+    if missing:
+        with _pending_lock:
+            if _pending is not None and not _pending.done():
+                # Another pass is still running (e.g. model warm-up or a concurrent request);
+                # do not queue behind it or wait on its future
+                return candidates, False
+            future = _pending = _executor.submit(_score_pairs, qhash, query, missing)
+        try:
+            # Only this call's own pass is waited on, for at most the budget
+            future.result(timeout=budget_ms / 1000.0)
+        except FutureTimeout:
+            logger.info('Cross-encoder exceeded %.0fms budget; keeping lexical order', budget_ms)
+            return candidates, False
+        except Exception:
+            logger.exception('Cross-encoder scoring failed; keeping lexical order')
+            return candidates, False
+
+    scores = [_cached(qhash, h) for h in chashes]
+    if any(s is None for s in scores):
+        return candidates, False
+    for c, s in zip(head, scores):
+        c['ce_score'] = s
+    head = sorted(head, key=lambda c: c['ce_score'], reverse=True)
+    return head + tail, True
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,132 @@
+"""
+deadline: Per-request time budget that every stage serving the request can check.
+
+The backend gives the service 120 seconds, but nothing inside used to know how much of it
+was left: scraping slept between pages, Gemini retries backed off and OCR ran to the end
+regardless. Each HTTP request now gets a deadline on arrival, from the `X-Request-Timeout`
+header (seconds the caller will wait) or REQUEST_DEADLINE_SECONDS. It lives in a context
+variable, so it follows the request into executor threads (`executors`) and pipeline stages
+(`pipeline_dag`) without being passed around.
+
+Blocking calls clamp their timeouts to the time left and retry loops stop once it runs out
+(raising DeadlineExceeded). Optional stages - web scrape, knowledge-base/embedding retrieval,
+cross-encoder rerank, the LLM call - are skipped when less than their minimum time is left,
+and the response is built from the deterministic fallbacks instead. Stages skipped or cut
+short are listed by `degraded()` so responses can report them and caches can refuse them.
+
+Work outside a request (background report jobs, scripts, tests) has no deadline:
+`remaining()` is None and nothing is skipped.
+
+Configuration (environment):
+- REQUEST_DEADLINE_SECONDS: budget when the caller sends no header; default 110, under the
+  backend's 120s timeout (0 = no deadline)
+"""
+from typing import Dict, List, Optional
+from contextvars import ContextVar, Token
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = 'X-Request-Timeout'
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '110'))
+
+# Seconds an optional stage needs to be worth starting; with less left it is skipped
+STAGE_MIN_SECONDS: Dict[str, float] = {
+    'scrape': 15.0,
+    'retrieval': 5.0,
+    'rerank': 3.0,
+    'llm': 10.0,
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised by a blocking call that gave up because the request deadline ran out."""
+
+
+class _Budget:
+    __slots__ = ('expires_at', 'degraded', 'lock')
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.degraded: List[str] = []
+        self.lock = threading.Lock()
+
+
+# Shared (not copied) by every thread and stage working on the same request
+_budget: ContextVar[Optional[_Budget]] = ContextVar('request_deadline', default=None)
+
+
+def budget_seconds(header_value: Optional[str] = None) -> Optional[float]:
+    """Budget from the caller's header value, else the default (None = no deadline)."""
+    try:
+        seconds = float(header_value) if header_value else 0.0
+    except ValueError:
+        seconds = 0.0
+    if seconds <= 0:
+        seconds = REQUEST_DEADLINE_SECONDS
+    return seconds if seconds > 0 else None
+
+
+def start(seconds: Optional[float]) -> Token:
+    """Start a deadline `seconds` from now for the current context; pass the token to `reset`."""
+    return _budget.set(_Budget(seconds) if seconds is not None else None)
+
+
+def reset(token: Token) -> None:
+    _budget.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (never negative), or None without a deadline."""
+    budget = _budget.get()
+    if budget is None:
+        return None
+    return max(0.0, budget.expires_at - time.monotonic())
+
+
+def has_time(seconds: float) -> bool:
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def expired() -> bool:
+    return remaining() == 0.0
+
+
+def clamp(timeout: float, reserve: float = 0.0) -> float:
+    """`timeout` limited to the time left minus `reserve`; unchanged without a deadline."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return max(0.0, min(timeout, left - reserve))
+
+
+def mark_degraded(stage: str) -> None:
+    """Record that `stage` was skipped or cut short for lack of time."""
+    budget = _budget.get()
+    if budget is None:
+        return
+    with budget.lock:
+        if stage not in budget.degraded:
+            budget.degraded.append(stage)
+
+
+def should_run(stage: str) -> bool:
+    """True when enough time is left for the optional `stage`; otherwise records it as degraded."""
+    need = STAGE_MIN_SECONDS.get(stage, 0.0)
+    if has_time(need):
+        return True
+    logger.info('Skipping %s: %.1fs left before the request deadline, needs %.0fs', stage, remaining(), need)
+    mark_degraded(stage)
+    return False
+
+
+def degraded() -> List[str]:
+    budget = _budget.get()
+    if budget is None:
+        return []
+    with budget.lock:
+        return list(budget.degraded)
@@ -0,0 +1,68 @@
+"""
+evidence: Evidence as (start, end) spans over one shared report text.
+
+`fact_parser` records where each fact was found instead of copying a window of text per
+match and a whole line per table value. Overlapping spans are merged into one span that
+keeps the fields of everything merged into it, so a line backing several facts, or a
+window found by both the pattern and the line scan, appears once. Text is only sliced out
+when the evidence is serialized for the prompt or the API response (`materialize`).
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class EvidenceSpan(NamedTuple):
+    start: int
+    end: int
+    fields: Tuple[str, ...]
+
+    @property
+    def id(self) -> str:
+        # Deterministic and short: cited back by the model and checked by the verifier
+        return f'ev{self.start}-{self.end}'
+
+
+class EvidenceSpans:
+    """Evidence spans over a single immutable text buffer."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._raw: List[Tuple[int, int, str]] = []
+        self._merged: Optional[List[EvidenceSpan]] = None
+        # Set when extraction stopped at its time budget, so the spans may be incomplete
+        self.truncated = False
+
+    def add(self, field: str, start: int, end: int) -> None:
+        start, end = max(0, start), min(len(self.text), end)
+        if start < end:
+            self._raw.append((start, end, field))
+            self._merged = None
+
+    def spans(self) -> List[EvidenceSpan]:
+        """Merged spans in document order."""
+        if self._merged is None:
+            merged: List[EvidenceSpan] = []
+            for start, end, field in sorted(self._raw, key=lambda r: (r[0], r[1])):
+                if merged and start < merged[-1].end:
+                    last = merged[-1]
+                    fields = last.fields if field in last.fields else last.fields + (field,)
+                    merged[-1] = EvidenceSpan(last.start, max(last.end, end), fields)
+                else:
+                    merged.append(EvidenceSpan(start, end, (field,)))
+            self._merged = merged
+        return self._merged
+
+    def overlapping(self, ranges: Iterable[Tuple[int, int]]) -> List[EvidenceSpan]:
+        """Spans that overlap any of the given (start, end) ranges."""
+        ranges = [r for r in ranges if r[0] < r[1]]
+        return [s for s in self.spans() if any(lo < s.end and s.start < hi for lo, hi in ranges)]
+
+    def materialize(self, spans: Optional[List[EvidenceSpan]] = None) -> List[Dict[str, Any]]:
+        """Serialize spans to evidence dicts {id, field, fields, text, start, end}."""
+        return [
+            {'id': s.id, 'field': s.fields[0], 'fields': list(s.fields), 'text': self.text[s.start:s.end],
+             'start': s.start, 'end': s.end}
+            for s in (self.spans() if spans is None else spans)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.spans())
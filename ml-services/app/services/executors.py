@@ -0,0 +1,90 @@
+"""
+executors: Bounded worker pools that keep blocking work off the asyncio event loop.
+
+The route handlers are `async def`, so anything they call directly runs on the event loop
+thread: one report waiting on Gemini (with retry backoff), the backend, a web scrape or
+SQLite stalls every other request served by that worker. Handlers hand such work to one of
+two pools sized for its workload and await the result:
+
+- `run_io`: blocking network and disk calls (LLM, backend, scraping, SQLite) and pipelines
+  that mostly wait on them. Many threads, since they spend their time waiting.
+- `run_cpu`: CPU-bound native code that releases the GIL (OpenCV, numpy, embedding models).
+  One thread per core, so concurrent requests queue here instead of oversubscribing cores.
+
+OCR, the CPU-bound work that holds the GIL, already runs on ocr_service's process pool
+(OCR_WORKERS), which the report pipeline uses from inside `run_io`.
+
+Configuration (environment):
+- EXECUTOR_IO_WORKERS: threads for blocking I/O (default 32)
+- EXECUTOR_CPU_WORKERS: threads for CPU-bound native work (0 = one per core, default)
+"""
+from typing import Any, Callable, Dict, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+
+T = TypeVar('T')
+
+IO_WORKERS = int(os.getenv('EXECUTOR_IO_WORKERS', '32'))
+CPU_WORKERS = int(os.getenv('EXECUTOR_CPU_WORKERS', '0'))
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _pool_sizes() -> Dict[str, int]:
+    return {
+        'io': max(1, IO_WORKERS),
+        'cpu': CPU_WORKERS if CPU_WORKERS > 0 else _available_cores(),
+    }
+
+
+def get_executor(kind: str) -> ThreadPoolExecutor:
+    """The shared 'io' or 'cpu' pool, created on first use."""
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=_pool_sizes()[kind], thread_name_prefix=f'{kind}-worker')
+            _pools[kind] = pool
+        return pool
+
+
+async def _run(kind: str, fn: Callable[..., T], args, kwargs) -> T:
+    loop = asyncio.get_running_loop()
+    # Carry context variables (request-scoped state) into the worker thread, like asyncio.to_thread
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(kind), call)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking I/O-bound `fn(*args, **kwargs)` on the I/O pool and await its result."""
+    return await _run('io', fn, args, kwargs)
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run CPU-bound `fn(*args, **kwargs)` on the CPU pool and await its result."""
+    return await _run('cpu', fn, args, kwargs)
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """Stop the pools; they are recreated if used again."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+
+def executor_stats() -> Dict[str, int]:
+    sizes = _pool_sizes()
+    return {f'{kind}_workers': sizes[kind] for kind in sizes}
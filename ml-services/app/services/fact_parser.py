@@ -2,10 +2,28 @@
 fact_parser: Extracts structured numeric facts and evidence snippets from text.
 This is a regex-based best-effort parser; in production, you'd use clinically-aware
 parsers or NLP models to extract entities more robustly.
+
+All patterns are compiled once at import. Each field pattern only searches up to its first
+match, and not at all when none of its label literals occur in the text; the table heuristics find unit/percent values with one pass over the whole text and
+visit only the lines holding a value, and are skipped once every field they can fill is known.
 """
-from typing import Tuple, Dict, List, Any
+from typing import Tuple, Dict, List, Any, Optional
+from bisect import bisect_right
+from itertools import accumulate
+import logging
+import os
 import re
-import uuid
+import sys
+import time
+try:
+    import re2
+except Exception:
+    re2 = None
+
+from .analytes import LINE_SCAN_KEYWORDS
+from .evidence import EvidenceSpans
+
+logger = logging.getLogger(__name__)
 
 # Map friendly names to regex patterns and units
 FIELD_PATTERNS = {
@@ -22,115 +40,212 @@ FIELD_PATTERNS = {
     'patient_name': r'(?:patient name|patient:|name:)[:\s]+([A-Za-z\s\.]+?)(?:\n|,|\||$|Female|Male|DOB|Date)',
 }
 
-REQUIRED_FIELDS = ['fasting_glucose', 'hba1c', 'total_cholesterol', 'ldl', 'hdl', 'triglycerides', 'systolic_bp', 'diastolic_bp']
+# Hardened variants of FIELD_PATTERNS for untrusted OCR output. Separator runs are possessive
+# (`*+`/`++`, rewritten to an equivalent lookahead form on Python < 3.11): they are followed by
+# a digit or a name character, so giving characters back can never produce a match and only
+# costs backtracking. The patient name is bounded to 80
+# characters and can no longer start with whitespace the separator run already consumed,
+# which made "name:" followed by a long whitespace run quadratic.
+HARDENED_FIELD_PATTERNS = {
+    'fasting_glucose': r'(?:fasting glucose|fasting plasma glucose|FPG|fasting blood sugar|FBS|glucose|blood glucose)[:\s]*+(\d{1,3}(?:\.\d+)?)\s*(mg/dL|mg/dl|mgdl|mmol/L|mmol/l|mmol)?',
+    'hba1c': r'(?:hba1c|hba1c\s*%|hemoglobin a1c|hb a1c|ha1c)[:\s]*+(\d{1,2}(?:\.\d+)?)\s*%?',
+    'total_cholesterol': r'(?:total cholesterol|cholesterol)[:\s]*+(\d{2,3})\s*(mg/dL|mg/dl|mgdl)?',
+    'ldl': r'(?:ldl|ldl-c|ldl cholesterol|bad cholesterol)[:\s]*+(\d{2,3})\s*(mg/dL|mg/dl|mgdl)?',
+    'hdl': r'(?:hdl|hdl-c|hdl cholesterol|good cholesterol)[:\s]*+(\d{1,2})\s*(mg/dL|mg/dl|mgdl)?',
+    'triglycerides': r'(?:triglyceride[s]?|tg)[:\s]*+(\d{2,3})\s*(mg/dL|mg/dl|mgdl)?',
+    'systolic_bp': r'(?:systolic|systolic blood pressure|SBP|blood pressure|BP)[:\s]*+(\d{2,3})(?:/(\d{2,3}))?\s*(mmHg)?',
+    'diastolic_bp': r'(?:diastolic|diastolic blood pressure|DBP)(?:[:\s]*+(\d{2,3}))?\s*(mmHg)?',
+    'bmi': r'\bBMI[:\s]*+(\d{1,2}\.\d|\d{1,2})\b',
+    'hemoglobin': r'hemoglobin[:\s]*+(\d{1,2}\.\d|\d{1,2})\s*(g/dL|g/dl|gdl)?',
+    'patient_name': r'(?:patient name|patient:|name:)[:\s]++([A-Za-z\s\.]{1,80}?)(?:\n|,|\||$|Female|Male|DOB|Date)',
+}
+
+# Hardened mode is the default; FACT_PARSER_HARDENED=0 restores the original patterns. The time
+# budget bounds a single document: extraction stops and returns what it has found so far.
+HARDENED = os.getenv('FACT_PARSER_HARDENED', '1') != '0'
+TIME_BUDGET_MS = float(os.getenv('FACT_PARSER_TIME_BUDGET_MS', '2000'))
+
+# Keywords used to map unlabeled unit values (table cells) to fields, checked in order
+FIELD_KEYWORD_MAP = dict(LINE_SCAN_KEYWORDS)
+
+# Whitespace that does not end a line (str.splitlines boundaries excluded), so whole-text
+# matches of the line patterns never span two lines
+_INLINE_WS = r'[^\S\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]*'
+
+
+
+# A character class followed by a possessive `*+`/`++`
+_POSSESSIVE_CLASS = re.compile(r'(\[[^\]]*\])([*+])\+')
+
+
+def _without_possessives(pattern: str) -> str:
+    """Rewrite `[cls]*+` / `[cls]++` for re before Python 3.11, which has no possessive
+    quantifiers: `[cls]*(?![cls])` only matches the maximal run too, so the match is the same
+    and a shorter run fails at once on the lookahead. No groups are added, so group numbers
+    are unchanged."""
+    return _POSSESSIVE_CLASS.sub(r'\1\2(?!\1)', pattern)
+
+
+def _compile_hardened(pattern: str):
+    """Compile with RE2 (linear time by construction) when installed, else with re."""
+    if re2 is not None:
+        try:
+            # RE2 has no possessive quantifiers and does not need them
+            return re2.compile('(?i)' + pattern.replace('*+', '*').replace('++', '+'))
+        except Exception:
+            logger.debug('RE2 rejected pattern %s; using re', pattern, exc_info=True)
+    if sys.version_info < (3, 11):
+        pattern = _without_possessives(pattern)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+_FIELD_REGEXES = {field: re.compile(pattern, re.IGNORECASE) for field, pattern in FIELD_PATTERNS.items()}
+_HARDENED_REGEXES = {field: _compile_hardened(pattern) for field, pattern in HARDENED_FIELD_PATTERNS.items()}
+_BP_PAIR = re.compile(r'\b(\d{2,3})/(\d{2,3})\b')
+_UNIT_VALUE = re.compile(r'(\d{1,3}(?:\.\d+)?)' + _INLINE_WS + r'(mg/dL|mg/dl|mgdl|mmol/L|mmol/l|mmol|%)', re.IGNORECASE)
+_PERCENT_VALUE = re.compile(r'(\d{1,2}(?:\.\d+)?)' + _INLINE_WS + r'%')
+
+# Lower-case literals at least one of which occurs in every match of a field pattern. On ASCII
+# text (where IGNORECASE is plain lower-casing) a field whose literals are all absent is
+# skipped without running its regex over the whole report
+_FIELD_ANCHORS = {
+    'fasting_glucose': ('glucose', 'fpg', 'fasting blood sugar', 'fbs'),
+    'hba1c': ('hba1c', 'hemoglobin a1c', 'hb a1c', 'ha1c'),
+    'total_cholesterol': ('cholesterol',),
+    'ldl': ('ldl', 'bad cholesterol'),
+    'hdl': ('hdl', 'good cholesterol'),
+    'triglycerides': ('triglyceride', 'tg'),
+    'systolic_bp': ('systolic', 'bp', 'blood pressure'),
+    'diastolic_bp': ('diastolic', 'dbp'),
+    'bmi': ('bmi',),
+    'hemoglobin': ('hemoglobin',),
+    'patient_name': ('patient name', 'patient:', 'name:'),
+}
+
+# Fields the line-scan heuristics can still fill; once all are known the scan is skipped
+_LINE_SCAN_FIELDS = frozenset(FIELD_KEYWORD_MAP.values()) | {'hba1c'}
 
 
-def extract_facts_and_evidence(text: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+def _parse_number(value: Optional[str]) -> Any:
+    try:
+        return float(value) if '.' in value else int(value)
+    except Exception:
+        return value
+
+
+def _keyword_field(context: str, keywords: List[Tuple[str, str]]) -> Optional[str]:
+    for kw, fld in keywords:
+        if kw in context:
+            return fld
+    return None
+
+
+def _expired(deadline: Optional[float], facts: Dict[str, Any]) -> bool:
+    if deadline is None or time.perf_counter() < deadline:
+        return False
+    logger.warning('[FactParser] Time budget exceeded; returning %d facts found so far', len(facts))
+    return True
+
+
+def extract_facts_and_evidence(text: str, hardened: Optional[bool] = None,
+                               time_budget_ms: Optional[float] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Extract facts and serialized evidence {id, field, fields, text, start, end}.
+
+    See `extract_facts_and_spans` for the arguments.
+    """
+    facts, spans = extract_facts_and_spans(text, hardened=hardened, time_budget_ms=time_budget_ms)
+    return facts, spans.materialize()
+
+
+def extract_facts_and_spans(text: str, hardened: Optional[bool] = None,
+                            time_budget_ms: Optional[float] = None) -> Tuple[Dict[str, Any], EvidenceSpans]:
+    """Extract facts and evidence spans over `text`.
+
+    Each pattern match contributes the match plus 60 characters either side, each line-scan
+    value its whole line; overlapping spans are merged (see `evidence`).
+
+    `hardened` (default: FACT_PARSER_HARDENED) selects the ReDoS-safe patterns and enforces
+    `time_budget_ms` (default: FACT_PARSER_TIME_BUDGET_MS, <= 0 disables) per document; the
+    returned spans' `truncated` is set when the budget ran out before the whole text was read.
+    """
     facts = {}
-    evidence = []
-
-    lower = text.lower()
-    for field, pattern in FIELD_PATTERNS.items():
-        for m in re.finditer(pattern, text, flags=re.IGNORECASE):
-            value = m.group(1)
-            # try convert to numeric
-            try:
-                if '.' in value:
-                    value_parsed = float(value)
-                else:
-                    value_parsed = int(value)
-            except Exception:
-                value_parsed = value
+    evidence = EvidenceSpans(text)
+    hardened = HARDENED if hardened is None else hardened
+    budget = TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+    deadline = time.perf_counter() + budget / 1000.0 if hardened and budget > 0 else None
+    regexes = _HARDENED_REGEXES if hardened else _FIELD_REGEXES
 
+    lower = text.lower() if text.isascii() else None
+    for field, rx in regexes.items():
+        if _expired(deadline, facts):
+            evidence.truncated = True
+            return facts, evidence
+        if lower is None or any(a in lower for a in _FIELD_ANCHORS[field]):
+            m = rx.search(text)
+        else:
+            m = None
+        if m:
+            value_parsed = _parse_number(m.group(1))
             # If parsed is a string, trim whitespace
             if isinstance(value_parsed, str):
                 value_parsed = value_parsed.strip()
-
             facts[field] = value_parsed
-            snippet = text[max(0, m.start()-60):min(len(text), m.end()+60)]
-            evidence.append({
-                'id': str(uuid.uuid4()),
-                'field': field,
-                'text': snippet,
-                'start': m.start(),
-                'end': m.end()
-            })
-            print(f'[FactParser] Found {field}={value_parsed} in text')
-            break
+            evidence.add(field, m.start() - 60, m.end() + 60)
+            logger.debug('[FactParser] Found %s=%s in text', field, value_parsed)
         # If this is a BP value with pattern 'BP: 140/90', extract both values
         if field == 'systolic_bp' and 'systolic_bp' in facts and 'diastolic_bp' not in facts:
-            bp_match = re.search(r'\b(\d{2,3})/(\d{2,3})\b', text)
+            bp_match = _BP_PAIR.search(text) if '/' in text else None
             if bp_match:
-                try:
-                    facts['systolic_bp'] = int(bp_match.group(1))
-                    facts['diastolic_bp'] = int(bp_match.group(2))
-                    snippet = text[max(0, bp_match.start()-60):min(len(text), bp_match.end()+60)]
-                    evidence.append({'id': str(uuid.uuid4()), 'field': 'systolic_bp', 'text': snippet, 'start': bp_match.start(), 'end': bp_match.end()})
-                except Exception:
-                    pass
-
-    # Post-process: scan lines for unit-based values and map them to fields if not already captured
-    # Map keywords to fields for heuristic mapping
-    FIELD_KEYWORD_MAP = {
-        'glucose': 'fasting_glucose',
-        'fasting glucose': 'fasting_glucose',
-        'fpg': 'fasting_glucose',
-        'blood glucose': 'fasting_glucose',
-        'a1c': 'hba1c',
-        'hba1c': 'hba1c',
-        'hemoglobin a1c': 'hba1c',
-        'cholesterol': 'total_cholesterol',
-        'total cholesterol': 'total_cholesterol',
-        'ldl': 'ldl',
-        'hdl': 'hdl',
-        'triglyceride': 'triglycerides',
-        'triglycerides': 'triglycerides',
-        'tg': 'triglycerides',
-        'systolic': 'systolic_bp',
-        'diastolic': 'diastolic_bp',
-        'bp': 'systolic_bp',
-    }
-
-    # Line-scan to handle values in tables and unlabeled columns
+                facts['systolic_bp'] = int(bp_match.group(1))
+                facts['diastolic_bp'] = int(bp_match.group(2))
+                evidence.add('systolic_bp', bp_match.start() - 60, bp_match.end() + 60)
+
+    if _LINE_SCAN_FIELDS.issubset(facts):
+        return facts, evidence
+
+    # Line-scan to handle values in tables and unlabeled columns. Unit and percent values are
+    # found with one pass over the whole text each and grouped by line, so only lines holding
+    # a value are visited: unit values first, then percent values, line by line.
+    by_line: Dict[int, Tuple[List['re.Match'], List['re.Match']]] = {}
+    line_starts = list(accumulate((len(l) for l in text.splitlines(keepends=True)), initial=0))
+    for kind, rx in ((0, _UNIT_VALUE), (1, _PERCENT_VALUE)):
+        for m in rx.finditer(text):
+            i = bisect_right(line_starts, m.start()) - 1
+            by_line.setdefault(i, ([], []))[kind].append(m)
+    if not by_line:
+        return facts, evidence
+
     lines = text.splitlines()
-    for i, line in enumerate(lines):
-        # Find values with mg/dL, mmol/L, mgdl, or percent
-        for m in re.finditer(r"(\d{1,3}(?:\.\d+)?)\s*(mg/dL|mg/dl|mgdl|mmol/L|mmol/l|mmol|%)", line, flags=re.IGNORECASE):
-            val = m.group(1)
-            unit = m.group(2)
-            context = line.lower()
-            matched_field = None
-            for kw, fld in FIELD_KEYWORD_MAP.items():
-                if kw in context and fld not in facts:
-                    matched_field = fld
-                    break
+    # Keywords whose field is still missing; rebuilt whenever a line value fills a field
+    keywords = [(kw, fld) for kw, fld in FIELD_KEYWORD_MAP.items() if fld not in facts]
+    for i in sorted(by_line):
+        if _expired(deadline, facts):
+            evidence.truncated = True
+            break
+        line = lines[i]
+        context = line.lower()
+        line_units, line_percents = by_line[i]
+        for m in line_units:
+            if not keywords:
+                break
+            matched_field = _keyword_field(context, keywords)
             # If not found, check previous line as header (table-like layout)
             if not matched_field and i > 0:
-                prev = lines[i - 1].lower()
-                for kw, fld in FIELD_KEYWORD_MAP.items():
-                    if kw in prev and fld not in facts:
-                        matched_field = fld
-                        break
+                matched_field = _keyword_field(lines[i - 1].lower(), keywords)
             if matched_field:
-                try:
-                    parsed = float(val) if '.' in val else int(val)
-                except Exception:
-                    parsed = val
+                parsed = _parse_number(m.group(1))
                 facts[matched_field] = parsed
-                snippet = line
-                evidence.append({'id': str(uuid.uuid4()), 'field': matched_field, 'text': snippet, 'start': 0, 'end': len(line)})
-                print(f'[FactParser] Line-scan mapped {matched_field}={parsed} from line: {line.strip()}')
+                keywords = [(kw, fld) for kw, fld in keywords if fld != matched_field]
+                evidence.add(matched_field, line_starts[i], line_starts[i] + len(line))
+                logger.debug('[FactParser] Line-scan mapped %s=%s from line: %s', matched_field, parsed, line.strip())
         # Also handle percent-only matches for HbA1c or other percent values
-        for m in re.finditer(r"(\d{1,2}(?:\.\d+)?)\s*%", line, flags=re.IGNORECASE):
-            val = m.group(1)
-            context = line.lower()
-            if ('hba1c' in context or 'a1c' in context or 'hemoglobin a1c' in context) and 'hba1c' not in facts:
-                try:
-                    facts['hba1c'] = float(val) if '.' in val else int(val)
-                    evidence.append({'id': str(uuid.uuid4()), 'field': 'hba1c', 'text': line, 'start': 0, 'end': len(line)})
-                    print(f'[FactParser] Line-scan mapped hba1c={val} from line: {line.strip()}')
-                except Exception:
-                    pass
+        if line_percents and 'hba1c' not in facts and ('hba1c' in context or 'a1c' in context or 'hemoglobin a1c' in context):
+            m = line_percents[0]
+            facts['hba1c'] = _parse_number(m.group(1))
+            keywords = [(kw, fld) for kw, fld in keywords if fld != 'hba1c']
+            evidence.add('hba1c', line_starts[i], line_starts[i] + len(line))
+            logger.debug('[FactParser] Line-scan mapped hba1c=%s from line: %s', m.group(1), line.strip())
+        if _LINE_SCAN_FIELDS.issubset(facts):
+            break
 
     return facts, evidence
-
@@ -7,7 +7,7 @@ except Exception:
 import numpy as np
 import os
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
 
 # Path to store the index and docs metadata
 DATA_DIR = os.getenv('ML_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
@@ -18,8 +18,12 @@ DOCS_PATH = os.path.join(DATA_DIR, 'docs.json')
 
 
 class FaissStore:
-    def __init__(self):
+    def __init__(self, namespace: str = 'default'):
         os.makedirs(DATA_DIR, exist_ok=True)
+        self.namespace = namespace
+        # Bumped on every mutation so cached search results can be tied to a store state
+        self.version = 0
+        self._listeners: List[Callable[[str], None]] = []
         self.index = None
         self.dim = None
         self.docs: Dict[str, Dict[str, Any]] = {}
@@ -42,6 +46,18 @@ class FaissStore:
                 self.index = None
                 self.dim = None
 
+    def on_change(self, callback: Callable[[str], None]):
+        """Register a callback invoked with the namespace after every mutation."""
+        self._listeners.append(callback)
+
+    def _notify_change(self):
+        self.version += 1
+        for cb in self._listeners:
+            try:
+                cb(self.namespace)
+            except Exception:
+                pass
+
     def _save_docs(self):
         with open(DOCS_PATH, 'w', encoding='utf-8') as f:
             json.dump(list(self.docs.values()), f, ensure_ascii=False, indent=2)
@@ -70,6 +86,7 @@ class FaissStore:
         self.docs[doc_id] = { 'id': doc_id, 'content': content, 'metadata': metadata }
         self._save_docs()
         self._save_index()
+        self._notify_change()
 
     def search(self, vector: List[float], k: int = 5) -> List[Dict[str, Any]]:
         if self.index is None and not HAS_FAISS:
@@ -120,4 +137,7 @@ def get_store() -> FaissStore:
     global _store
     if _store is None:
         _store = FaissStore()
+        # Drop cached chatbot retrievals whenever the store changes
+        from .retrieval_cache import get_retrieval_cache
+        _store.on_change(get_retrieval_cache().invalidate)
     return _store
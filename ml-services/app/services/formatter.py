@@ -2,6 +2,8 @@ from typing import Dict, List, Any
 import re
 import json
 
+from .analytes import crosses
+
 
 def format_output(model_output: Dict[str, Any], evidence: List[Dict[str, Any]], facts: Dict[str, Any] = None) -> Dict[str, Any]:
     """Format the model's output into structured summary, diagnosis, and diet plan.
@@ -75,14 +77,14 @@ def format_output(model_output: Dict[str, Any], evidence: List[Dict[str, Any]],
             # Glucose
             if 'fasting_glucose' in facts:
                 glucose = facts.get('fasting_glucose')
-                if glucose and float(glucose) > 126:
+                if glucose and crosses('fasting_glucose', 'high', glucose):
                     findings.append(f"• Fasting Glucose: {glucose} mg/dL (⚠️ High - may indicate diabetes)")
                 else:
                     findings.append(f"• Fasting Glucose: {glucose} mg/dL")
             
             if 'hba1c' in facts:
                 hba1c = facts.get('hba1c')
-                if hba1c and float(hba1c) > 6.5:
+                if hba1c and crosses('hba1c', 'high', hba1c):
                     findings.append(f"• HbA1c: {hba1c}% (⚠️ High - diabetes indicator)")
                 else:
                     findings.append(f"• HbA1c: {hba1c}%")
@@ -116,31 +118,31 @@ def format_output(model_output: Dict[str, Any], evidence: List[Dict[str, Any]],
         diagnosis_parts = []
         if 'systolic_bp' in facts and facts['systolic_bp']:
             try:
-                if float(facts['systolic_bp']) > 140:
+                if crosses('systolic_bp', 'high', facts['systolic_bp']):
                     diagnosis_parts.append("Possible hypertension (high blood pressure)")
-                elif float(facts['systolic_bp']) > 130:
+                elif crosses('systolic_bp', 'elevated', facts['systolic_bp']):
                     diagnosis_parts.append("Elevated blood pressure")
             except:
                 pass
         if 'fasting_glucose' in facts and facts['fasting_glucose']:
             try:
-                if float(facts['fasting_glucose']) > 126:
+                if crosses('fasting_glucose', 'high', facts['fasting_glucose']):
                     diagnosis_parts.append("Possible diabetes (high fasting glucose)")
-                elif float(facts['fasting_glucose']) > 100:
+                elif crosses('fasting_glucose', 'elevated', facts['fasting_glucose']):
                     diagnosis_parts.append("Prediabetes (elevated fasting glucose)")
             except:
                 pass
         if 'hba1c' in facts and facts['hba1c']:
             try:
-                if float(facts['hba1c']) > 6.5:
+                if crosses('hba1c', 'high', facts['hba1c']):
                     diagnosis_parts.append("Possible diabetes (high HbA1c)")
-                elif float(facts['hba1c']) > 5.7:
+                elif crosses('hba1c', 'elevated', facts['hba1c']):
                     diagnosis_parts.append("Prediabetes (elevated HbA1c)")
             except:
                 pass
         if 'total_cholesterol' in facts and facts['total_cholesterol']:
             try:
-                if float(facts['total_cholesterol']) > 240:
+                if crosses('total_cholesterol', 'high', facts['total_cholesterol']):
                     diagnosis_parts.append("High cholesterol")
             except:
                 pass
@@ -157,7 +159,7 @@ def format_output(model_output: Dict[str, Any], evidence: List[Dict[str, Any]],
         diet_plan_items = []
         if 'fasting_glucose' in facts and facts['fasting_glucose']:
             try:
-                if float(facts['fasting_glucose']) > 126:
+                if crosses('fasting_glucose', 'high', facts['fasting_glucose']):
                     diet_plan_items.append("Reduce sugar and refined carbohydrates intake")
                     diet_plan_items.append("Increase fiber intake through whole grains and vegetables")
                     diet_plan_items.append("Eat lean proteins and control portion sizes")
@@ -166,7 +168,7 @@ def format_output(model_output: Dict[str, Any], evidence: List[Dict[str, Any]],
         
         if 'total_cholesterol' in facts and facts['total_cholesterol']:
             try:
-                if float(facts['total_cholesterol']) > 200:
+                if crosses('total_cholesterol', 'elevated', facts['total_cholesterol']):
                     diet_plan_items.append("Reduce saturated fats and cholesterol-rich foods")
                     diet_plan_items.append("Increase consumption of omega-3 rich foods (fish, walnuts)")
                     diet_plan_items.append("Include more fruits, vegetables, and whole grains")
@@ -175,7 +177,7 @@ def format_output(model_output: Dict[str, Any], evidence: List[Dict[str, Any]],
         
         if 'systolic_bp' in facts and facts['systolic_bp']:
             try:
-                if float(facts['systolic_bp']) > 140:
+                if crosses('systolic_bp', 'high', facts['systolic_bp']):
                     diet_plan_items.append("Reduce sodium (salt) intake in meals")
                     diet_plan_items.append("Increase potassium-rich foods (bananas, spinach, sweet potatoes)")
                     diet_plan_items.append("Stay hydrated and limit caffeine")
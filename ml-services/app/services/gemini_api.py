@@ -23,6 +23,9 @@ from typing import Dict, Any
 import os
 import json
 
+from . import deadline
+from .deadline import DeadlineExceeded
+
 def call_gemini(prompt: Dict[str, Any]) -> Dict[str, Any]:
     """Call the configured Gemini model via Generative Language REST API, with fallback to OpenAI if available.
 
@@ -158,7 +161,13 @@ def call_gemini(prompt: Dict[str, Any]) -> Dict[str, Any]:
         {'messages': [{'role': 'system', 'content': system}, {'role': 'user', 'content': user_text_str}], 'maxOutputTokens': 512}
     ]
 
+    out_of_time = False
     for attempt in range(attempts):
+        # Each attempt gets at most the time left before the request deadline
+        timeout = deadline.clamp(60)
+        if timeout < 1:
+            out_of_time = True
+            break
         try:
             print(f'[Gemini API] Attempt {attempt + 1}/{attempts} to call {endpoint}')
             # try every body candidate (each attempt will cycle the body candidate in case of failure)
@@ -166,7 +175,7 @@ def call_gemini(prompt: Dict[str, Any]) -> Dict[str, Any]:
             # Mask API key when printing logs
             logged_key = None if not api_key else f"{api_key[:6]}...{api_key[-6:]}"
             print(f'[Gemini API] Attempt {attempt + 1}/{attempts} to call {endpoint} with key={logged_key} and body_shape={list(body.keys())}')
-            resp = requests.post(endpoint, headers=headers, params=params, json=body, timeout=60)
+            resp = requests.post(endpoint, headers=headers, params=params, json=body, timeout=timeout)
             resp.raise_for_status()
             data = resp.json()
             print(f'[Gemini API] Success! Response: {data}')
@@ -179,14 +188,19 @@ def call_gemini(prompt: Dict[str, Any]) -> Dict[str, Any]:
             except Exception:
                 last_err = ex
             print(f'[Gemini API] Error on attempt {attempt + 1}: {str(last_err)}')
-            # Exponential backoff
+            # Exponential backoff, unless the deadline leaves no time for another attempt
+            if not deadline.has_time(delay + 1):
+                out_of_time = True
+                break
             import time
             time.sleep(delay)
             delay *= 2
             continue
+    if data is None and out_of_time:
+        raise DeadlineExceeded(f"Request deadline reached before Gemini responded: {str(last_err)}")
     if data is None:
         # Try OpenAI as fallback if available
-        if openai_key:
+        if openai_key and deadline.has_time(1):
             try:
                 openai_headers = {
                     'Authorization': f'Bearer {openai_key}',
@@ -201,7 +215,7 @@ def call_gemini(prompt: Dict[str, Any]) -> Dict[str, Any]:
                     'max_tokens': 512,
                     'temperature': 0.0
                 }
-                openai_resp = requests.post('https://api.openai.com/v1/chat/completions', headers=openai_headers, json=openai_body, timeout=60)
+                openai_resp = requests.post('https://api.openai.com/v1/chat/completions', headers=openai_headers, json=openai_body, timeout=deadline.clamp(60))
                 openai_resp.raise_for_status()
                 openai_data = openai_resp.json()
                 resp_text = openai_data['choices'][0]['message']['content']
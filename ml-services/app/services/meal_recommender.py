@@ -8,6 +8,8 @@ from typing import List, Dict, Any
 import re
 import logging
 
+from .analytes import ANALYTES, conditions_for, resolve
+
 logger = logging.getLogger(__name__)
 
 # Condition-based meal database - only evidence-based recommendations
@@ -233,57 +235,18 @@ def extract_conditions_from_report(report_data: Dict[str, Any]) -> List[str]:
             if condition_key not in conditions:
                 conditions.append(condition_key)
     
-    # Check lab values for abnormal indicators
+    # Check lab values for abnormal indicators: resolve each lab to its analyte (the 'field'
+    # key set by the report processor, else its name) and apply the catalog's cut-offs
     lab_values = report_data.get("lab_values", [])
     if isinstance(lab_values, list):
         for lab in lab_values:
-            if isinstance(lab, dict):
-                param = str(lab.get("parameter", "")).lower()
-                value = lab.get("value", None)
-                
-                # Check for diabetes indicators
-                if ("glucose" in param or "hba1c" in param or "blood sugar" in param) and value:
-                    try:
-                        val_num = float(value) if isinstance(value, (int, float, str)) else 0
-                        # Glucose > 126 or HbA1c > 6.5 suggests diabetes
-                        if ("glucose" in param and val_num > 126) or ("hba1c" in param and val_num > 6.5):
-                            if "diabetes" not in conditions:
-                                conditions.append("diabetes")
-                    except:
-                        pass
-                
-                # Check for hypertension indicators
-                if ("blood pressure" in param or "systolic" in param or "diastolic" in param or "bp" in param) and value:
-                    try:
-                        val_num = float(value) if isinstance(value, (int, float, str)) else 0
-                        # BP > 140/90 suggests hypertension
-                        if val_num > 140 or val_num > 90:
-                            if "hypertension" not in conditions:
-                                conditions.append("hypertension")
-                    except:
-                        pass
-                
-                # Check for cholesterol/lipid issues
-                if ("cholesterol" in param or "ldl" in param or "triglyceride" in param) and value:
-                    try:
-                        val_num = float(value) if isinstance(value, (int, float, str)) else 0
-                        # High cholesterol indicators
-                        if ("cholesterol" in param and val_num > 200) or ("ldl" in param and val_num > 100) or ("triglyceride" in param and val_num > 150):
-                            if "hyperlipidemia" not in conditions:
-                                conditions.append("hyperlipidemia")
-                    except:
-                        pass
-                
-                # Check for anemia indicators
-                if ("hemoglobin" in param or "hematocrit" in param or "iron" in param) and value:
-                    try:
-                        val_num = float(value) if isinstance(value, (int, float, str)) else 0
-                        # Low hemoglobin suggests anemia
-                        if ("hemoglobin" in param and val_num < 12) or ("hematocrit" in param and val_num < 36) or ("iron" in param and val_num < 60):
-                            if "anemia" not in conditions:
-                                conditions.append("anemia")
-                    except:
-                        pass
+            if isinstance(lab, dict) and lab.get("value"):
+                field = lab.get("field") if lab.get("field") in ANALYTES else resolve(lab.get("parameter", ""))
+                if not field:
+                    continue
+                for condition in conditions_for(field, lab["value"], lab.get("unit")):
+                    if condition not in conditions:
+                        conditions.append(condition)
     
     return conditions
 
@@ -0,0 +1,167 @@
+"""
+ocr_cache: On-disk cache of extracted report text, keyed by the uploaded file's content.
+
+The backend calls `/process-report` again on retries and from several controllers for the
+same upload, and each call used to re-run text extraction and OCR from scratch. Entries
+are keyed by the SHA-256 of the file bytes plus the settings that change OCR output (DPI,
+page segmentation mode, language, text-layer threshold, adaptive region OCR, engine), so a renamed or re-uploaded copy
+of a document hits and a settings change misses. Each entry is one JSON file holding the
+per-page text and the text-layer tables (None when they were not extracted); the directory
+is bounded by total size and evicted least-recently-used first (reads refresh the mtime).
+"""
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from . import ocr_service
+from .faiss_service import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached structure or the extraction pipeline changes output
+CACHE_FORMAT = 2
+
+_READ_BLOCK = 1 << 20
+
+
+def ocr_settings() -> str:
+    """The OCR settings an entry depends on, as a stable string."""
+    return '|'.join([
+        str(CACHE_FORMAT),
+        os.environ.get('PDF_OCR_DPI', '300'),
+        os.environ.get('TESSERACT_PSM', ''),
+        os.environ.get('TESSERACT_LANG', ''),
+        os.environ.get('OCR_MIN_PAGE_CHARS', '20'),
+        # Read once by ocr_service at import, so use its values rather than the environment
+        str(int(ocr_service.OCR_ADAPTIVE)),
+        str(ocr_service.OCR_PROBE_DPI),
+        str(ocr_service.OCR_MIN_DPI),
+        # The engine in use: OCR_ENGINE=auto resolves by whether tesserocr is installed
+        'tesserocr' if ocr_service._use_tesserocr() else 'pytesseract',
+    ])
+
+
+def ocr_cache_key(file_path: str) -> str:
+    """SHA-256 of the file content and the OCR settings."""
+    h = hashlib.sha256()
+    h.update(ocr_settings().encode('utf-8'))
+    h.update(b'\0')
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class OcrCache:
+    """Size-bounded LRU of extracted documents ({pages, tables}), one JSON file per document."""
+
+    def __init__(self, disk_dir: Optional[str], max_bytes: int = 256 * 1024 * 1024):
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.disk_dir) and self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        entry = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data.get('pages'), list):
+                entry = data
+                # Touch so eviction sees the entry as recently used
+                os.utime(path)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.debug('OCR cache: unreadable entry %s', key, exc_info=True)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key: str, pages: List[str], tables: Optional[List[Any]] = None) -> None:
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # Write then rename so concurrent workers never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pages': pages, 'tables': tables}, f)
+            os.replace(tmp, self._path(key))
+            self._evict()
+        except Exception:
+            logger.debug('OCR cache: failed to write entry %s', key, exc_info=True)
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        for name in os.listdir(self.disk_dir):
+            if name.endswith('.json'):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global cache instance; OCR_CACHE_DIR='' or OCR_CACHE_MAX_MB=0 disables it
+_ocr_cache = OcrCache(
+    disk_dir=os.getenv('OCR_CACHE_DIR', os.path.join(DATA_DIR, 'cache', 'ocr')) or None,
+    max_bytes=int(float(os.getenv('OCR_CACHE_MAX_MB', '256')) * 1024 * 1024),
+)
+
+
+def get_ocr_cache() -> OcrCache:
+    return _ocr_cache
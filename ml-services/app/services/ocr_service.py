@@ -2,17 +2,38 @@
 ocr_service: Extracts text from PDF/image reports. Uses pytesseract for images
 and pdfminer or PyPDF2 for PDFs. Minimal fallback behaviour.
 """
-from typing import Optional, Tuple, Dict
+from typing import Any, Callable, Optional, Sequence, Tuple, Dict, List
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import io
+import itertools
+import multiprocessing
+import queue
+import tempfile
+import threading
+import time
+from functools import lru_cache
 from PIL import Image, ImageOps, ImageFilter
 try:
-    from pdf2image import convert_from_path
+    import cv2
+    import numpy as np
+except Exception:
+    cv2 = None
+    np = None
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
 except Exception:
     convert_from_path = None
+    pdfinfo_from_path = None
 try:
     import pytesseract
 except Exception:
     pytesseract = None
+try:
+    # Optional tesseract C-API bindings: engines stay loaded between pages
+    import tesserocr
+except Exception:
+    tesserocr = None
 try:
     import pdfplumber
 except Exception:
@@ -25,9 +46,38 @@ import os
 import logging
 import platform
 
+from . import deadline
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# Scanned-PDF OCR runs one page per task on a shared process pool (see `_ocr_pdf`)
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '0'))  # 0 = one per available core
+OCR_PAGE_TIMEOUT = float(os.getenv('OCR_PAGE_TIMEOUT_SECONDS', '60'))
+# Stay under the backend's 120s request timeout
+OCR_TOTAL_TIMEOUT = float(os.getenv('OCR_TOTAL_TIMEOUT_SECONDS', '110'))
+# Under a request deadline OCR stops this long before it, leaving time for the later stages
+_DEADLINE_RESERVE_SECONDS = 15.0
+# 'spawn' keeps workers clear of locks held by the server's threads at fork time
+OCR_START_METHOD = os.getenv('OCR_START_METHOD', 'spawn')
+# PDF pages with fewer non-whitespace characters in their text layer are OCR'd
+OCR_MIN_PAGE_CHARS = int(os.getenv('OCR_MIN_PAGE_CHARS', '20'))
+# 'auto' uses in-process tesserocr engines when installed, 'pytesseract' always spawns the binary
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'auto')
+# Adaptive mode (needs OpenCV): probe each page at low resolution, then OCR only its text
+# regions at a DPI chosen from the glyph height, between OCR_MIN_DPI and PDF_OCR_DPI
+OCR_ADAPTIVE = os.getenv('OCR_ADAPTIVE', '0') == '1'
+OCR_PROBE_DPI = int(os.getenv('OCR_PROBE_DPI', '72'))
+OCR_MIN_DPI = int(os.getenv('OCR_MIN_DPI', '150'))
+# Glyph height tesseract reads most reliably (its docs recommend ~20-40px capitals)
+_TARGET_GLYPH_PX = 30
+
+_pool = None
+_pool_lock = threading.Lock()
+# Idle tesserocr engines per (lang, psm); each process (server or pool worker) keeps its own
+_engines: Dict[Tuple[str, str], 'queue.SimpleQueue'] = {}
+_engines_lock = threading.Lock()
+
 def _preprocess_image(img: Image.Image) -> Image.Image:
     """Apply common preprocessing steps before OCR to improve results.
 
@@ -54,17 +104,449 @@ def _preprocess_image(img: Image.Image) -> Image.Image:
     return img
 
 
-def extract_text(file_path: str) -> str:
-    """Extract text from a PDF or image file.
+@lru_cache(maxsize=None)
+def _contrast_threshold_lut(lo: int, hi: int) -> 'np.ndarray':
+    """Autocontrast (as `ImageOps.autocontrast` computes it for min `lo` / max `hi`) followed
+    by the > 140 threshold, folded into one 256-entry lookup table."""
+    ix = np.arange(256, dtype=np.float64)
+    if hi > lo:
+        scale = 255.0 / (hi - lo)
+        stretched = np.clip((ix * scale + -lo * scale).astype(np.int64), 0, 255)
+    else:
+        stretched = ix
+    return np.where(stretched > 140, 255, 0).astype(np.uint8)
+
+
+def _preprocess_array(gray: 'np.ndarray', min_width: int = 800) -> 'np.ndarray':
+    """OpenCV counterpart of `_preprocess_image` on a writable uint8 grayscale array.
+
+    Autocontrast and thresholding are monotonic point operations, so they commute with the
+    median filter: the page is median-blurred in place and then mapped through a single
+    lookup table in place, instead of three separate full-image passes and copies. Only
+    images narrower than `min_width` are resized (a new buffer).
+    """
+    h, w = gray.shape[:2]
+    if w < min_width:
+        factor = min_width / max(1, w)
+        gray = cv2.resize(gray, (int(w * factor), int(h * factor)), interpolation=cv2.INTER_CUBIC)
+    lo, hi = cv2.minMaxLoc(gray)[:2]
+    cv2.medianBlur(gray, 3, dst=gray)
+    cv2.LUT(gray, _contrast_threshold_lut(int(lo), int(hi)), dst=gray)
+    return gray
+
+
+def _preprocess_file(path: str):
+    """Load an image file and preprocess it for OCR.
+
+    With OpenCV the file is decoded straight to grayscale and tesseract gets the uint8 array;
+    formats OpenCV cannot read, or a missing OpenCV, go through the PIL pipeline.
+    """
+    if cv2 is not None:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE | cv2.IMREAD_IGNORE_ORIENTATION)
+        if gray is not None:
+            return _preprocess_array(gray)
+    with Image.open(path) as img:
+        return _preprocess_image(img)
+
+
+def find_text_regions(gray: 'np.ndarray') -> Tuple[List[Tuple[int, int, int, int]], float]:
+    """Text regions (x, y, w, h) of a low-resolution grayscale page and its median glyph height.
+
+    Ink is split into connected components; only glyph-sized ones are kept, which drops
+    logos, rules, stamps, signatures and specks. Glyphs are joined into lines with a
+    horizontal dilation, and lines that overlap vertically (table cells of one row, side by
+    side columns) or follow each other closely are merged into full-width bands, so a table
+    row is always OCR'd as one piece. Bands are returned top to bottom.
+    """
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    candidates = (heights >= 3) & (heights <= gray.shape[0] * 0.05) & (widths <= heights * 4)
+    if not candidates.any():
+        return [], 0.0
+    glyph = float(np.median(heights[candidates]))
+    keep = np.zeros(n, dtype=bool)
+    keep[1:] = (heights >= max(2.0, glyph * 0.4)) & (heights <= glyph * 2.5) & (widths <= glyph * 4)
+    text_ink = np.where(keep[labels], 255, 0).astype(np.uint8)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, int(glyph * 2)), 1))
+    lines = cv2.dilate(text_ink, kernel)
+    contours = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+    boxes = sorted((cv2.boundingRect(c) for c in contours), key=lambda b: b[1])
+
+    bands: List[List[int]] = []
+    gap = glyph * 0.8
+    for x, y, w, h in boxes:
+        if h < glyph * 0.6 or w < glyph * 1.5:
+            continue
+        if bands and y <= bands[-1][3] + gap:
+            band = bands[-1]
+            band[0], band[2], band[3] = min(band[0], x), max(band[2], x + w), max(band[3], y + h)
+        else:
+            bands.append([x, y, x + w, y + h])
+    return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in bands], glyph
+
+
+def choose_dpi(glyph_px: float, probe_dpi: int, max_dpi: int, min_dpi: Optional[int] = None) -> int:
+    """DPI at which glyphs measured `glyph_px` tall at `probe_dpi` reach the target height."""
+    min_dpi = OCR_MIN_DPI if min_dpi is None else min_dpi
+    if glyph_px <= 0:
+        return max_dpi
+    return int(max(min(min_dpi, max_dpi), min(max_dpi, probe_dpi * _TARGET_GLYPH_PX / glyph_px)))
+
+
+def _use_tesserocr() -> bool:
+    return tesserocr is not None and OCR_ENGINE != 'pytesseract'
+
+
+def _ocr_available() -> bool:
+    return pytesseract is not None or _use_tesserocr()
+
+
+def _new_engine(lang: str, psm: str):
+    kwargs = {'lang': lang or 'eng'}
+    if psm:
+        kwargs['psm'] = int(psm)
+    tessdata = os.environ.get('TESSDATA_PREFIX')
+    if tessdata:
+        kwargs['path'] = tessdata
+    logger.info('Loading tesseract engine (lang=%s, psm=%s) in process %d', kwargs['lang'], psm or 'default', os.getpid())
+    return tesserocr.PyTessBaseAPI(**kwargs)
+
+
+def _tesserocr_text(img, lang: str, psm: str) -> str:
+    """OCR with a pooled, already-initialized tesserocr engine (traineddata loaded once).
+
+    Engines are checked out for the duration of one page, so concurrent callers never share
+    one; a new engine is only created when all existing ones are busy.
+    """
+    with _engines_lock:
+        idle = _engines.setdefault((lang, psm), queue.SimpleQueue())
+    try:
+        engine = idle.get_nowait()
+    except queue.Empty:
+        engine = _new_engine(lang, psm)
+    try:
+        if np is not None and isinstance(img, np.ndarray):
+            page = np.ascontiguousarray(img)
+            engine.SetImageBytes(page.tobytes(), page.shape[1], page.shape[0], 1, page.shape[1])
+        else:
+            engine.SetImage(img)
+        text = engine.GetUTF8Text()
+        engine.Clear()
+    except Exception:
+        # Do not return an engine in an unknown state to the pool
+        engine.End()
+        raise
+    idle.put(engine)
+    return text
+
+
+def _image_to_text(img, timeout: float = 0) -> str:
+    """OCR one preprocessed image (PIL image or uint8 array); `timeout` (seconds, 0 = none)
+    kills a stuck tesseract subprocess (pytesseract only; in-process engines run to completion,
+    bounded by the caller's overall deadline)."""
+    # allow some config flags to tune OCR
+    psm = os.environ.get('TESSERACT_PSM')
+    lang = os.environ.get('TESSERACT_LANG')
+    if _use_tesserocr():
+        try:
+            return _tesserocr_text(img, lang or '', psm or '')
+        except Exception:
+            if pytesseract is None:
+                raise
+            logger.warning('tesserocr failed; falling back to the tesseract binary', exc_info=True)
+    cfg = ''
+    if psm:
+        cfg += f' --psm {psm}'
+    if lang:
+        return pytesseract.image_to_string(img, lang=lang, config=cfg, timeout=timeout)
+    return pytesseract.image_to_string(img, config=cfg, timeout=timeout)
+
+
+def _render_gray(file_path: str, page_no: int, dpi: int, poppler_path: Optional[str], tmp: str) -> 'np.ndarray':
+    """Render one PDF page to a grayscale array (via a temporary file that is removed)."""
+    kwargs = {'dpi': dpi, 'first_page': page_no, 'last_page': page_no, 'grayscale': True}
+    if poppler_path:
+        kwargs['poppler_path'] = poppler_path
+    path = convert_from_path(file_path, output_folder=tmp, paths_only=True, output_file=f'p{dpi}', **kwargs)[0]
+    try:
+        return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    finally:
+        os.remove(path)
+
+
+def _ocr_pdf_page_adaptive(file_path: str, page_no: int, max_dpi: int, poppler_path: Optional[str],
+                           timeout: float, tmp: str) -> Optional[str]:
+    """OCR only the text regions of a page, at a DPI fitted to its glyph height.
+
+    Returns None when the probe finds no text regions, so the caller OCRs the whole page.
+    """
+    probe = _render_gray(file_path, page_no, OCR_PROBE_DPI, poppler_path, tmp)
+    regions, glyph = find_text_regions(probe)
+    if not regions:
+        return None
+    dpi = choose_dpi(glyph, OCR_PROBE_DPI, max_dpi)
+    page = _render_gray(file_path, page_no, dpi, poppler_path, tmp)
+    scale = page.shape[1] / probe.shape[1]
+    pad = int(glyph * scale * 0.5) + 2
+    texts = []
+    pixels = 0
+    for x, y, w, h in regions:
+        x0, y0 = max(0, int(x * scale) - pad), max(0, int(y * scale) - pad)
+        x1, y1 = min(page.shape[1], int((x + w) * scale) + pad), min(page.shape[0], int((y + h) * scale) + pad)
+        crop = np.ascontiguousarray(page[y0:y1, x0:x1])
+        pixels += crop.size
+        texts.append(_image_to_text(_preprocess_array(crop, min_width=0), timeout).strip())
+    logger.debug('Adaptive OCR page %d: %d regions at %d DPI, %d px (%.0f%% of the page)',
+                 page_no, len(regions), dpi, pixels, 100.0 * pixels / max(1, page.size))
+    return "\n".join(t for t in texts if t)
+
+
+def _ocr_pdf_page(file_path: str, page_no: int, dpi: int, poppler_path: Optional[str], timeout: float) -> str:
+    """Render and OCR a single PDF page (1-based). Runs in a pool worker process.
+
+    The page is rendered in grayscale (OCR converts to grayscale anyway, a third of the RGB
+    size) to a temporary file and opened from there, so a worker holds one page at a time.
+    With OCR_ADAPTIVE only the page's text regions are OCR'd (see `_ocr_pdf_page_adaptive`).
+    """
+    kwargs = {'dpi': dpi, 'first_page': page_no, 'last_page': page_no, 'grayscale': True}
+    if poppler_path:
+        kwargs['poppler_path'] = poppler_path
+    texts = []
+    with tempfile.TemporaryDirectory(prefix='ocr-page-') as tmp:
+        if OCR_ADAPTIVE and cv2 is not None:
+            text = _ocr_pdf_page_adaptive(file_path, page_no, dpi, poppler_path, timeout, tmp)
+            if text is not None:
+                return text
+        for path in convert_from_path(file_path, output_folder=tmp, paths_only=True, **kwargs):
+            texts.append(_image_to_text(_preprocess_file(path), timeout))
+    return "\n\n".join(texts)
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _pool_size() -> int:
+    return OCR_WORKERS if OCR_WORKERS > 0 else _available_cores()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_pool_size(), mp_context=multiprocessing.get_context(OCR_START_METHOD))
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop the `broken` pool; the next call starts a fresh one.
+
+    Only if it is still the shared pool: another request may already have replaced it, and
+    shutting down that healthy pool would cancel the pages it has queued.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def run_pages(fn: Callable[..., str], page_args: Sequence[Tuple[Any, ...]], total_timeout: Optional[float] = None,
+              should_cancel: Optional[Callable[[], bool]] = None, window: Optional[int] = None,
+              failed: Optional[List[int]] = None) -> List[str]:
+    """Run `fn(*args)` for every page on the shared process pool and return results in page order.
+
+    At most `window` pages (default twice the pool size) are submitted at a time; the next
+    page goes in as one finishes, so a long document never has more than a few pages queued
+    or in flight. Pages that fail, are not finished when `total_timeout` (seconds, cut to the
+    request deadline) runs out, or when `should_cancel()` turns true, yield ''. Queued pages
+    are cancelled; a page already running is bounded by its own per-page timeout (`fn` is
+    expected to enforce one). Indexes of pages without a result are appended to `failed`
+    when given.
+    """
+    total_timeout = OCR_TOTAL_TIMEOUT if total_timeout is None else total_timeout
+    limit = deadline.clamp(total_timeout, reserve=_DEADLINE_RESERVE_SECONDS)
+    cut_by_deadline = limit < total_timeout
+    window = max(1, window or 2 * _pool_size())
+    if not page_args:
+        return []
+    todo = iter(enumerate(page_args))
+    index = {}
+    pools = {}
+    results = [''] * len(page_args)
+    ok = set()
+    pending = set()
+    stop_at = time.monotonic() + limit
+    while True:
+        for i, args in itertools.islice(todo, window - len(pending)):
+            pool = _get_pool()
+            f = pool.submit(fn, *args)
+            index[f] = i
+            pools[f] = pool
+            pending.add(f)
+        if not pending:
+            break
+        remaining = stop_at - time.monotonic()
+        if remaining <= 0 or (should_cancel is not None and should_cancel()):
+            logger.warning('OCR stopped with %d of %d pages unfinished',
+                           len(page_args) - sum(f.done() for f in index), len(page_args))
+            if remaining <= 0 and cut_by_deadline:
+                deadline.mark_degraded('ocr')
+            for f in pending:
+                f.cancel()
+            break
+        # Short waits so cancellation is noticed promptly
+        done, pending = wait(pending, timeout=min(remaining, 0.25), return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                results[index[f]] = f.result() or ''
+                ok.add(index[f])
+            except BrokenProcessPool:
+                logger.exception('OCR worker pool died on page %d', index[f] + 1)
+                _reset_pool(pools[f])
+            except Exception:
+                logger.warning('OCR failed on page %d', index[f] + 1, exc_info=True)
+    if failed is not None:
+        failed.extend(i for i in range(len(page_args)) if i not in ok)
+    return results
+
+
+def _ocr_pdf(file_path: str, page_numbers: Optional[List[int]] = None,
+             should_cancel: Optional[Callable[[], bool]] = None, failed: Optional[List[int]] = None) -> List[str]:
+    """OCR PDF pages (1-based `page_numbers`, default all) in parallel; texts in the same order."""
+    poppler_path = os.environ.get('POPPLER_PATH')
+    dpi = int(os.environ.get('PDF_OCR_DPI', '300'))
+    if page_numbers is None:
+        if poppler_path:
+            pages = pdfinfo_from_path(file_path, poppler_path=poppler_path)['Pages']
+        else:
+            pages = pdfinfo_from_path(file_path)['Pages']
+        page_numbers = list(range(1, int(pages) + 1))
+    args = [(file_path, n, dpi, poppler_path, OCR_PAGE_TIMEOUT) for n in page_numbers]
+    return run_pages(_ocr_pdf_page, args, should_cancel=should_cancel, failed=failed)
+
+
+def _read_text_layer(file_path: str, with_tables: bool = False) -> Tuple[List[str], List[List[List[Optional[str]]]]]:
+    """Per-page text ('' for pages without a text layer) and, optionally, tables of a PDF.
+
+    The document is opened once with pdfplumber and pages are processed one at a time: text
+    and tables come from the same parsed page, whose cached layout objects are dropped before
+    the next page, so memory stays bounded on long reports. PyPDF2 is only used when
+    pdfplumber is unavailable or cannot parse the file.
+    """
+    pages: List[str] = []
+    tables: List[List[List[Optional[str]]]] = []
+    # Try pdfplumber first (if available)
+    if pdfplumber is not None:
+        try:
+            with pdfplumber.open(file_path) as pdf:
+                for page in pdf.pages:
+                    pages.append(page.extract_text() or "")
+                    if with_tables:
+                        tables.extend(t for t in page.extract_tables() if t)
+                    page.flush_cache()
+            return pages, tables
+        except Exception:
+            logger.exception('pdfplumber: failed to extract text from PDF; will try PyPDF2 fallback')
+            pages, tables = [], []
+    if PdfReader is not None:
+        try:
+            reader = PdfReader(file_path)
+            pages = [page.extract_text() or "" for page in reader.pages]
+        except Exception:
+            logger.exception('PyPDF2: failed to extract text from PDF')
+    return pages, tables
+
+
+def _needs_ocr(page_text: str) -> bool:
+    """True when a page's text layer is too thin to be real content (an image-only page)."""
+    return sum(not ch.isspace() for ch in page_text) < OCR_MIN_PAGE_CHARS
+
+
+def _extract_pdf_pages(file_path: str, with_tables: bool = False
+                       ) -> Tuple[List[str], List[List[List[Optional[str]]]], bool]:
+    """Per-page text of a PDF, its text-layer tables (when asked for) and whether every page
+    that needed OCR got it.
+
+    Uses the text layer where a page has one and OCRs only the pages that don't.
+    """
+    pages, tables = _read_text_layer(file_path, with_tables)
+    to_ocr = [n for n, text in enumerate(pages, 1) if _needs_ocr(text)]
+    if not (to_ocr or not pages):
+        return pages, tables, True
+    if convert_from_path is None or not _ocr_available():
+        return pages, tables, False
+    logger.info('Rendering and OCR-ing %s of %s PDF pages without a text layer',
+                len(to_ocr) if pages else 'all', len(pages) or '?')
+    failed: List[int] = []
+    try:
+        if not pages:
+            # No readable text layer at all: OCR every page
+            pages = _ocr_pdf(file_path, failed=failed)
+        else:
+            for n, text in zip(to_ocr, _ocr_pdf(file_path, to_ocr, failed=failed)):
+                if text.strip():
+                    pages[n - 1] = text
+    except Exception:
+        logger.exception('PDF -> Image OCR fallback failed')
+        return pages, tables, False
+    # If OCR didn't run or failed, return whatever the text layer had
+    return pages, tables, not failed
+
+
+def _extract_image_text(file_path: str) -> Optional[str]:
+    """OCR an image file; None when OCR is unavailable or failed."""
+    try:
+        _tess_env = os.environ.get('TESSERACT_CMD') or os.environ.get('TESSERACT_PATH')
+        if _tess_env:
+            pytesseract.pytesseract.tesseract_cmd = _tess_env
+        elif platform.system() == 'Windows':
+            # Common Windows installation paths
+            default_paths = [
+                r"C:\Program Files\Tesseract OCR\tesseract.exe",
+                r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+            ]
+            for p in default_paths:
+                if os.path.exists(p):
+                    pytesseract.pytesseract.tesseract_cmd = p
+                    logger.info('Configured Tesseract at %s', p)
+                    break
+    except Exception:
+        logger.debug('tesseract cmd configuration failed', exc_info=True)
+    if not _ocr_available():
+        logger.warning('pytesseract is not installed or could not be imported; image OCR will be skipped')
+        return None
+    try:
+        # Convert to grayscale and autoregulate contrast
+        return _image_to_text(_preprocess_file(file_path))
+    except Exception:
+        logger.exception('Image OCR failed')
+        return None
+
+
+def extract_document(file_path: str, with_tables: bool = True) -> Tuple[str, List[List[List[Optional[str]]]]]:
+    """Extract the text and, for PDFs with a text layer, the tables of a report in one pass.
+
+    Results for PDFs and images are cached on disk by file content and OCR settings (see
+    `ocr_cache`), so reprocessing an already-seen document skips extraction entirely.
+    Incomplete results (OCR unavailable, failed or timed out pages) are not cached.
 
     Args:
         file_path: path to the uploaded file on disk
+        with_tables: also extract tables (rows of cell strings, first row the header)
 
     Returns:
-        A single string with the extracted text or empty string on failure.
+        (text, tables); text is empty on failure, tables empty for non-PDF files, scanned
+        PDFs, when pdfplumber is unavailable or when `with_tables` is False.
     """
     if not os.path.exists(file_path):
-        return ""
+        return "", []
 
     ext = os.path.splitext(file_path)[1].lower()
 
@@ -72,102 +554,56 @@ def extract_text(file_path: str) -> str:
     if ext in ('.txt', '.md'):
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+                return f.read(), []
         except Exception:
             logger.exception('Failed to read text file for OCR fallback')
 
-    # Process PDF
+    # Imported here, not at the top: ocr_cache imports this module, and the OCR pool's worker
+    # processes, which import only this module, then skip faiss_service and its index
+    from .ocr_cache import get_ocr_cache, ocr_cache_key
+    cache = get_ocr_cache()
+    key = None
+    if cache.enabled:
+        try:
+            key = ocr_cache_key(file_path)
+        except OSError:
+            logger.debug('OCR cache: could not hash %s', file_path, exc_info=True)
+    entry = cache.get(key) if key else None
+    # An entry stored without tables cannot serve a request for them
+    if entry is not None and (not with_tables or entry.get('tables') is not None):
+        return "\n\n".join(entry['pages']), (entry.get('tables') or []) if with_tables else []
+
+    tables: List[List[List[Optional[str]]]] = []
     if ext == '.pdf':
-        joined = ""
-        # Try pdfplumber first (if available)
-        if pdfplumber is not None:
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    pages = [p.extract_text() or "" for p in pdf.pages]
-                joined = "\n\n".join(pages)
-            except Exception:
-                logger.exception('pdfplumber: failed to extract text from PDF; will try PyPDF2 fallback')
-                joined = ""
-        # If pdfplumber didn't yield text, try PyPDF2 (PdfReader) as fallback
-        if (not joined.strip()) and PdfReader is not None:
-            try:
-                reader = PdfReader(file_path)
-                pages = [page.extract_text() or "" for page in reader.pages]
-                joined = "\n\n".join(pages)
-            except Exception:
-                logger.exception('PyPDF2: failed to extract text from PDF')
-                joined = ""
-
-        # If text is absent, attempt to render PDF pages to images and OCR them
-        if not joined.strip():
-            # If no text found in PDF as text, try rasterizing pages and OCR
-            if convert_from_path is not None and pytesseract is not None:
-                logger.info('No text extracted from PDF, attempting image render + OCR')
-                try:
-                    poppler_path = os.environ.get('POPPLER_PATH')
-                    dpi = int(os.environ.get('PDF_OCR_DPI', '300'))
-                    if poppler_path:
-                        images = convert_from_path(file_path, dpi=dpi, poppler_path=poppler_path)
-                    else:
-                        images = convert_from_path(file_path, dpi=dpi)
-                    text_pages = []
-                    for img in images:
-                        img = _preprocess_image(img)
-                        # allow some config flags to tune OCR
-                        psm = os.environ.get('TESSERACT_PSM')
-                        lang = os.environ.get('TESSERACT_LANG')
-                        cfg = ''
-                        if psm:
-                            cfg += f' --psm {psm}'
-                        if lang:
-                            # pytesseract accepts lang param
-                            page_text = pytesseract.image_to_string(img, lang=lang, config=cfg)
-                        else:
-                            page_text = pytesseract.image_to_string(img, config=cfg)
-                        text_pages.append(page_text)
-                    return "\n\n".join(text_pages)
-                except Exception:
-                    logger.exception('PDF -> Image OCR fallback failed')
-            # If OCR fallback didn't run or failed, return whatever we have
-        return joined
+        pages, tables, complete = _extract_pdf_pages(file_path, with_tables)
     # Else: treat as image file
     else:
-        try:
-            _tess_env = os.environ.get('TESSERACT_CMD') or os.environ.get('TESSERACT_PATH')
-            if _tess_env:
-                pytesseract.pytesseract.tesseract_cmd = _tess_env
-            elif platform.system() == 'Windows':
-                # Common Windows installation paths
-                default_paths = [
-                    r"C:\Program Files\Tesseract OCR\tesseract.exe",
-                    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-                ]
-                for p in default_paths:
-                    if os.path.exists(p):
-                        pytesseract.pytesseract.tesseract_cmd = p
-                        logger.info('Configured Tesseract at %s', p)
-                        break
-        except Exception:
-            logger.debug('tesseract cmd configuration failed', exc_info=True)
-        if pytesseract is None:
-            logger.warning('pytesseract is not installed or could not be imported; image OCR will be skipped')
-            return ""
-        try:
-            img = Image.open(file_path)
-            # Convert to grayscale and autoregulate contrast
-            img = _preprocess_image(img)
-            psm = os.environ.get('TESSERACT_PSM')
-            lang = os.environ.get('TESSERACT_LANG')
-            cfg = ''
-            if psm:
-                cfg += f' --psm {psm}'
-            if lang:
-                text = pytesseract.image_to_string(img, lang=lang, config=cfg)
-            else:
-                text = pytesseract.image_to_string(img, config=cfg)
-            return text
-        except Exception:
-            logger.exception('Image OCR failed')
-            return ""
-    # best-effort fallback
-    return ""
+        text = _extract_image_text(file_path)
+        pages, complete = [text or ""], text is not None
+    if key and complete and any(p.strip() for p in pages):
+        cache.put(key, pages, tables if with_tables or ext != '.pdf' else None)
+    return "\n\n".join(pages), tables
+
+
+def extract_text(file_path: str) -> str:
+    """Extract text from a PDF or image file.
+
+    Args:
+        file_path: path to the uploaded file on disk
+
+    Returns:
+        A single string with the extracted text or empty string on failure.
+    """
+    return extract_document(file_path, with_tables=False)[0]
+
+
+def extract_tables(file_path: str) -> List[List[List[Optional[str]]]]:
+    """Extract tables from a PDF text layer with pdfplumber.
+
+    Returns a list of tables (rows of cell strings, first row the header), or an empty list
+    for non-PDF files, scanned PDFs or when pdfplumber is unavailable. Use
+    `extract_document` when the text is needed too, to parse the PDF only once.
+    """
+    if pdfplumber is None or not os.path.exists(file_path) or os.path.splitext(file_path)[1].lower() != '.pdf':
+        return []
+    return _read_text_layer(file_path, with_tables=True)[1]
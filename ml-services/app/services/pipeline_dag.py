@@ -0,0 +1,135 @@
+"""
+pipeline_dag: Runs a pipeline described as a dependency graph of stages.
+
+Each stage names the stages it depends on and receives their results as keyword arguments.
+A stage is started as soon as all of its dependencies are done, so independent branches
+(e.g. indexing alongside fact extraction, or diet planning alongside the LLM call) overlap
+and end-to-end latency approaches the critical path instead of the sum of all stages. Stages
+are I/O-bound (LLM, OCR's own process pool) or release the GIL in native code (embeddings,
+FAISS), which is why threads suffice.
+
+Each run gets its own thread pool with a thread per stage; threads are only started as
+stages are submitted, so a run uses as many as its widest point needs. A shared pool would
+make concurrent runs queue behind each other's long OCR and LLM stages while their request
+deadlines keep running. The number of concurrent runs is bounded by the callers (the
+`executors` I/O pool for /process-report, REPORT_JOB_WORKERS for background jobs).
+
+A stage may return `Halt(value)` to stop the run early; stages not yet started are skipped.
+The first stage exception cancels what has not started and is re-raised to the caller.
+Per-stage wall-clock timings are returned alongside the results. Stages run in a copy of the
+caller's context, so context variables such as the request deadline reach them.
+"""
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextvars
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+
+
+class Halt(NamedTuple):
+    """Returned by a stage to end the run early with `value` as the pipeline result."""
+    value: Any
+
+
+class DagResult(NamedTuple):
+    results: Dict[str, Any]
+    timings_ms: Dict[str, float]
+    halted: Optional[Halt] = None
+
+
+def _check(stages: Iterable[Stage]) -> Dict[str, Stage]:
+    by_name: Dict[str, Stage] = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f'Duplicate pipeline stage {stage.name!r}')
+        by_name[stage.name] = stage
+    for stage in by_name.values():
+        missing = [d for d in stage.deps if d not in by_name]
+        if missing:
+            raise ValueError(f'Stage {stage.name!r} depends on unknown stages {missing}')
+    # Kahn's algorithm: every stage must be reachable in dependency order
+    indegree = {name: len(s.deps) for name, s in by_name.items()}
+    ready = [name for name, n in indegree.items() if n == 0]
+    seen = 0
+    while ready:
+        name = ready.pop()
+        seen += 1
+        for other in by_name.values():
+            if name in other.deps:
+                indegree[other.name] -= 1
+                if indegree[other.name] == 0:
+                    ready.append(other.name)
+    if seen != len(by_name):
+        raise ValueError('Pipeline stages contain a dependency cycle')
+    return by_name
+
+
+def run_dag(stages: Iterable[Stage], on_start: Optional[Callable[[str], None]] = None,
+            executor: Optional[ThreadPoolExecutor] = None) -> DagResult:
+    """Run the stages in dependency order, independent ones concurrently.
+
+    `on_start(name)` is called (from the calling thread) as each stage is submitted. Stages
+    run on `executor` when given, else on a pool owned by this run.
+    """
+    by_name = _check(stages)
+    if executor is not None:
+        return _run(by_name, on_start, executor)
+    # One thread per stage at most; only as many are started as run at the same time
+    own = ThreadPoolExecutor(max_workers=max(1, len(by_name)), thread_name_prefix='pipeline')
+    try:
+        return _run(by_name, on_start, own)
+    finally:
+        # Stages already running after a halt or failure finish in the background
+        own.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(by_name: Dict[str, Stage], on_start: Optional[Callable[[str], None]],
+         executor: ThreadPoolExecutor) -> DagResult:
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    running: Dict[Any, str] = {}
+    remaining = dict(by_name)
+
+    def timed(stage: Stage, kwargs: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            return stage.fn(**kwargs)
+        finally:
+            timings[stage.name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def submit_ready() -> None:
+        for name in [n for n, s in remaining.items() if all(d in results for d in s.deps)]:
+            stage = remaining.pop(name)
+            if on_start is not None:
+                on_start(name)
+            # Stages see the caller's context variables (e.g. the request deadline)
+            ctx = contextvars.copy_context()
+            running[executor.submit(ctx.run, timed, stage, {d: results[d] for d in stage.deps})] = name
+
+    submit_ready()
+    while running:
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                value = future.result()
+            except Exception:
+                for other in running:
+                    other.cancel()
+                raise
+            if isinstance(value, Halt):
+                for other in running:
+                    other.cancel()
+                logger.debug('Pipeline halted by stage %s; skipped %s', name, sorted(remaining))
+                return DagResult(results, timings, value)
+            results[name] = value
+        submit_ready()
+    return DagResult(results, timings)
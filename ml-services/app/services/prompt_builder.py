@@ -1,6 +1,6 @@
 from typing import Dict, List, Any
 
-REQUIRED_FIELDS = ['fasting_glucose', 'hba1c', 'total_cholesterol', 'ldl', 'hdl', 'triglycerides', 'systolic_bp', 'diastolic_bp']
+from .analytes import REQUIRED_FIELDS
 
 
 SYSTEM_MESSAGE = (
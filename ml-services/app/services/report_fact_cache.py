@@ -0,0 +1,166 @@
+"""
+report_fact_cache: Memoizes the chatbot's per-query report analysis.
+
+Every chat turn hands the user's latest report to `ContextAggregator`, which would parse
+facts, evidence and danger flags from the same `processing_result` again. Results are
+keyed by a hash of the report text and its structured lab results (plus the parser mode),
+kept in a bounded in-process LRU and written to a small on-disk cache (one JSON file per
+report) so other workers and restarts skip parsing too. A changed report hashes to a new
+key; stale files are pruned oldest-first beyond the disk bound. Callers only `put` complete
+analyses: a parse cut short by fact_parser's time budget would otherwise be served as if
+it had read the whole report.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from . import fact_parser
+from .faiss_service import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# (facts, evidence, danger_flags)
+ReportAnalysis = Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]
+
+# Bump when the cached structure or the parser output changes shape
+CACHE_FORMAT = 1
+
+
+def report_cache_key(report: Dict[str, Any], text: str) -> str:
+    """Hash of everything the analysis depends on: text, lab results and parser mode."""
+    labs = report.get('lab_results') or report.get('labs') or report.get('results')
+    h = hashlib.sha1()
+    h.update(f'{CACHE_FORMAT}:{int(fact_parser.HARDENED)}\0'.encode('utf-8'))
+    h.update(text.encode('utf-8'))
+    h.update(b'\0')
+    h.update(json.dumps(labs, sort_keys=True, default=str).encode('utf-8'))
+    return h.hexdigest()
+
+
+class ReportFactCache:
+    """LRU cache of report analyses with an optional shared on-disk tier."""
+
+    def __init__(self, max_entries: int = 256, disk_dir: Optional[str] = None, max_disk_entries: int = 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: 'OrderedDict[str, ReportAnalysis]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[ReportAnalysis]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._copy(entry)
+        entry = self._read_disk(key)
+        if entry is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, entry)
+            return self._copy(entry)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, entry: ReportAnalysis) -> None:
+        entry = self._copy(entry)
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def get_or_compute(self, key: str, compute: Callable[[], ReportAnalysis]) -> ReportAnalysis:
+        entry = self.get(key)
+        if entry is None:
+            entry = compute()
+            self.put(key, entry)
+        return entry
+
+    @staticmethod
+    def _copy(entry: ReportAnalysis) -> ReportAnalysis:
+        facts, evidence, flags = entry
+        return dict(facts), list(evidence), list(flags)
+
+    def _remember(self, key: str, entry: ReportAnalysis) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def _read_disk(self, key: str) -> Optional[ReportAnalysis]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['facts'], data['evidence'], data['danger_flags']
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.debug('Report fact cache: unreadable entry %s', key, exc_info=True)
+            return None
+
+    def _write_disk(self, key: str, entry: ReportAnalysis) -> None:
+        if not self.disk_dir:
+            return
+        facts, evidence, flags = entry
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # Write then rename so concurrent workers never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'facts': facts, 'evidence': evidence, 'danger_flags': flags}, f, default=str)
+            os.replace(tmp, self._path(key))
+            self._prune_disk()
+        except Exception:
+            logger.debug('Report fact cache: failed to write entry %s', key, exc_info=True)
+
+    def _prune_disk(self) -> None:
+        files = [os.path.join(self.disk_dir, n) for n in os.listdir(self.disk_dir) if n.endswith('.json')]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global cache instance; REPORT_FACT_CACHE_DIR='' keeps it in-process only
+_report_fact_cache = ReportFactCache(
+    max_entries=int(os.getenv('REPORT_FACT_CACHE_SIZE', '256')),
+    disk_dir=os.getenv('REPORT_FACT_CACHE_DIR', os.path.join(DATA_DIR, 'cache', 'report_facts')) or None,
+    max_disk_entries=int(os.getenv('REPORT_FACT_CACHE_DISK_ENTRIES', '1024')),
+)
+
+
+def get_report_fact_cache() -> ReportFactCache:
+    return _report_fact_cache
@@ -0,0 +1,269 @@
+"""
+report_jobs: Background job queue for report processing, persisted in SQLite.
+
+`/process-report` runs OCR, indexing, retrieval, the LLM call and diet planning inside one
+HTTP request; the backend times out at 120s and retries, doubling the work. Jobs are
+accepted immediately, run on a bounded thread pool and polled for status, per-stage
+progress and the result, with an optional webhook called when they finish. Job rows live
+in a local SQLite file so queued (and interrupted running) jobs are picked up again after a
+restart. Several workers may share the file: a job is claimed by one conditional UPDATE,
+and a running job renews a lease (its `updated_at`) so `resume` in another worker only
+reclaims jobs whose process stopped renewing. Submitting the same request while a job for it is queued, running or done returns
+that job instead of starting a second one; callers whose request points at mutable inputs
+(a file path) pass a `key` covering their content, so a changed input starts a new job.
+
+Results are patient health data: finished jobs are deleted once they are older than the
+retention period, and webhooks are only sent to allowlisted hosts.
+
+Configuration (environment):
+- REPORT_JOBS_DB: SQLite file (default DATA_DIR/report_jobs.sqlite3)
+- REPORT_JOB_WORKERS: concurrent jobs (default 2)
+- REPORT_JOB_WEBHOOK_TIMEOUT_SECONDS: webhook request timeout (default 10)
+- REPORT_JOB_LEASE_SECONDS: a running job not renewed for this long is treated as abandoned
+  and re-queued by `resume` (default 300; renewed every third of it)
+- REPORT_JOB_RETENTION_SECONDS: finished (succeeded/failed) jobs and their results are
+  deleted after this long (default 86400; 0 keeps them)
+- REPORT_JOB_CALLBACK_HOSTS: comma-separated hosts (`host` or `host:port`) callbackUrl may
+  point at (default the BACKEND_URL host)
+"""
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import requests
+
+from .faiss_service import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.getenv('REPORT_JOBS_DB') or os.path.join(DATA_DIR, 'report_jobs.sqlite3')
+JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', '2'))
+WEBHOOK_TIMEOUT = float(os.getenv('REPORT_JOB_WEBHOOK_TIMEOUT_SECONDS', '10'))
+WEBHOOK_ATTEMPTS = 3
+JOB_LEASE_SECONDS = float(os.getenv('REPORT_JOB_LEASE_SECONDS', '300'))
+JOB_RETENTION_SECONDS = float(os.getenv('REPORT_JOB_RETENTION_SECONDS', '86400'))
+CALLBACK_HOSTS = {h.strip().lower() for h in os.getenv(
+    'REPORT_JOB_CALLBACK_HOSTS', urlparse(os.getenv('BACKEND_URL', 'http://localhost:3001')).netloc).split(',') if h.strip()}
+
+# Pipeline stages in order; progress is reported as the share of stages completed
+STAGES = ('ocr', 'chunking', 'facts', 'indexing', 'retrieval', 'rerank', 'llm', 'verify', 'format', 'diet_plan')
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+# handler(request, progress) -> result; progress(stage) is called as each stage starts
+JobHandler = Callable[[Dict[str, Any], Callable[[str], None]], Dict[str, Any]]
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id TEXT PRIMARY KEY,
+    request_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    request TEXT NOT NULL,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS report_jobs_key ON report_jobs (request_key, status);
+CREATE INDEX IF NOT EXISTS report_jobs_status ON report_jobs (status, created_at);
+'''
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(request, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def callback_allowed(url: str) -> bool:
+    """True for an http(s) URL whose host (or host:port) is in REPORT_JOB_CALLBACK_HOSTS."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return False
+    try:
+        port = parsed.port
+    except ValueError:
+        return False
+    host = parsed.hostname.lower()
+    return host in CALLBACK_HOSTS or (port is not None and f'{host}:{port}' in CALLBACK_HOSTS)
+
+
+class ReportJobQueue:
+    """Runs report jobs on a bounded pool and keeps their state in SQLite."""
+
+    def __init__(self, handler: JobHandler, db_path: str = JOBS_DB, workers: int = JOB_WORKERS):
+        self.handler = handler
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='report-job')
+
+    # ---- state ---------------------------------------------------------------------------
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields['updated_at'] = time.time()
+        cols = ', '.join(f'{k} = ?' for k in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f'UPDATE report_jobs SET {cols} WHERE id = ?', (*fields.values(), job_id))
+
+    def _row(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute('SELECT * FROM report_jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status: {jobId, status, stage, stages, progress, result, error, createdAt, updatedAt}."""
+        row = self._row(job_id)
+        if row is None:
+            return None
+        done = len(STAGES) if row['status'] == SUCCEEDED else (STAGES.index(row['stage']) if row['stage'] in STAGES else 0)
+        stages = [
+            {'name': s, 'status': 'done' if i < done else ('running' if i == done and row['status'] == RUNNING else
+                                                           ('failed' if i == done and row['status'] == FAILED else 'pending'))}
+            for i, s in enumerate(STAGES)
+        ]
+        return {
+            'jobId': row['id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'stages': stages,
+            'progress': round(done / len(STAGES), 2),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'createdAt': row['created_at'],
+            'updatedAt': row['updated_at'],
+        }
+
+    # ---- submission ----------------------------------------------------------------------
+
+    def submit(self, request: Dict[str, Any], callback_url: Optional[str] = None, key: Optional[str] = None) -> str:
+        """Queue a job and return its id (the existing job's id for a duplicate request).
+
+        Duplicates are detected by `key`, by default a hash of the request itself.
+        """
+        key = key or request_key(request)
+        self.purge()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT id FROM report_jobs WHERE request_key = ? AND status IN (?, ?, ?) ORDER BY created_at DESC LIMIT 1',
+                (key, QUEUED, RUNNING, SUCCEEDED)).fetchone()
+            if row is not None:
+                return row['id']
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._conn.execute(
+                'INSERT INTO report_jobs (id, request_key, status, stage, request, callback_url, created_at, updated_at) '
+                'VALUES (?, ?, ?, NULL, ?, ?, ?, ?)',
+                (job_id, key, QUEUED, json.dumps(request, default=str), callback_url, now, now))
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def purge(self) -> int:
+        """Delete finished jobs older than the retention period; returns how many were deleted."""
+        if JOB_RETENTION_SECONDS <= 0:
+            return 0
+        with self._lock, self._conn:
+            cur = self._conn.execute('DELETE FROM report_jobs WHERE status IN (?, ?) AND updated_at < ?',
+                                     (SUCCEEDED, FAILED, time.time() - JOB_RETENTION_SECONDS))
+        return cur.rowcount
+
+    def resume(self) -> List[str]:
+        """Pick up queued jobs and running jobs whose lease expired (their process died).
+
+        Jobs another live worker is running keep renewing their lease and are left alone.
+        """
+        self.purge()
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE report_jobs SET status = ?, stage = NULL, updated_at = ? '
+                               'WHERE status = ? AND updated_at < ?', (QUEUED, now, RUNNING, now - JOB_LEASE_SECONDS))
+            rows = self._conn.execute('SELECT id FROM report_jobs WHERE status = ? ORDER BY created_at',
+                                      (QUEUED,)).fetchall()
+        ids = [r['id'] for r in rows]
+        for job_id in ids:
+            self._executor.submit(self._run, job_id)
+        if ids:
+            logger.info('Resumed %d report jobs', len(ids))
+        return ids
+
+    # ---- execution -----------------------------------------------------------------------
+
+    def _claim(self, job_id: str) -> bool:
+        """Move a queued job to running; False when another worker (or process) got it first."""
+        with self._lock, self._conn:
+            cur = self._conn.execute('UPDATE report_jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?',
+                                     (RUNNING, time.time(), job_id, QUEUED))
+            return cur.rowcount == 1
+
+    def _renew_lease(self, job_id: str, stop: threading.Event) -> None:
+        while not stop.wait(JOB_LEASE_SECONDS / 3):
+            try:
+                with self._lock, self._conn:
+                    self._conn.execute('UPDATE report_jobs SET updated_at = ? WHERE id = ? AND status = ?',
+                                       (time.time(), job_id, RUNNING))
+            except sqlite3.Error:
+                # Queue shut down under a running job
+                return
+
+    def _run(self, job_id: str) -> None:
+        if not self._claim(job_id):
+            return
+        row = self._row(job_id)
+        stop = threading.Event()
+        threading.Thread(target=self._renew_lease, args=(job_id, stop), name='report-job-lease', daemon=True).start()
+        try:
+            self._execute(job_id, row)
+        finally:
+            stop.set()
+        if row['callback_url']:
+            self._notify(row['callback_url'], self.get(job_id))
+
+    def _execute(self, job_id: str, row: sqlite3.Row) -> None:
+        reached = [-1]
+
+        def progress(stage: str) -> None:
+            # Stages can overlap; report the furthest pipeline stage started so far
+            if stage in STAGES and STAGES.index(stage) > reached[0]:
+                reached[0] = STAGES.index(stage)
+                self._update(job_id, stage=stage)
+
+        try:
+            result = self.handler(json.loads(row['request']), progress)
+            self._update(job_id, status=SUCCEEDED, stage=STAGES[-1], result=json.dumps(result, default=str))
+        except Exception as e:
+            logger.exception('Report job %s failed', job_id)
+            self._update(job_id, status=FAILED, error=f'{type(e).__name__}: {e}')
+
+    def _notify(self, url: str, job: Dict[str, Any]) -> None:
+        if not callback_allowed(url):
+            # Accepted before the allowlist changed; never send results to other hosts
+            logger.warning('Report job webhook host not allowed, not notifying: %s', url)
+            return
+        for attempt in range(1, WEBHOOK_ATTEMPTS + 1):
+            try:
+                resp = requests.post(url, json=job, timeout=WEBHOOK_TIMEOUT)
+                if resp.status_code < 500:
+                    return
+                logger.warning('Report job webhook %s returned %s (attempt %d)', url, resp.status_code, attempt)
+            except Exception:
+                logger.warning('Report job webhook %s failed (attempt %d)', url, attempt, exc_info=True)
+            if attempt < WEBHOOK_ATTEMPTS:
+                time.sleep(min(2 ** attempt, 10))
+        logger.error('Report job webhook %s gave up for job %s', url, job['jobId'])
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,168 @@
+"""
+report_result_cache: Whole-pipeline result cache for `/process-report`.
+
+Re-uploads, demo files and retries of the same document used to run the entire pipeline
+again, LLM call included. Responses are stored in a local SQLite file (shared by the workers
+on one node, kept across restarts) keyed by the SHA-256 of the document content plus a
+pipeline signature: PIPELINE_VERSION, the prompt template, the LLM model/endpoint and the
+settings that change extraction, chunking or reranking. Changing the prompt or the model
+changes the signature, so older entries simply stop matching and age out of the bounded
+table (least recently used first).
+
+Only complete responses produced by a real LLM call are stored; fallback outputs (LLM
+unavailable) are recomputed on the next request.
+
+Configuration (environment):
+- REPORT_RESULT_CACHE_DB: SQLite file (default DATA_DIR/cache/report_results.sqlite3; '' disables)
+- REPORT_RESULT_CACHE_MAX_ENTRIES: stored responses (default 500)
+- REPORT_RESULT_CACHE_TTL_SECONDS: entry lifetime, 0 = no expiry (default 0)
+"""
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .faiss_service import DATA_DIR
+from .ocr_cache import ocr_settings
+from .prompt_builder import build_prompt
+from . import fact_parser
+
+logger = logging.getLogger(__name__)
+
+# Bump when a pipeline change alters responses in a way the signature does not capture
+PIPELINE_VERSION = 1
+
+_READ_BLOCK = 1 << 20
+
+
+def pipeline_signature() -> str:
+    """Hash of everything besides the document that determines the response."""
+    # The template is the prompt built from no facts and no evidence
+    template = build_prompt({}, [])
+    parts = [
+        str(PIPELINE_VERSION),
+        template['system'],
+        template['user'],
+        os.getenv('GEMINI_MODEL', 'models/gemini-2.5-flash'),
+        os.getenv('GEMINI_ENDPOINT', ''),
+        str(int(fact_parser.HARDENED)),
+        os.getenv('CHUNK_MODE', 'layout'),
+        os.getenv('CROSS_ENCODER_ENABLED', '0'),
+        os.getenv('CROSS_ENCODER_MODEL', ''),
+        ocr_settings(),
+    ]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def report_result_key(file_path: str) -> str:
+    """SHA-256 of the pipeline signature and the document content."""
+    h = hashlib.sha256()
+    h.update(pipeline_signature().encode('utf-8'))
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ReportResultCache:
+    """Bounded SQLite table of pipeline responses, evicted least recently used first."""
+
+    def __init__(self, db_path: Optional[str], max_entries: int = 500, ttl_seconds: float = 0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path) and self.max_entries > 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # Other worker processes use the same file; wait for their writes instead of failing
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            with self._conn:
+                self._conn.execute('CREATE TABLE IF NOT EXISTS report_results ('
+                                   'key TEXT PRIMARY KEY, response TEXT NOT NULL, '
+                                   'created_at REAL NOT NULL, used_at REAL NOT NULL)')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS report_results_used ON report_results (used_at)')
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._db()
+                row = db.execute('SELECT response, created_at FROM report_results WHERE key = ?', (key,)).fetchone()
+                if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    with db:
+                        db.execute('DELETE FROM report_results WHERE key = ?', (key,))
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                with db:
+                    db.execute('UPDATE report_results SET used_at = ? WHERE key = ?', (now, key))
+                self.hits += 1
+            return json.loads(row[0])
+        except Exception:
+            logger.debug('Report result cache: lookup failed for %s', key, exc_info=True)
+            return None
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            payload = json.dumps(response, default=str)
+            with self._lock:
+                db = self._db()
+                with db:
+                    db.execute('INSERT OR REPLACE INTO report_results (key, response, created_at, used_at) '
+                               'VALUES (?, ?, ?, ?)', (key, payload, now, now))
+                    db.execute('DELETE FROM report_results WHERE key IN (SELECT key FROM report_results '
+                               'ORDER BY used_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        except Exception:
+            logger.debug('Report result cache: failed to store %s', key, exc_info=True)
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute('DELETE FROM report_results')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global cache instance; REPORT_RESULT_CACHE_DB='' disables it
+_report_result_cache = ReportResultCache(
+    db_path=os.getenv('REPORT_RESULT_CACHE_DB', os.path.join(DATA_DIR, 'cache', 'report_results.sqlite3')) or None,
+    max_entries=int(os.getenv('REPORT_RESULT_CACHE_MAX_ENTRIES', '500')),
+    ttl_seconds=float(os.getenv('REPORT_RESULT_CACHE_TTL_SECONDS', '0')),
+)
+
+
+def get_report_result_cache() -> ReportResultCache:
+    return _report_result_cache
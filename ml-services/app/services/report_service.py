@@ -10,6 +10,8 @@ import logging
 from typing import Dict, Optional, Any
 from datetime import datetime, timedelta
 
+from . import deadline
+
 logger = logging.getLogger(__name__)
 
 
@@ -92,7 +94,11 @@ def get_user_latest_report(
         url = f"{backend_url}/api/reports/latest/{user_id}"
         logger.info(f"Fetching latest report for user {user_id} from {url}")
         
-        response = requests.get(url, timeout=timeout)
+        # Never wait past the request deadline
+        if not deadline.has_time(1):
+            logger.warning(f"No time left before the request deadline to fetch the report for user {user_id}")
+            return None
+        response = requests.get(url, timeout=deadline.clamp(timeout))
         
         if response.status_code == 200:
             report_data = response.json()
@@ -1,27 +1,55 @@
-from typing import List, Dict, Any
-import re
+from typing import List, Dict, Any, Tuple
 
+# Default score boosts for a snippet that mentions a fact's field name / exact numeric value
+NAME_BOOST = 0.15
+VALUE_BOOST = 0.25
 
-def rerank_candidates(candidates: List[Dict[str, Any]], facts: Dict[str, Any]) -> List[Dict[str, Any]]:
+
+class FactMatcher:
+    """Fact names and values compiled once per request into a table of distinct search terms.
+
+    Every fact contributes its field name (underscores as spaces) and, for numeric facts, its
+    exact value. Terms shared by several facts (e.g. two fields with value 140) are merged and
+    their boosts summed, so `boost(snippet)` lower-cases the snippet once and tests each
+    distinct term once, independent of how many candidates are scored.
+    """
+
+    def __init__(self, facts: Dict[str, Any], name_boost: float = NAME_BOOST, value_boost: float = VALUE_BOOST):
+        weights: Dict[str, float] = {}
+        for term, weight in self._terms(facts, name_boost, value_boost):
+            weights[term] = weights.get(term, 0.0) + weight
+        self.terms: List[Tuple[str, float]] = list(weights.items())
+
+    @staticmethod
+    def _terms(facts: Dict[str, Any], name_boost: float, value_boost: float) -> List[Tuple[str, float]]:
+        terms = []
+        for f, v in facts.items():
+            terms.append((str(f).replace('_', ' '), name_boost))
+            if isinstance(v, (int, float)):
+                terms.append((str(v), value_boost))
+        # Snippets are lower-cased before matching, so a term holding upper-case characters
+        # can never match; drop those (and empty terms) up front
+        return [(t, w) for t, w in terms if t and t == t.lower()]
+
+    def boost(self, snippet: str) -> float:
+        if not self.terms or not snippet:
+            return 0.0
+        text = snippet.lower()
+        return sum(w for t, w in self.terms if t in text)
+
+
+def rerank_candidates(candidates: List[Dict[str, Any]], facts: Dict[str, Any],
+                      name_boost: float = NAME_BOOST, value_boost: float = VALUE_BOOST) -> List[Dict[str, Any]]:
     """Rerank by boosting candidates that directly contain the fact value or field name.
     Keep the structure of the candidate and return a newly scored list.
+
+    Each fact adds `name_boost` when its field name occurs in the snippet and `value_boost`
+    when its exact numeric value does.
     """
+    matcher = FactMatcher(facts, name_boost=name_boost, value_boost=value_boost)
     reranked = []
     for c in candidates:
-        score = c.get('score', 0.0)
-        snippet = c.get('snippet', '').lower()
-
-        # Boost if snippet mentions a fact name or exact numeric value
-        for f, v in facts.items():
-            if f.replace('_', ' ') in snippet:
-                score += 0.15
-            try:
-                if isinstance(v, (int, float)) and str(v) in snippet:
-                    score += 0.25
-            except Exception:
-                pass
-
-        c['score'] = score
+        c['score'] = c.get('score', 0.0) + matcher.boost(c.get('snippet', ''))
         reranked.append(c)
 
     reranked.sort(key=lambda x: x['score'], reverse=True)
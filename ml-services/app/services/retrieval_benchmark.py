@@ -0,0 +1,260 @@
+"""
+retrieval_benchmark: Quality/latency benchmark for the report retrieval pipeline.
+
+Runs a labelled query set through `retrieve_candidates` (and optionally `rerank_candidates`)
+for several retrieval configurations - index type (flat/IVF/HNSW), hybrid embedding weight,
+reranker on/off and, with `'cross_encoder': True`, the cross-encoder stage - and reports recall@k, nDCG@k, MRR, hit rate and p50/p95/p99 latency using
+the batch metrics in `scorer`. Results can be appended to a JSON trend file so every index or
+retrieval change can be judged on both quality and speed.
+
+Two query sources are supported:
+- synthetic reports: generated lab reports with known values; each fact is a query whose
+  relevant chunks are the ones containing that lab line.
+- the `data/` store: documents from `docs.json` plus the synthetic reports as distractors,
+  queried with the free-text queries of a labelled JSON file (see
+  `test_data/retrieval_queries.json`).
+"""
+from typing import List, Dict, Any, Optional
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .chunker import chunk_text
+from .vector_db import Indexer
+from .retriever import retrieve_candidates, build_fact_query, DEFAULT_EMB_WEIGHT
+from .reranker import rerank_candidates
+from .cross_encoder import cross_encoder_rerank
+from .scorer import encode_id_matrices, batch_metrics
+from .faiss_service import DOCS_PATH, DATA_DIR
+
+QUERY_SET_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'test_data', 'retrieval_queries.json')
+TREND_PATH = os.getenv('RETRIEVAL_BENCH_TREND_PATH', os.path.join(DATA_DIR, 'benchmarks', 'retrieval_trend.json'))
+
+DEFAULT_CONFIGS = [
+    {'name': f'{index_type}-w{weight}-{"rerank" if rerank else "norerank"}',
+     'index_type': index_type, 'emb_weight': weight, 'rerank': rerank}
+    for index_type in ('flat', 'ivf', 'hnsw')
+    for weight in (DEFAULT_EMB_WEIGHT, 0.35)
+    for rerank in (False, True)
+]
+
+# (field, label, unit, low, high) used to generate synthetic lab lines
+_SYNTHETIC_LABS = [
+    ('fasting_glucose', 'Fasting Glucose', 'mg/dL', 70, 220),
+    ('hba1c', 'HbA1c', '%', 4.5, 11.0),
+    ('total_cholesterol', 'Total Cholesterol', 'mg/dL', 140, 300),
+    ('ldl', 'LDL', 'mg/dL', 60, 220),
+    ('hdl', 'HDL', 'mg/dL', 25, 90),
+    ('triglycerides', 'Triglycerides', 'mg/dL', 60, 400),
+    ('hemoglobin', 'Hemoglobin', 'g/dL', 9.0, 17.5),
+]
+
+_FILLER = [
+    'Patient was seen in the outpatient clinic for routine follow-up.',
+    'No acute distress noted during the examination.',
+    'Medication adherence was discussed with the patient.',
+    'Patient reports moderate physical activity and a mixed diet.',
+    'Sample collected after an overnight fast of at least 8 hours.',
+    'Results should be interpreted in the clinical context.',
+    'Follow-up visit recommended in three months.',
+    'Family history is notable for cardiovascular disease.',
+]
+
+
+def generate_synthetic_reports(n: int = 20, seed: int = 7, filler_lines: int = 40) -> List[Dict[str, Any]]:
+    """Generate deterministic lab reports with known values.
+
+    Returns a list of dicts {id, text, facts, lines} where `lines` maps field -> lab line text.
+    """
+    rng = random.Random(seed)
+    reports = []
+    for i in range(n):
+        body = []
+        facts = {}
+        lines = {}
+        for field, label, unit, low, high in _SYNTHETIC_LABS:
+            if isinstance(low, float):
+                value = round(rng.uniform(low, high), 1)
+            else:
+                value = rng.randint(low, high)
+            line = f'{label}: {value} {unit}'
+            facts[field] = value
+            lines[field] = line
+            body.append(line)
+            # Narrative filler spreads the lab lines over several chunks
+            body.extend(rng.choice(_FILLER) for _ in range(rng.randint(1, filler_lines)))
+        reports.append({
+            'id': f'synthetic_report_{i}',
+            'text': f'LAB REPORT #{i}\n' + '\n'.join(body),
+            'facts': facts,
+            'lines': lines,
+        })
+    return reports
+
+
+def build_report_queries(reports: List[Dict[str, Any]], chunk_size: int = 800, overlap: int = 100) -> List[Dict[str, Any]]:
+    """Turn synthetic reports into per-fact queries over each report's own chunks."""
+    queries = []
+    for report in reports:
+        chunks = chunk_text(report['text'], chunk_size=chunk_size, overlap=overlap)
+        for field, value in report['facts'].items():
+            line = report['lines'][field]
+            relevant = [c['id'] for c in chunks if line in c['text']]
+            if not relevant:
+                continue
+            queries.append({
+                'corpus': report['id'],
+                'chunks': chunks,
+                'facts': {field: value},
+                'query': None,
+                'relevant_ids': relevant,
+            })
+    return queries
+
+
+def load_store_queries(path: str = QUERY_SET_PATH, docs_path: str = DOCS_PATH,
+                       reports: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Load the labelled free-text queries over the `data/` store.
+
+    The store documents (plus synthetic reports as distractors) form a single corpus.
+    Queries referencing documents that are not in the store are dropped.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        labelled = json.load(f)
+    docs = []
+    if os.path.exists(docs_path):
+        with open(docs_path, 'r', encoding='utf-8') as f:
+            docs = json.load(f)
+    chunks = [{'id': d['id'], 'text': d['content']} for d in docs]
+    chunks += [{'id': r['id'], 'text': r['text']} for r in (reports or [])]
+    known = {c['id'] for c in chunks}
+
+    queries = []
+    for item in labelled.get('queries', []):
+        relevant = [r for r in item.get('relevant_ids', []) if r in known]
+        if not relevant:
+            continue
+        queries.append({
+            'corpus': 'store',
+            'chunks': chunks,
+            'facts': item.get('facts', {}),
+            'query': item.get('query'),
+            'relevant_ids': relevant,
+        })
+    return queries
+
+
+def _percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    if not latencies_ms:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    p50, p95, p99 = np.percentile(np.asarray(latencies_ms), [50, 95, 99])
+    return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+
+def _mean(values: np.ndarray) -> float:
+    return round(float(values.mean()), 4) if len(values) else 0.0
+
+
+def run_config(config: Dict[str, Any], queries: List[Dict[str, Any]], k: int = 5, top_k: int = 12) -> Dict[str, Any]:
+    """Run every query under one retrieval configuration and aggregate metrics."""
+    indexers: Dict[str, Indexer] = {}
+    index_ms = []
+    latencies = []
+    retrieved_lists = []
+
+    for q in queries:
+        indexer = indexers.get(q['corpus'])
+        if indexer is None:
+            indexer = Indexer(index_type=config.get('index_type', 'flat'))
+            t0 = time.perf_counter()
+            indexer.index_chunks(q['chunks'])
+            index_ms.append((time.perf_counter() - t0) * 1000)
+            indexers[q['corpus']] = indexer
+
+        t0 = time.perf_counter()
+        candidates = retrieve_candidates(indexer, q['chunks'], q['facts'], top_k=top_k,
+                                         query=q['query'], emb_weight=config.get('emb_weight', DEFAULT_EMB_WEIGHT))
+        if config.get('rerank'):
+            candidates = rerank_candidates(candidates, q['facts'])
+        if config.get('cross_encoder'):
+            candidates, _ = cross_encoder_rerank(q['query'] or build_fact_query(q['facts']), candidates)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        retrieved_lists.append([c['id'] for c in candidates[:k]])
+
+    retrieved, relevant = encode_id_matrices(retrieved_lists, [q['relevant_ids'] for q in queries])
+    metrics = batch_metrics(retrieved, relevant, k)
+
+    from . import vector_db
+    result = {
+        'config': config,
+        'queries': len(queries),
+        'k': k,
+        f'recall@{k}': _mean(metrics['recall']),
+        f'ndcg@{k}': _mean(metrics['ndcg']),
+        f'mrr@{k}': _mean(metrics['mrr']),
+        'hit_rate': _mean(metrics['hit_rate']),
+        'index_build_ms': round(float(np.mean(index_ms)), 3) if index_ms else 0.0,
+        # The index type only takes effect when faiss is importable
+        'faiss': bool(vector_db.use_faiss),
+    }
+    result.update(_percentiles(latencies))
+    return result
+
+
+def run_benchmark(configs: Optional[List[Dict[str, Any]]] = None, n_reports: int = 20, k: int = 5,
+                  query_set_path: str = QUERY_SET_PATH, seed: int = 7) -> Dict[str, Any]:
+    """Run all configurations over synthetic report queries and the labelled store queries."""
+    configs = configs or DEFAULT_CONFIGS
+    reports = generate_synthetic_reports(n_reports, seed=seed)
+    suites = {
+        'synthetic_reports': build_report_queries(reports),
+        'store': load_store_queries(query_set_path, reports=reports),
+    }
+    results = []
+    for config in configs:
+        for suite, queries in suites.items():
+            if not queries:
+                continue
+            res = run_config(config, queries, k=k)
+            res['suite'] = suite
+            results.append(res)
+    return {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'commit': _git_commit(),
+        'n_reports': n_reports,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def append_trend(run: Dict[str, Any], path: str = TREND_PATH) -> str:
+    """Append a benchmark run to the JSON trend file (a list of runs) and return its path."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    history = []
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except Exception:
+            history = []
+    history.append(run)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    return path
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(__file__), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
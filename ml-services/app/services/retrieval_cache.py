@@ -0,0 +1,115 @@
+"""
+retrieval_cache: Query-level cache for knowledge-base retrieval in the chatbot.
+
+Repeated chatbot questions ("what does my cholesterol mean", platform questions) skip
+embedding and vector search. Entries are keyed by (normalized query, namespace, store
+version, k) and evicted LRU with a TTL. `FaissStore` notifies the cache on every
+mutation, which drops the entries of that namespace; the version in the key also
+guarantees a stale entry is never served. Hit ratio and saved latency are exposed via
+`stats()`.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, int, int]
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case, collapse whitespace and strip trailing punctuation."""
+    q = re.sub(r'\s+', ' ', (query or '').strip().lower())
+    return q.rstrip(' ?!.')
+
+
+class RetrievalCache:
+    """LRU + TTL cache of retrieval results with per-namespace invalidation."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: 'OrderedDict[CacheKey, Tuple[List[Dict[str, Any]], float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                results, stored_at, cost_ms = entry
+                if time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_ms += cost_ms
+                    return list(results)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: CacheKey, results: List[Dict[str, Any]], cost_ms: float) -> None:
+        """Store results with the latency it took to compute them (credited on every hit)."""
+        with self._lock:
+            self._entries[key] = (list(results), time.monotonic(), cost_ms)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        """Drop entries for one namespace, or everything when namespace is None."""
+        with self._lock:
+            if namespace is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [k for k in self._entries if k[1] == namespace]
+                for k in stale:
+                    del self._entries[k]
+                dropped = len(stale)
+            self.invalidations += dropped
+        if dropped:
+            logger.debug('Retrieval cache: invalidated %d entries for namespace %s', dropped, namespace or '*')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'saved_latency_ms': round(self.saved_ms, 2),
+                'invalidations': self.invalidations,
+            }
+
+
+# Global cache instance
+_retrieval_cache = RetrievalCache(
+    max_entries=int(os.getenv('RETRIEVAL_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.getenv('RETRIEVAL_CACHE_TTL_SECONDS', '600')),
+)
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    return _retrieval_cache
+
+
+def cached_search(store, query: str, k: int, embed: Callable[[str], List[float]],
+                  cache: Optional[RetrievalCache] = None) -> List[Dict[str, Any]]:
+    """Embed + search `store` for `query`, serving repeated queries from the cache."""
+    cache = cache or _retrieval_cache
+    key = (normalize_query(query), store.namespace, store.version, k)
+    results = cache.get(key)
+    if results is not None:
+        return results
+    t0 = time.perf_counter()
+    results = store.search(embed(query), k=k)
+    cache.set(key, results, (time.perf_counter() - t0) * 1000)
+    return results
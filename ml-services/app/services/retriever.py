@@ -1,19 +1,33 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .vector_db import Indexer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
 
-def retrieve_candidates(indexer: Indexer, chunks: List[Dict[str, Any]], facts: Dict[str, Any], top_k: int = 12) -> List[Dict[str, Any]]:
+DEFAULT_EMB_WEIGHT = 0.65
+
+
+def build_fact_query(facts: Dict[str, Any]) -> str:
+    """Build the keyword query used for retrieval from extracted facts."""
+    fact_tokens = []
+    for k, v in facts.items():
+        fact_tokens.append(f"{k} {v}")
+    return ' '.join(fact_tokens) if fact_tokens else 'medical report'
+
+
+def retrieve_candidates(indexer: Optional[Indexer], chunks: List[Dict[str, Any]], facts: Dict[str, Any], top_k: int = 12,
+                        query: Optional[str] = None, emb_weight: float = DEFAULT_EMB_WEIGHT) -> List[Dict[str, Any]]:
     """Perform a hybrid retrieval: TF-IDF keyword matching + embedding similarity.
     Returns a list of candidates with snippet and raw scores.
+
+    `query` overrides the keyword query built from facts; `emb_weight` is the share of the
+    embedding score in the combined score (the remainder goes to TF-IDF). Without an
+    `indexer` (chunks not embedded) candidates are ranked by TF-IDF alone.
     """
     # 1. Build a simple keyword query from facts
-    fact_tokens = []
-    for k, v in facts.items():
-        fact_tokens.append(f"{k} {v}")
-    query = ' '.join(fact_tokens) if fact_tokens else 'medical report'
+    if query is None:
+        query = build_fact_query(facts)
 
     # 2. TF-IDF matching
     texts = [c['text'] for c in chunks]
@@ -26,7 +40,10 @@ def retrieve_candidates(indexer: Indexer, chunks: List[Dict[str, Any]], facts: D
         sims = np.zeros(len(texts))
 
     # 3. Embedding-based retrieval
-    emb_results = indexer.search_by_embedding(query, top_k=top_k)
+    if indexer is None:
+        emb_results, emb_weight = [], 0.0
+    else:
+        emb_results = indexer.search_by_embedding(query, top_k=top_k)
     emb_map = {r['id']: r['score'] for r in emb_results}
 
     candidates = []
@@ -38,8 +55,12 @@ def retrieve_candidates(indexer: Indexer, chunks: List[Dict[str, Any]], facts: D
             'tfidf_score': float(sims[i]),
             'emb_score': float(emb_map.get(cid, 0.0))
         }
+        if 'hash' in chunks[i]:
+            cand['hash'] = chunks[i]['hash']
+        if 'start' in chunks[i]:
+            cand['start'], cand['end'] = chunks[i]['start'], chunks[i]['end']
         # combine scores: weight embeddings stronger but allow tfidf to influence
-        cand['score'] = 0.65 * cand['emb_score'] + 0.35 * cand['tfidf_score']
+        cand['score'] = emb_weight * cand['emb_score'] + (1.0 - emb_weight) * cand['tfidf_score']
         candidates.append(cand)
 
     # sort and return top_k
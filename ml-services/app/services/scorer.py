@@ -1,5 +1,8 @@
-from typing import Dict, Any, List
-import math
+from typing import Dict, Any, List, Hashable, Optional, Sequence, Tuple
+import numpy as np
+
+# Padding value for the id matrices used by the batch metrics
+PAD_ID = -1
 
 
 def score_output(model_output: Dict[str, Any], verified: bool, issues: List[str]) -> float:
@@ -15,32 +18,117 @@ def score_output(model_output: Dict[str, Any], verified: bool, issues: List[str]
     return max(0.0, min(1.0, score))
 
 
+def encode_id_matrices(retrieved_lists: Sequence[Sequence[Hashable]], relevant_lists: Sequence[Sequence[Hashable]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Map per-query ID lists to padded int64 matrices sharing one vocabulary.
+
+    Returns (retrieved, relevant) with shapes (Q, K) and (Q, M); missing slots hold PAD_ID.
+    """
+    vocab: Dict[Hashable, int] = {}
+
+    def encode(lists):
+        width = max((len(ids) for ids in lists), default=0)
+        out = np.full((len(lists), width), PAD_ID, dtype=np.int64)
+        for i, ids in enumerate(lists):
+            if ids:
+                out[i, :len(ids)] = [vocab.setdefault(x, len(vocab)) for x in ids]
+        return out
+
+    return encode(retrieved_lists), encode(relevant_lists)
+
+
+def _match(retrieved: np.ndarray, relevant: np.ndarray) -> np.ndarray:
+    """(Q, K, M) boolean tensor: retrieved[q, i] == relevant[q, j], ignoring padding."""
+    return ((retrieved[:, :, None] == relevant[:, None, :])
+            & (retrieved[:, :, None] != PAD_ID)
+            & (relevant[:, None, :] != PAD_ID))
+
+
+def relevance_mask(retrieved: np.ndarray, relevant: np.ndarray) -> np.ndarray:
+    """(Q, K) mask of retrieved positions that hold a relevant id."""
+    return _match(retrieved, relevant).any(axis=2)
+
+
+def _n_relevant(relevant: np.ndarray) -> np.ndarray:
+    return (relevant != PAD_ID).sum(axis=1)
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num = num.astype(np.float64)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def _batch_from_match(match: np.ndarray, n_rel: np.ndarray, k: int) -> Dict[str, np.ndarray]:
+    mask = match.any(axis=2)
+    topk = mask[:, :k]
+    # recall counts relevant ids that occur anywhere in the top k
+    found = match[:, :k, :].any(axis=1).sum(axis=1)
+    first = np.argmax(topk, axis=1) if topk.shape[1] else np.zeros(len(topk), dtype=np.int64)
+    mrr = np.where(topk.any(axis=1), 1.0 / (first + 1), 0.0)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (topk * discounts[:topk.shape[1]]).sum(axis=1)
+    ideal = np.concatenate(([0.0], np.cumsum(discounts)))[np.minimum(n_rel, k)]
+    return {
+        'hit_rate': _safe_div(mask.sum(axis=1), n_rel),
+        'recall': _safe_div(found, n_rel),
+        'mrr': np.where(n_rel > 0, mrr, 0.0),
+        'ndcg': _safe_div(dcg, ideal),
+    }
+
+
+def batch_metrics(retrieved: np.ndarray, relevant: np.ndarray, k: int) -> Dict[str, np.ndarray]:
+    """Compute hit rate, recall@k, MRR@k and nDCG@k for all queries at once.
+
+    Args:
+        retrieved: (Q, K) int matrix of ranked ids, padded with PAD_ID
+        relevant: (Q, M) int matrix of relevant ids, padded with PAD_ID
+        k: rank cutoff
+
+    Returns:
+        Dict of (Q,) float arrays keyed 'hit_rate', 'recall', 'mrr', 'ndcg'.
+        Queries without relevant ids score 0.0 on every metric.
+    """
+    return _batch_from_match(_match(retrieved, relevant), _n_relevant(relevant), k)
+
+
+def batch_hit_rate(retrieved: np.ndarray, relevant: np.ndarray) -> np.ndarray:
+    return _safe_div(relevance_mask(retrieved, relevant).sum(axis=1), _n_relevant(relevant))
+
+
+def batch_recall_at_k(retrieved: np.ndarray, relevant: np.ndarray, k: int) -> np.ndarray:
+    return batch_metrics(retrieved, relevant, k)['recall']
+
+
+def batch_mrr(retrieved: np.ndarray, relevant: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    return batch_metrics(retrieved, relevant, k or max(1, retrieved.shape[1]))['mrr']
+
+
+def batch_ndcg_at_k(retrieved: np.ndarray, relevant: np.ndarray, k: int) -> np.ndarray:
+    return batch_metrics(retrieved, relevant, k)['ndcg']
+
+
+def _single(retrieved_ids: List[str], relevant_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    return encode_id_matrices([list(retrieved_ids)], [list(relevant_ids)])
+
+
 def hit_rate(retrieved_ids: List[str], relevant_ids: List[str]) -> float:
     if not relevant_ids:
         return 0.0
-    hits = sum(1 for r in retrieved_ids if r in relevant_ids)
-    return hits / len(relevant_ids)
+    return float(batch_hit_rate(*_single(retrieved_ids, relevant_ids))[0])
 
 
 def recall_at_k(retrieved_ids: List[str], relevant_ids: List[str], k: int) -> float:
     if not relevant_ids:
         return 0.0
-    retrieved_topk = set(retrieved_ids[:k])
-    hits = sum(1 for r in relevant_ids if r in retrieved_topk)
-    return hits / len(relevant_ids)
+    return float(batch_recall_at_k(*_single(retrieved_ids, relevant_ids), k)[0])
 
 
-def ndcg_at_k(retrieved_ids: List[str], relevant_ids: List[str], k: int) -> float:
+def mrr(retrieved_ids: List[str], relevant_ids: List[str], k: Optional[int] = None) -> float:
     if not relevant_ids:
         return 0.0
-    def dcg(rank_list):
-        score = 0.0
-        for i, r in enumerate(rank_list[:k]):
-            rel = 1.0 if r in relevant_ids else 0.0
-            score += (2**rel - 1) / math.log2(i + 2)
-        return score
-    ideal = sorted([1 if r in relevant_ids else 0 for r in retrieved_ids], reverse=True)
-    idcg = dcg(ideal)
-    if idcg == 0:
+    return float(batch_mrr(*_single(retrieved_ids, relevant_ids), k)[0])
+
+
+def ndcg_at_k(retrieved_ids: List[str], relevant_ids: List[str], k: int) -> float:
+    if not relevant_ids:
         return 0.0
-    return dcg(retrieved_ids) / idcg
+    return float(batch_ndcg_at_k(*_single(retrieved_ids, relevant_ids), k)[0])
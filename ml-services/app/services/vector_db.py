@@ -16,9 +16,15 @@ use_st = False
 use_faiss = False
 
 
+INDEX_TYPES = ('flat', 'ivf', 'hnsw')
+
+
 class Indexer:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', index_type: str = 'flat'):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f'Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}')
         self.model_name = model_name
+        self.index_type = index_type
         self.model = None
         # Attempt to lazily import SentenceTransformer and build the model only
         # if the dependency is present and can be initialized. If an error
@@ -64,16 +70,37 @@ class Indexer:
                 dim = emb.shape[1]
             except Exception:
                 dim = len(emb[0])
-            self._faiss_index = faiss.IndexFlatIP(dim)
             # faiss expects numpy arrays
             import numpy as _np
-            self._faiss_index.add(_np.array(emb, dtype='float32'))
+            xb = _np.array(emb, dtype='float32')
+            self._faiss_index = self._build_faiss_index(dim, xb)
+            self._faiss_index.add(xb)
             use_faiss = True
         except Exception:
             # If faiss fails to import or initialize, fall back to numpy/scikit search
             self._faiss_index = None
             use_faiss = False
 
+    def _build_faiss_index(self, dim: int, xb):
+        """Create the faiss index for `self.index_type`, training it when required."""
+        if self.index_type == 'ivf':
+            # Keep nlist small relative to the corpus: a single report only yields a handful of chunks
+            nlist = max(1, min(int(math.sqrt(len(xb))), len(xb)))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            # Small corpora are expected here; silence faiss' "too few training points" warning
+            index.cp.min_points_per_centroid = 1
+            index.train(xb)
+            index.nprobe = max(1, nlist // 4)
+            # faiss only keeps a reference to the quantizer; hold on to it for the index lifetime
+            self._faiss_quantizer = quantizer
+            return index
+        if self.index_type == 'hnsw':
+            index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = 64
+            return index
+        return faiss.IndexFlatIP(dim)
+
     def search_by_embedding(self, query: str, top_k: int = 5):
         if self.model:
             q_emb = self.model.encode([query])
@@ -90,6 +117,9 @@ class Indexer:
             ids = I[0].tolist()
             results = []
             for idx, score in zip(ids, D[0].tolist()):
+                # faiss pads with -1 when fewer than top_k vectors are reachable
+                if idx < 0:
+                    continue
                 results.append({
                     'id': self._ids[idx],
                     'text': self._chunks[idx]['text'],
@@ -18,6 +18,8 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import urljoin, urlparse
 import re
 
+from . import deadline
+
 logger = logging.getLogger(__name__)
 
 class WebsiteScraper:
@@ -45,8 +47,11 @@ class WebsiteScraper:
         try:
             if not self.session:
                 return {'error': 'requests not installed; enable web scraping by installing requests: pip install requests'}
-            # First, get the main page
-            response = self.session.get(url, timeout=10)
+            # First, get the main page (requests get at most the time left before the deadline)
+            if not deadline.has_time(2):
+                deadline.mark_degraded('scrape')
+                return {}
+            response = self.session.get(url, timeout=deadline.clamp(10))
             response.raise_for_status()
 
             soup = BeautifulSoup(response.content, 'lxml')
@@ -57,15 +62,20 @@ class WebsiteScraper:
             # Find and scrape linked pages
             links = self._find_internal_links(soup, url)
             for link in links[:max_pages-1]:  # -1 because we already scraped main page
+                if not deadline.has_time(2):
+                    # Keep what was scraped so far rather than run into the request deadline
+                    logger.info(f"Request deadline near; stopping crawl after {len(scraped_pages)} pages")
+                    deadline.mark_degraded('scrape')
+                    break
                 try:
-                    page_response = self.session.get(link, timeout=10)
+                    page_response = self.session.get(link, timeout=deadline.clamp(10))
                     page_response.raise_for_status()
 
                     page_soup = BeautifulSoup(page_response.content, 'lxml')
                     page_content = self._extract_content(page_soup, link)
                     scraped_pages[link] = page_content
 
-                    time.sleep(1)  # Be respectful to the server
+                    time.sleep(deadline.clamp(1))  # Be respectful to the server
                 except Exception as e:
                     logger.warning(f"Failed to scrape {link}: {e}")
                     continue
@@ -99,12 +109,12 @@ class WebsiteScraper:
             driver = webdriver.Chrome(service=service, options=chrome_options)
 
             driver.get(url)
-            WebDriverWait(driver, 10).until(
+            WebDriverWait(driver, deadline.clamp(10)).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
 
             # Wait a bit for dynamic content to load
-            time.sleep(3)
+            time.sleep(deadline.clamp(3))
 
             soup = BeautifulSoup(driver.page_source, 'lxml')
             content = self._extract_content(soup, url)
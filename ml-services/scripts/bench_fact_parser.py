@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Times `extract_facts_and_evidence` on long synthetic reports (default 100 pages), checks
+parity against the golden corpus in test_data/ and, with --adversarial, times the hardened
+and original patterns on adversarial OCR output of growing size: linear patterns take ~4x as
+long for each 4x larger input.
+
+Usage:
+    python scripts/bench_fact_parser.py [--pages 100] [--repeat 10] [--adversarial]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.services.fact_parser import extract_facts_and_evidence
+from app.services.retrieval_benchmark import generate_synthetic_reports
+
+
+# Adversarial OCR output generators: size in characters -> text
+ADVERSARIAL = {
+    'name_whitespace': lambda n: 'name:' + ' ' * n + '1',
+    'repeated_labels': lambda n: 'patient name ' * (n // 13) + '1',
+    'label_padding': lambda n: ('glucose' + ' ' * 50 + 'x') * (n // 58),
+    'digit_runs': lambda n: ('1.' + '1' * 50 + ' ') * (n // 53),
+    'ocr_garbage': lambda n: ''.join('aB .:|lI1 \n'[(i * 7919) % 11] for i in range(n)),
+}
+ADVERSARIAL_SIZES = (4000, 16000, 64000)
+# The original patterns are quadratic on some inputs; only time them on the smaller sizes
+ORIGINAL_MAX_SIZE = 16000
+
+
+def run_adversarial() -> None:
+    print(f"{'input':<16} {'mode':<9} " + ' '.join(f'{n:>9}' for n in ADVERSARIAL_SIZES) + '  (ms)')
+    for name, gen in ADVERSARIAL.items():
+        for hardened in (True, False):
+            cells = []
+            for n in ADVERSARIAL_SIZES:
+                if not hardened and n > ORIGINAL_MAX_SIZE:
+                    cells.append(f"{'-':>9}")
+                    continue
+                text = gen(n)
+                t0 = time.perf_counter()
+                extract_facts_and_evidence(text, hardened=hardened, time_budget_ms=0)
+                cells.append(f'{(time.perf_counter() - t0) * 1000:>9.2f}')
+            print(f"{name:<16} {'hardened' if hardened else 'original':<9} " + ' '.join(cells))
+
+
+def check_golden() -> int:
+    corpus = json.loads((ROOT / 'test_data' / 'fact_parser_corpus.json').read_text(encoding='utf-8'))
+    golden = json.loads((ROOT / 'test_data' / 'fact_parser_golden.json').read_text(encoding='utf-8'))
+    mismatches = 0
+    for case in corpus['cases']:
+        facts, evidence = extract_facts_and_evidence(case['text'], hardened=True)
+        got = [{k: e[k] for k in ('fields', 'start', 'end')} for e in evidence]
+        expected = golden[case['name']]
+        if list(facts.items()) != list(expected['facts'].items()) or got != expected['evidence']:
+            print(f'[bench_fact_parser] golden mismatch: {case["name"]}')
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fact extraction latency benchmark')
+    parser.add_argument('--pages', type=int, default=100, help='pages per synthetic report')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per report')
+    parser.add_argument('--adversarial', action='store_true', help='time hardened vs original patterns on adversarial input')
+    args = parser.parse_args()
+
+    sample = (ROOT / 'test_data' / 'sample_report.txt').read_text(encoding='utf-8')
+    reports = {
+        # One synthetic lab report per page, separated by form feeds
+        'synthetic': '\n\f'.join(r['text'] for r in generate_synthetic_reports(args.pages, filler_lines=8)),
+        'all_fields': '\n\f'.join([sample] * args.pages),
+        'narrative_only': '\n\f'.join(['Patient reports moderate physical activity and a mixed diet.\n' * 40] * args.pages),
+    }
+
+    print(f"{'report':<16} {'chars':>9} {'p50ms':>8} {'min ms':>8} {'facts':>6}")
+    for name, text in reports.items():
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            facts, _ = extract_facts_and_evidence(text)
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f'{name:<16} {len(text):>9} {statistics.median(timings):>8.2f} {min(timings):>8.2f} {len(facts):>6}')
+
+    if args.adversarial:
+        run_adversarial()
+
+    mismatches = check_golden()
+    print(f'[bench_fact_parser] golden corpus: {"OK" if not mismatches else f"{mismatches} mismatches"}')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
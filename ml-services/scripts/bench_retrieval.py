@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""
+Runs the retrieval benchmark (recall@k, nDCG@k, p50/p95/p99 latency) for each retrieval
+configuration and appends the run to the JSON trend file.
+
+Usage:
+    python scripts/bench_retrieval.py [--reports 20] [--k 5] [--trend data/benchmarks/retrieval_trend.json]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.retrieval_benchmark import run_benchmark, append_trend, TREND_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retrieval quality/latency benchmark')
+    parser.add_argument('--reports', type=int, default=20, help='number of synthetic reports')
+    parser.add_argument('--k', type=int, default=5, help='cutoff for recall@k / nDCG@k')
+    parser.add_argument('--trend', default=TREND_PATH, help='JSON trend file to append the run to')
+    args = parser.parse_args()
+
+    run = run_benchmark(n_reports=args.reports, k=args.k)
+    header = f"{'suite':<18} {'config':<26} {'recall@k':>9} {'ndcg@k':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}"
+    print(header)
+    print('-' * len(header))
+    for r in run['results']:
+        print(f"{r['suite']:<18} {r['config']['name']:<26} {r[f'recall@{args.k}']:>9.3f} {r[f'ndcg@{args.k}']:>8.3f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+    path = append_trend(run, args.trend)
+    print(f'[bench_retrieval] appended run to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+from app.services.analytes import conditions_for, crosses, resolve, to_canonical, unit_for
+from app.services.meal_recommender import extract_conditions_from_report
+
+
+def test_resolve_lab_names():
+    assert resolve('Hba1C') == 'hba1c'
+    assert resolve('Hemoglobin A1c') == 'hba1c'
+    assert resolve('LDL Cholesterol') == 'ldl'
+    assert resolve('HDL Cholesterol') == 'hdl'
+    assert resolve('Serum LDL-C (calc.)') == 'ldl'
+    assert resolve('Systolic Bp') == 'systolic_bp'
+    assert resolve('fasting_glucose') == 'fasting_glucose'
+    assert resolve('Patient Name') is None
+
+
+def test_thresholds_and_units():
+    assert unit_for('ldl') == 'mg/dL'
+    assert crosses('hba1c', 'high', 7.0) and not crosses('hba1c', 'high', 6.5)
+    assert crosses('hemoglobin', 'low', 10.5)
+    assert abs(to_canonical('fasting_glucose', 7, 'mmol/L') - 126.112) < 1e-6
+    assert conditions_for('ldl', 4.2, 'mmol/L') == ['hyperlipidemia']
+    assert conditions_for('hdl', 30) == []
+    # Unknown units fall back to comparing the value as given
+    assert conditions_for('ldl', 160, 'mg%') == ['hyperlipidemia']
+
+
+def test_meal_conditions_use_per_analyte_cutoffs():
+    report = {'summary': '', 'lab_values': [
+        {'parameter': 'Systolic Bp', 'field': 'systolic_bp', 'value': 120, 'unit': 'mmHg'},
+        {'parameter': 'Hemoglobin A1c', 'value': 7.1},
+        {'parameter': 'HDL Cholesterol', 'value': 250},
+    ]}
+    assert extract_conditions_from_report(report) == ['diabetes']
@@ -0,0 +1,91 @@
+import types
+from app.services.chunker import chunk_text, iter_chunks, chunk_report, find_table_blocks
+
+
+def _report(rows=60):
+    return '\n'.join(f'Test {i}: {100 + i} mg/dL (ref 70-99). Within normal limits.' for i in range(rows))
+
+
+def test_chunk_ids_are_deterministic_content_hashes():
+    text = _report()
+    first = chunk_text(text, chunk_size=300, overlap=50)
+    second = chunk_text(text, chunk_size=300, overlap=50)
+    assert [c['id'] for c in first] == [c['id'] for c in second]
+    assert len({c['id'] for c in first}) == len(first)
+    for c in first:
+        assert text[c['start']:c['end']] == c['text']
+
+
+def test_chunks_end_on_line_boundaries_and_cover_text():
+    text = _report()
+    chunks = chunk_text(text, chunk_size=300, overlap=50)
+    assert chunks[0]['start'] == 0 and chunks[-1]['end'] == len(text)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev['text'].endswith('\n')
+        assert nxt['start'] <= prev['end']
+
+
+def test_iter_chunks_is_lazy():
+    gen = iter_chunks(_report(), chunk_size=300, overlap=50)
+    assert isinstance(gen, types.GeneratorType)
+    assert next(gen)['start'] == 0
+
+
+LAB_REPORT = """City Hospital Laboratory
+Sample collected after an overnight fast. Results are below.
+
+Test          Result    Unit     Reference Range
+Fasting Glucose   160   mg/dL    70-99
+HbA1c             7.5   %        4.0-5.6
+Total Cholesterol 220   mg/dL    <200
+LDL               140   mg/dL    <100
+
+Comments: Please follow up with your physician.
+"""
+
+
+def test_chunk_report_attaches_header_to_every_row_group():
+    chunks = chunk_report(LAB_REPORT, rows_per_chunk=3)
+    tables = [c for c in chunks if c['type'] == 'table']
+    assert len(tables) == 2
+    for c in tables:
+        assert c['text'].startswith('Test          Result')
+        assert LAB_REPORT[c['start']:c['end']] in c['text']
+    assert 'LDL' in tables[1]['text'] and 'HbA1c' not in tables[1]['text']
+    assert [c['type'] for c in chunks] == ['text', 'table', 'table', 'text']
+
+
+def test_chunk_report_prefers_extracted_tables():
+    tables = [[['Test', 'Result', 'Unit'], ['LDL', '140', 'mg/dL'], ['HDL', '40', None]]]
+    chunks = chunk_report(LAB_REPORT, tables=tables)
+    table_chunks = [c for c in chunks if c['type'] == 'table']
+    assert table_chunks[0]['text'] == 'Test | Result | Unit\nLDL | 140 | mg/dL\nHDL | 40 | '
+    # Every lab row reaches some chunk; the LDL row pdfplumber extracted is not emitted twice
+    for label, value in (('Fasting Glucose', '160'), ('HbA1c', '7.5'), ('Total Cholesterol', '220'), ('LDL', '140')):
+        assert any(label in c['text'] and value in c['text'] for c in chunks), label
+    assert sum('140' in c['text'] for c in chunks) == 1
+    # The heuristic rows the extracted table does not cover keep their header and offsets
+    rest = table_chunks[1]
+    assert rest['text'].startswith('Test          Result')
+    assert LAB_REPORT[rest['start']:rest['end']] in rest['text']
+
+
+def test_extracted_table_offsets_span_the_matched_rows():
+    tables = [[['Test', 'Result', 'Unit'], ['HbA1c', '7.5', '%'], ['Total Cholesterol', '220', 'mg/dL']]]
+    chunk = [c for c in chunk_report(LAB_REPORT, tables=tables) if c['type'] == 'table'][0]
+    span = LAB_REPORT[chunk['start']:chunk['end']]
+    assert span.startswith('HbA1c') and span.rstrip().endswith('<200')
+    # Rows missing from the text layer cannot be located
+    missing = [[['Test', 'Result'], ['Ferritin', '30']]]
+    chunk = [c for c in chunk_report(LAB_REPORT, tables=missing) if c['type'] == 'table'][0]
+    assert (chunk['start'], chunk['end']) == (-1, -1)
+
+
+def test_numeric_prose_is_not_a_table():
+    text = ("Patient was seen 3 times this year.\n"
+            "She walks 5 days a week and sleeps 7 hours.\n"
+            "Follow up in 2 weeks.\n")
+    assert find_table_blocks(text) == []
+    assert [c['type'] for c in chunk_report(text)] == ['text']
+    rows = "Glucose: 130 mg/dL\nHbA1c 6.1 %\nBlood pressure 128/84\nLDL 140 (ref 0-100)\n"
+    assert len(find_table_blocks(rows)) == 1 and len(find_table_blocks(rows)[0]['rows']) == 4
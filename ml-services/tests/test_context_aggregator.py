@@ -1,5 +1,15 @@
 import pytest
 from app.services.context_aggregator import create_aggregator
+from app.services.report_fact_cache import ReportFactCache
+import app.services.context_aggregator as context_aggregator
+
+
+@pytest.fixture(autouse=True)
+def fact_cache(tmp_path, monkeypatch):
+    # Keep report analyses out of the real data/cache/report_facts
+    cache = ReportFactCache(disk_dir=str(tmp_path / 'report_facts'))
+    monkeypatch.setattr(context_aggregator, 'get_report_fact_cache', lambda: cache)
+    return cache
 
 
 def test_profile_completeness_missing_fields():
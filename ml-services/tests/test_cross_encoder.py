@@ -0,0 +1,71 @@
+import threading
+import time
+from app.services import cross_encoder
+
+
+class _StubModel:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=False):
+        self.calls += 1
+        time.sleep(self.delay)
+        # Prefer snippets mentioning 'ldl'
+        return [1.0 if 'ldl' in text.lower() else 0.0 for _, text in pairs]
+
+
+def _candidates():
+    return [
+        {'id': 'a', 'snippet': 'Glucose 100', 'score': 0.9},
+        {'id': 'b', 'snippet': 'LDL 140', 'score': 0.5},
+        {'id': 'c', 'snippet': 'Tail candidate', 'score': 0.1},
+    ]
+
+
+def test_scores_top_n_in_one_batch_and_caches(monkeypatch):
+    stub = _StubModel()
+    monkeypatch.setattr(cross_encoder, '_model', stub)
+    cross_encoder.clear_cache()
+
+    ranked, applied = cross_encoder.cross_encoder_rerank('ldl 140', _candidates(), top_n=2, budget_ms=1000)
+    assert applied
+    assert [c['id'] for c in ranked] == ['b', 'a', 'c']
+    assert 'ce_score' not in ranked[2]
+    assert stub.calls == 1
+
+    cross_encoder.cross_encoder_rerank('ldl 140', _candidates(), top_n=2, budget_ms=1000)
+    assert stub.calls == 1
+
+
+def test_budget_exceeded_keeps_lexical_order(monkeypatch):
+    monkeypatch.setattr(cross_encoder, '_model', _StubModel(delay=0.2))
+    cross_encoder.clear_cache()
+
+    ranked, applied = cross_encoder.cross_encoder_rerank('ldl', _candidates(), top_n=2, budget_ms=10)
+    assert not applied
+    assert [c['id'] for c in ranked] == ['a', 'b', 'c']
+    cross_encoder._pending.result()
+
+
+def test_concurrent_calls_never_share_a_pending_pass(monkeypatch):
+    stub = _StubModel(delay=0.3)
+    monkeypatch.setattr(cross_encoder, '_model', stub)
+    cross_encoder.clear_cache()
+    results = {}
+
+    def call(query):
+        started = time.perf_counter()
+        results[query] = (cross_encoder.cross_encoder_rerank(query, _candidates(), top_n=2, budget_ms=2000)[1],
+                          time.perf_counter() - started)
+
+    threads = [threading.Thread(target=call, args=(q,)) for q in ('ldl', 'glucose')]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # One request ran the only pass and waited for its own scores; the other saw the model
+    # busy and returned the lexical order at once instead of waiting on that pass
+    assert sorted(applied for applied, _ in results.values()) == [False, True]
+    assert all(elapsed < 0.1 for applied, elapsed in results.values() if not applied)
+    assert stub.calls == 1
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+import app.routes.chatbot as chatbot
+import app.routes.report_processor as report_processor
+from app.main import app
+from app.services import deadline
+from app.services.deadline import DeadlineExceeded
+from app.services.executors import run_io
+from app.services.gemini_api import call_gemini
+from app.services.pipeline_dag import Stage, run_dag
+from app.services.report_result_cache import ReportResultCache
+
+REPORT = 'Fasting Glucose: 130 mg/dL\nLDL: 180 mg/dL\nBlood Pressure: 150/95 mmHg\n'
+
+
+@pytest.fixture
+def budget():
+    tokens = []
+
+    def start(seconds):
+        tokens.append(deadline.start(seconds))
+
+    yield start
+    for token in reversed(tokens):
+        deadline.reset(token)
+
+
+def test_budget_from_header():
+    assert deadline.budget_seconds('30') == 30.0
+    assert deadline.budget_seconds(None) == deadline.REQUEST_DEADLINE_SECONDS
+    assert deadline.budget_seconds('soon') == deadline.REQUEST_DEADLINE_SECONDS
+    assert deadline.budget_seconds('-5') == deadline.REQUEST_DEADLINE_SECONDS
+
+
+def test_no_deadline_changes_nothing():
+    assert deadline.remaining() is None
+    assert deadline.clamp(60) == 60
+    assert deadline.should_run('llm')
+    assert deadline.degraded() == []
+
+
+def test_optional_stages_skip_when_time_is_short(budget):
+    budget(4)
+    assert deadline.clamp(60) <= 4
+    assert deadline.clamp(60, reserve=10) == 0.0
+    assert deadline.should_run('rerank')
+    assert not deadline.should_run('llm')
+    assert not deadline.should_run('retrieval')
+    assert deadline.degraded() == ['llm', 'retrieval']
+
+
+def test_deadline_follows_the_request_into_workers(budget):
+    budget(30)
+
+    def stage():
+        deadline.mark_degraded('rerank')
+        return deadline.remaining()
+
+    run = run_dag([Stage('a', stage)])
+    assert 0 < run.results['a'] <= 30
+    assert asyncio.run(run_io(deadline.remaining)) <= 30
+    # Stages record into the request's own list
+    assert deadline.degraded() == ['rerank']
+
+
+def test_header_sets_the_request_deadline(monkeypatch):
+    def answer(chat_query):
+        return chatbot.ChatResponse(response='ok', sources=[], query_id='q', confidence=1.0,
+                                    metadata={'remaining': deadline.remaining()})
+
+    monkeypatch.setattr(chatbot, 'answer_chat_query', answer)
+    client = TestClient(app)
+    payload = {'query': 'hi', 'user_id': 'u1', 'user_profile': {}}
+    remaining = client.post('/chatbot/query', json=payload, headers={deadline.DEADLINE_HEADER: '7'}).json()['metadata']['remaining']
+    assert 6 < remaining <= 7
+    remaining = client.post('/chatbot/query', json=payload).json()['metadata']['remaining']
+    assert remaining > 7
+
+
+def test_gemini_stops_retrying_at_the_deadline(budget, monkeypatch):
+    monkeypatch.setenv('GOOGLE_API_KEY', 'test-key')
+    timeouts = []
+
+    def fail(*args, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        raise requests.exceptions.ConnectionError('unreachable')
+
+    monkeypatch.setattr(requests, 'post', fail)
+    budget(1.5)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_gemini({'system': 's', 'user': 'u'})
+    # One attempt, capped at the time left, and no backoff past the deadline
+    assert len(timeouts) == 1 and timeouts[0] <= 1.5
+    assert time.monotonic() - started < 0.5
+
+
+def test_report_pipeline_falls_back_when_time_is_short(budget, tmp_path, monkeypatch):
+    path = tmp_path / 'report.txt'
+    path.write_text(REPORT)
+    calls = []
+    monkeypatch.setattr(report_processor, 'call_gemini', lambda prompt: calls.append(prompt))
+    cache = ReportResultCache(str(tmp_path / 'results.sqlite3'))
+    monkeypatch.setattr(report_processor, 'get_report_result_cache', lambda: cache)
+
+    budget(4)
+    request = report_processor.ProcessReportRequest(userId='u1', filePath=str(path), originalName=None)
+    response = report_processor.run_report_pipeline(request)
+    assert calls == []
+    assert set(response['metadata']['degraded']) == {'retrieval', 'llm'}
+    # The formatter's deterministic summary and diet plan stand in for the LLM
+    assert 'Fasting Glucose: 130' in response['summary']
+    assert 'Reduce sodium (salt) intake in meals' in response['diet_plan']
+    # Degraded responses are not cached
+    assert cache.get(report_processor.report_result_key(str(path))) is None
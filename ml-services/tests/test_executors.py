@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+from app.routes import report_processor
+from app.services import executors
+from app.services.executors import run_cpu, run_io
+
+
+async def _ticks_while(coro, interval=0.01):
+    """Await `coro` while counting how often the event loop gets to run a ticker."""
+    ticks = 0
+    task = asyncio.ensure_future(coro)
+    while not task.done():
+        await asyncio.sleep(interval)
+        ticks += 1
+    return task.result(), ticks
+
+
+def test_runs_off_the_event_loop_thread():
+    async def main():
+        loop_thread = threading.get_ident()
+        io_thread = await run_io(threading.get_ident)
+        cpu_thread = await run_cpu(threading.current_thread)
+        return loop_thread, io_thread, cpu_thread
+
+    loop_thread, io_thread, cpu_thread = asyncio.run(main())
+    assert io_thread != loop_thread
+    assert cpu_thread.name.startswith('cpu-worker')
+
+
+def test_exceptions_and_context_propagate():
+    var = contextvars.ContextVar('request_id', default=None)
+
+    def fail():
+        raise ValueError(var.get())
+
+    async def main():
+        var.set('r1')
+        try:
+            await run_io(fail)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(main()) == 'r1'
+
+
+def test_concurrent_blocking_calls_overlap():
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(*(run_io(time.sleep, 0.2) for _ in range(4)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) < 0.6
+
+
+def test_process_report_does_not_block_the_loop(monkeypatch):
+    def slow_pipeline(request, progress=None):
+        time.sleep(0.3)
+        return {'summary': request.filePath}
+
+    monkeypatch.setattr(report_processor, 'run_report_pipeline', slow_pipeline)
+    request = report_processor.ProcessReportRequest(userId='u1', filePath='a.pdf', originalName='a.pdf')
+    result, ticks = asyncio.run(_ticks_while(report_processor.process_report(request)))
+    assert result == {'summary': 'a.pdf'}
+    # A blocking handler would leave the ticker no chance to run until it returned
+    assert ticks >= 10
+
+
+def test_shutdown_recreates_pools():
+    executors.shutdown_executors()
+    assert asyncio.run(run_io(lambda: 42)) == 42
@@ -1,5 +1,11 @@
+import json
+import sys
+import time
+from pathlib import Path
+
 import pytest
-from app.services.fact_parser import extract_facts_and_evidence
+from app.services import fact_parser
+from app.services.fact_parser import extract_facts_and_evidence, extract_facts_and_spans
 
 
 def test_extract_basic_facts():
@@ -19,3 +25,75 @@ def test_extract_basic_facts():
     assert facts['ldl'] == 140
     assert 'hdl' in facts
     assert evidence and len(evidence) >= 1
+
+
+def _assert_golden_parity(hardened):
+    base = Path(__file__).resolve().parents[1] / 'test_data'
+    corpus = json.loads((base / 'fact_parser_corpus.json').read_text(encoding='utf-8'))
+    golden = json.loads((base / 'fact_parser_golden.json').read_text(encoding='utf-8'))
+    for case in corpus['cases']:
+        facts, evidence = extract_facts_and_evidence(case['text'], hardened=hardened)
+        expected = golden[case['name']]
+        assert list(facts.items()) == list(expected['facts'].items()), case['name']
+        assert [{k: e[k] for k in ('fields', 'start', 'end')} for e in evidence] == expected['evidence'], case['name']
+        assert all(e['text'] == case['text'][e['start']:e['end']] for e in evidence)
+
+
+@pytest.mark.parametrize('hardened', [False, True])
+def test_golden_corpus_parity(hardened):
+    # Expected facts were recorded from the original per-pattern implementation; evidence is
+    # stored as merged (fields, start, end) spans
+    _assert_golden_parity(hardened)
+
+
+def test_hardened_patterns_compile_without_possessive_quantifiers(monkeypatch):
+    # Python < 3.11 has no possessive quantifiers: the rewritten patterns must compile on this
+    # interpreter's grammar and match exactly like the possessive ones
+    monkeypatch.setattr(fact_parser, 're2', None)
+    monkeypatch.setattr(sys, 'version_info', (3, 10, 0))
+    portable = {f: fact_parser._without_possessives(p) for f, p in fact_parser.HARDENED_FIELD_PATTERNS.items()}
+    assert not any('*+' in p or '++' in p for p in portable.values())
+    compiled = {f: fact_parser._compile_hardened(p) for f, p in fact_parser.HARDENED_FIELD_PATTERNS.items()}
+    assert {f: r.pattern for f, r in compiled.items()} == portable
+    monkeypatch.setattr(fact_parser, '_HARDENED_REGEXES', compiled)
+    _assert_golden_parity(hardened=True)
+    t0 = time.perf_counter()
+    assert 'patient_name' not in extract_facts_and_evidence('name:' + ' ' * 50000 + '1', hardened=True, time_budget_ms=0)[0]
+    assert time.perf_counter() - t0 < 1.0
+
+
+@pytest.mark.parametrize('text', [
+    'name:' + ' ' * 50000 + '1',
+    'patient name ' * 4000 + '1',
+])
+def test_hardened_patterns_are_linear_on_adversarial_ocr(text):
+    # The original patient_name pattern takes minutes on these inputs
+    t0 = time.perf_counter()
+    facts, _ = extract_facts_and_evidence(text, hardened=True, time_budget_ms=0)
+    assert time.perf_counter() - t0 < 1.0
+    assert 'patient_name' not in facts
+
+
+def test_hardened_mode_skips_whitespace_only_names():
+    text = 'Patient Name: \n, Glucose 99 mg/dL\nName: Jane Doe\n'
+    assert extract_facts_and_evidence(text, hardened=False)[0]['patient_name'] == ''
+    assert extract_facts_and_evidence(text, hardened=True)[0]['patient_name'] == 'Jane Doe'
+
+
+def test_time_budget_returns_partial_result():
+    facts, evidence = extract_facts_and_evidence('Glucose 99 mg/dL\n', hardened=True, time_budget_ms=1e-9)
+    assert facts == {} and evidence == []
+
+
+def test_evidence_spans_merge_overlaps_and_point_into_text():
+    text = 'Glucose 99 mg/dL\nHbA1c 6.1 %\n' + 'Filler line without values.\n' * 20 + 'HDL 45 mg/dL\n'
+    facts, spans = extract_facts_and_spans(text)
+    merged = spans.spans()
+    assert len(merged) == 2
+    assert merged[0].fields == ('fasting_glucose', 'hba1c')
+    assert merged[1].fields == ('hdl',)
+    evidence = spans.materialize()
+    assert [e['id'] for e in evidence] == [s.id for s in merged]
+    assert all(e['text'] == text[e['start']:e['end']] for e in evidence)
+    # Only spans overlapping the requested ranges are selected
+    assert spans.overlapping([(len(text) - 5, len(text))]) == [merged[1]]
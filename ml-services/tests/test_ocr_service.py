@@ -0,0 +1,265 @@
+import os
+import subprocess
+import sys
+import time
+
+from app.services import ocr_cache, ocr_service
+from app.services.ocr_cache import OcrCache
+
+
+def _slow_page(page_no, delay):
+    time.sleep(delay)
+    if page_no < 0:
+        raise RuntimeError('Tesseract process timeout')
+    return f'page {page_no}'
+
+
+def test_run_pages_keeps_page_order():
+    args = [(1, 0.3), (2, 0.0), (3, 0.1)]
+    assert ocr_service.run_pages(_slow_page, args) == ['page 1', 'page 2', 'page 3']
+
+
+def test_run_pages_failed_and_unfinished_pages_are_empty():
+    failed = []
+    results = ocr_service.run_pages(_slow_page, [(1, 0.0), (-2, 0.0), (3, 3.0)], total_timeout=1.5, failed=failed)
+    assert results == ['page 1', '', '']
+    assert failed == [1, 2]
+
+
+def test_run_pages_cancellation():
+    started = time.monotonic()
+    results = ocr_service.run_pages(_slow_page, [(n, 1.0) for n in range(1, 9)], should_cancel=lambda: True)
+    assert results == [''] * 8
+    assert time.monotonic() - started < 1.0
+
+
+def test_run_pages_bounded_window():
+    args = [(n, 0.05 * (n % 3)) for n in range(1, 8)]
+    assert ocr_service.run_pages(_slow_page, args, window=2) == [f'page {n}' for n in range(1, 8)]
+
+
+class _Pool:
+    def __init__(self):
+        self.shut_down = False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_reset_pool_leaves_a_replacement_pool_alone(monkeypatch):
+    broken, fresh = _Pool(), _Pool()
+    monkeypatch.setattr(ocr_service, '_pool', fresh)
+    # A request that saw the old pool die must not shut down the one another request started
+    ocr_service._reset_pool(broken)
+    assert broken.shut_down and not fresh.shut_down
+    assert ocr_service._pool is fresh
+    ocr_service._reset_pool(fresh)
+    assert fresh.shut_down and ocr_service._pool is None
+
+
+def test_ocr_workers_import_only_the_ocr_service():
+    # A spawned pool worker imports ocr_service by name; that must not load the other services
+    code = 'import sys, app.services.ocr_service; print(sorted(m for m in sys.modules if m.startswith("app")))'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert out.strip() == "['app', 'app.services', 'app.services.deadline', 'app.services.ocr_service']"
+
+
+def test_extract_text_ocrs_only_pages_without_text_layer(monkeypatch, tmp_path):
+    pdf = tmp_path / 'mixed.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+    layer = ['Page one has a real text layer with lab values', '', 'Page three is digital too, LDL 120 mg/dL', ' 3 ']
+    requested = []
+
+    def fake_ocr(path, page_numbers=None, should_cancel=None, failed=None):
+        requested.append(page_numbers)
+        return [f'scanned {n}' for n in page_numbers]
+
+    monkeypatch.setattr(ocr_service, '_read_text_layer', lambda path, with_tables=False: (list(layer), []))
+    monkeypatch.setattr(ocr_service, '_ocr_pdf', fake_ocr)
+    monkeypatch.setattr(ocr_service, 'convert_from_path', object())
+    monkeypatch.setattr(ocr_service, 'pytesseract', object())
+    monkeypatch.setattr(ocr_cache, '_ocr_cache', OcrCache(None))
+
+    text = ocr_service.extract_text(str(pdf))
+    assert requested == [[2, 4]]
+    assert text.split('\n\n') == [layer[0], 'scanned 2', layer[2], 'scanned 4']
+
+
+def test_extract_text_reuses_cached_pages(monkeypatch, tmp_path):
+    _use_tesserocr = ocr_service._use_tesserocr
+    pdf = tmp_path / 'scan.pdf'
+    pdf.write_bytes(b'%PDF-1.4 scanned')
+    copy = tmp_path / 'retry-upload.pdf'
+    copy.write_bytes(pdf.read_bytes())
+    calls = []
+
+    def fake_pages(path, with_tables=False):
+        calls.append((path, with_tables))
+        return ['LDL: 180 mg/dL', 'HDL: 40 mg/dL'], [[['Test', 'Result'], ['LDL', '180']]] if with_tables else [], True
+
+    monkeypatch.setattr(ocr_service, '_extract_pdf_pages', fake_pages)
+    monkeypatch.setattr(ocr_cache, '_ocr_cache', OcrCache(str(tmp_path / 'cache')))
+
+    first = ocr_service.extract_text(str(pdf))
+    assert ocr_service.extract_text(str(copy)) == first == 'LDL: 180 mg/dL\n\nHDL: 40 mg/dL'
+    assert calls == [(str(pdf), False)]
+
+    # The entry was stored without tables: asking for them parses once more, then hits
+    assert ocr_service.extract_document(str(pdf))[1] == [[['Test', 'Result'], ['LDL', '180']]]
+    assert ocr_service.extract_document(str(copy)) == (first, [[['Test', 'Result'], ['LDL', '180']]])
+    assert ocr_service.extract_text(str(copy)) == first
+    assert calls == [(str(pdf), False), (str(pdf), True)]
+
+    # A different OCR setting is a different entry
+    monkeypatch.setenv('PDF_OCR_DPI', '200')
+    ocr_service.extract_text(str(pdf))
+    assert len(calls) == 3
+
+    # So is switching adaptive region OCR on or changing its DPI bounds
+    monkeypatch.setattr(ocr_service, 'OCR_ADAPTIVE', not ocr_service.OCR_ADAPTIVE)
+    ocr_service.extract_text(str(pdf))
+    assert len(calls) == 4
+    monkeypatch.setattr(ocr_service, 'OCR_MIN_DPI', ocr_service.OCR_MIN_DPI + 50)
+    ocr_service.extract_text(str(pdf))
+    monkeypatch.setattr(ocr_service, 'OCR_PROBE_DPI', ocr_service.OCR_PROBE_DPI + 24)
+    ocr_service.extract_text(str(pdf))
+    assert len(calls) == 6
+    ocr_service.extract_text(str(copy))
+    assert len(calls) == 6
+
+    # And switching between tesserocr and the pytesseract binary
+    monkeypatch.setattr(ocr_service, '_use_tesserocr', lambda: not _use_tesserocr())
+    ocr_service.extract_text(str(pdf))
+    assert len(calls) == 7
+
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    cache = OcrCache(str(tmp_path), max_bytes=200)
+    cache.put('a', ['x' * 60])
+    cache.put('b', ['y' * 60])
+    os.utime(tmp_path / 'a.json', (1, 1))
+    os.utime(tmp_path / 'b.json', (2, 2))
+    assert cache.get('a')['pages'] == ['x' * 60]  # refreshes a
+    cache.put('c', ['z' * 60])
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_opencv_preprocessing_matches_pil_pipeline(tmp_path):
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    page = rng.integers(40, 210, size=(400, 900), dtype=np.uint8)
+    page[::9, :] //= 3
+    expected = np.asarray(ocr_service._preprocess_image(Image.fromarray(page)))
+    assert np.array_equal(ocr_service._preprocess_array(page.copy()), expected)
+
+    path = tmp_path / 'page.png'
+    Image.fromarray(page).save(path)
+    assert np.array_equal(ocr_service._preprocess_file(str(path)), expected)
+
+
+class _FakeEngine:
+    created = 0
+
+    def __init__(self, lang='eng', psm=None, path=None):
+        type(self).created += 1
+        self.lang = lang
+        self.pages = []
+
+    def SetImageBytes(self, data, width, height, bpp, bpl):
+        self.pages.append((width, height, bpp, bpl, len(data)))
+
+    def SetImage(self, img):
+        self.pages.append(img.size)
+
+    def GetUTF8Text(self):
+        return f'text {len(self.pages)}'
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        pass
+
+
+def test_tesserocr_engines_are_reused(monkeypatch):
+    import types
+    import numpy as np
+
+    _FakeEngine.created = 0
+    monkeypatch.setattr(ocr_service, 'tesserocr', types.SimpleNamespace(PyTessBaseAPI=_FakeEngine))
+    monkeypatch.setattr(ocr_service, 'OCR_ENGINE', 'auto')
+    monkeypatch.setattr(ocr_service, '_engines', {})
+    page = np.zeros((30, 40), dtype=np.uint8)
+
+    assert ocr_service._image_to_text(page) == 'text 1'
+    assert ocr_service._image_to_text(page) == 'text 2'
+    assert _FakeEngine.created == 1
+    engine = ocr_service._engines[('', '')].get_nowait()
+    assert engine.pages == [(40, 30, 1, 40, 1200)] * 2
+
+
+def test_find_text_regions_skips_logos_and_signatures():
+    import cv2
+    import numpy as np
+
+    # Letter page rendered at 72 DPI: a logo, a lab table, a note and a signature
+    page = np.full((792, 612), 255, dtype=np.uint8)
+    cv2.rectangle(page, (40, 30), (140, 110), 0, -1)
+    rows = ['Test        Result   Unit   Range', 'LDL         180      mg/dL  <100', 'HDL         45       mg/dL  >40']
+    for i, row in enumerate(rows):
+        cv2.putText(page, row, (50, 160 + 16 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.4, 0, 1)
+    cv2.putText(page, 'Notes: repeat in 3 months.', (50, 420), cv2.FONT_HERSHEY_SIMPLEX, 0.4, 0, 1)
+    cv2.polylines(page, [np.array([[380, 700], [420, 660], [450, 720], [500, 650]], np.int32)], False, 0, 2)
+
+    regions, glyph = ocr_service.find_text_regions(page)
+    assert len(regions) == 2
+    table, note = regions
+    assert table[1] < 160 and table[1] + table[3] > 160 + 32  # all table rows in one band
+    assert note[1] < 420 < note[1] + note[3]
+    assert all(y > 110 and y + h < 650 for _, y, _, h in regions)
+    assert sum(w * h for _, _, w, h in regions) < 0.1 * page.size
+    assert 150 <= ocr_service.choose_dpi(glyph, 72, 300) <= 300
+    assert ocr_service.choose_dpi(0, 72, 300) == 300
+
+
+class _FakePage:
+    def __init__(self, text, tables):
+        self.text, self.tables, self.flushed = text, tables, False
+
+    def extract_text(self):
+        return self.text
+
+    def extract_tables(self):
+        return self.tables
+
+    def flush_cache(self):
+        self.flushed = True
+
+
+def test_text_layer_and_tables_come_from_one_open(monkeypatch):
+    import types
+
+    pages = [_FakePage('LDL 180 mg/dL', [[['Test', 'Result'], ['LDL', '180']]]), _FakePage(None, [])]
+    opened = []
+
+    class _FakePdf:
+        def __init__(self, path):
+            opened.append(path)
+            self.pages = pages
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(ocr_service, 'pdfplumber', types.SimpleNamespace(open=_FakePdf))
+    text, tables = ocr_service._read_text_layer('report.pdf', with_tables=True)
+    assert text == ['LDL 180 mg/dL', '']
+    assert tables == [[['Test', 'Result'], ['LDL', '180']]]
+    assert opened == ['report.pdf']
+    assert all(p.flushed for p in pages)
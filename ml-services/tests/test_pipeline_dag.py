@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.pipeline_dag import Halt, Stage, run_dag
+
+
+def _sleep(value, seconds=0.2):
+    time.sleep(seconds)
+    return value
+
+
+def test_independent_stages_overlap():
+    started = time.perf_counter()
+    run = run_dag([
+        Stage('ocr', lambda: 'text'),
+        Stage('index', lambda ocr: _sleep(ocr + ':index'), ('ocr',)),
+        Stage('facts', lambda ocr: _sleep(ocr + ':facts'), ('ocr',)),
+        Stage('diet', lambda facts: _sleep(facts + ':diet'), ('facts',)),
+        Stage('llm', lambda index, facts: _sleep(index + '+' + facts), ('index', 'facts')),
+        Stage('done', lambda llm, diet: (llm, diet), ('llm', 'diet')),
+    ])
+    elapsed = time.perf_counter() - started
+    assert run.results['done'] == ('text:index+text:facts', 'text:facts:diet')
+    # Critical path is three 0.2s stages; the sum of all stages is four
+    assert elapsed < 0.75
+    assert set(run.timings_ms) == {'ocr', 'index', 'facts', 'diet', 'llm', 'done'}
+    assert run.timings_ms['llm'] >= 190
+
+
+def test_halt_skips_remaining_stages():
+    calls = []
+    run = run_dag([
+        Stage('facts', lambda: Halt({'summary': 'no facts'})),
+        Stage('llm', lambda facts: calls.append('llm'), ('facts',)),
+    ])
+    assert run.halted.value == {'summary': 'no facts'}
+    assert calls == [] and 'llm' not in run.results
+
+
+def test_stage_errors_propagate_and_graph_is_checked():
+    def fail():
+        raise RuntimeError('Gemini unavailable')
+
+    with pytest.raises(RuntimeError, match='Gemini unavailable'):
+        run_dag([Stage('llm', fail), Stage('format', lambda llm: llm, ('llm',))])
+    with pytest.raises(ValueError, match='cycle'):
+        run_dag([Stage('a', lambda b: b, ('b',)), Stage('b', lambda a: a, ('a',))])
+    with pytest.raises(ValueError, match='unknown'):
+        run_dag([Stage('a', lambda c: c, ('c',))])
+
+
+def test_concurrent_runs_do_not_queue_behind_each_other():
+    def one_run(i):
+        return run_dag([
+            Stage('ocr', lambda: _sleep(i)),
+            Stage('llm', lambda ocr: _sleep(ocr), ('ocr',)),
+            Stage('diet', lambda ocr: _sleep(ocr), ('ocr',)),
+        ]).results['llm']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        assert list(callers.map(one_run, range(8))) == list(range(8))
+    # Eight runs with a 0.4s critical path each; a small shared pool would serialize them
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,82 @@
+from app.services import fact_parser
+from app.services.context_aggregator import create_aggregator
+from app.services.report_fact_cache import ReportFactCache, report_cache_key
+import app.services.context_aggregator as context_aggregator
+
+
+REPORT = {
+    'processing_result': 'LDL: 180 mg/dL\nFasting Glucose: 100 mg/dL',
+    'lab_results': [{'test_name': 'LDL', 'value': 180, 'ref_range': {'low': 0, 'high': 129}}],
+}
+
+
+def _counting_parser(monkeypatch):
+    calls = []
+    original = fact_parser.extract_facts_and_spans
+
+    def counted(text, *args, **kwargs):
+        calls.append(text)
+        return original(text, *args, **kwargs)
+
+    monkeypatch.setattr(fact_parser, 'extract_facts_and_spans', counted)
+    return calls
+
+
+def test_repeated_chat_turns_skip_parsing(monkeypatch, tmp_path):
+    cache = ReportFactCache(max_entries=8, disk_dir=str(tmp_path))
+    monkeypatch.setattr(context_aggregator, 'get_report_fact_cache', lambda: cache)
+    calls = _counting_parser(monkeypatch)
+    aggregator = create_aggregator()
+
+    first = aggregator.analyze_report(REPORT)
+    second = aggregator.analyze_report(dict(REPORT))
+    assert first == second
+    assert first[0]['ldl'] == 180 and len(first[2]) == 1
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+    # A different report text is a different key
+    aggregator.analyze_report({**REPORT, 'processing_result': 'LDL: 150 mg/dL'})
+    assert len(calls) == 2
+
+
+def test_parse_cut_short_by_the_time_budget_is_not_cached(monkeypatch, tmp_path):
+    cache = ReportFactCache(max_entries=8, disk_dir=str(tmp_path))
+    monkeypatch.setattr(context_aggregator, 'get_report_fact_cache', lambda: cache)
+    calls = _counting_parser(monkeypatch)
+    # The budget runs out before the first pattern
+    monkeypatch.setattr(fact_parser, '_expired', lambda deadline, facts: deadline is not None)
+    aggregator = create_aggregator()
+
+    facts, _, flags = aggregator.analyze_report(REPORT)
+    assert facts == {} and len(flags) == 1
+    aggregator.analyze_report(REPORT)
+    assert len(calls) == 2
+    assert cache.stats()['entries'] == 0 and not list(tmp_path.glob('*.json'))
+
+    # Once a parse completes it is cached as usual
+    monkeypatch.undo()
+    monkeypatch.setattr(context_aggregator, 'get_report_fact_cache', lambda: cache)
+    assert aggregator.analyze_report(REPORT)[0]['ldl'] == 180
+    assert len(list(tmp_path.glob('*.json'))) == 1
+
+
+def test_disk_tier_is_shared_between_instances(monkeypatch, tmp_path):
+    calls = _counting_parser(monkeypatch)
+    key = report_cache_key(REPORT, REPORT['processing_result'])
+    compute = lambda: (*fact_parser.extract_facts_and_evidence(REPORT['processing_result']), [])
+
+    ReportFactCache(disk_dir=str(tmp_path)).get_or_compute(key, compute)
+    other_worker = ReportFactCache(disk_dir=str(tmp_path))
+    facts, evidence, flags = other_worker.get_or_compute(key, compute)
+    assert facts['ldl'] == 180 and evidence and flags == []
+    assert len(calls) == 1
+    assert other_worker.stats()['disk_hits'] == 1
+
+
+def test_lru_and_disk_bounds(tmp_path):
+    cache = ReportFactCache(max_entries=2, disk_dir=str(tmp_path), max_disk_entries=2)
+    for i in range(3):
+        cache.get_or_compute(f'k{i}', lambda i=i: ({'i': i}, [], []))
+    assert cache.stats()['entries'] == 2
+    assert len(list(tmp_path.glob('*.json'))) == 2
@@ -0,0 +1,190 @@
+import sqlite3
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import app.routes.report_processor as report_processor
+from app.main import app
+from app.services import report_jobs
+from app.services.report_jobs import ReportJobQueue
+
+
+def _wait(queue, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} stayed {queue.get(job_id)["status"]}')
+
+
+def _handler(request, progress):
+    for stage in report_jobs.STAGES:
+        progress(stage)
+    return {'summary': f"report {request['filePath']}"}
+
+
+def test_job_runs_and_reports_progress(tmp_path):
+    release = threading.Event()
+    seen = []
+
+    def handler(request, progress):
+        progress('ocr')
+        progress('chunking')
+        seen.append(request)
+        release.wait(5)
+        return _handler(request, progress)
+
+    queue = ReportJobQueue(handler, db_path=str(tmp_path / 'jobs.sqlite3'), workers=1)
+    job_id = queue.submit({'filePath': 'a.pdf'})
+    job = _wait(queue, job_id, 'running')
+    while queue.get(job_id)['stage'] != 'chunking':
+        time.sleep(0.01)
+    job = queue.get(job_id)
+    assert [s['status'] for s in job['stages'][:3]] == ['done', 'running', 'pending']
+    assert job['progress'] == 0.1
+
+    # A retried submission joins the existing job
+    assert queue.submit({'filePath': 'a.pdf'}) == job_id
+    release.set()
+    job = _wait(queue, job_id, 'succeeded')
+    assert job['result'] == {'summary': 'report a.pdf'} and job['progress'] == 1.0
+    assert queue.submit({'filePath': 'a.pdf'}) == job_id
+    assert len(seen) == 1
+    queue.shutdown()
+
+
+def test_failed_job_and_webhook(tmp_path, monkeypatch):
+    posted = []
+
+    class _Resp:
+        status_code = 200
+
+    monkeypatch.setattr(report_jobs.requests, 'post', lambda url, json, timeout: posted.append((url, json)) or _Resp())
+    monkeypatch.setattr(report_jobs, 'CALLBACK_HOSTS', {'backend'})
+
+    def handler(request, progress):
+        progress('ocr')
+        progress('llm')
+        raise RuntimeError('Gemini unavailable')
+
+    queue = ReportJobQueue(handler, db_path=str(tmp_path / 'jobs.sqlite3'), workers=1)
+    job_id = queue.submit({'filePath': 'b.pdf'}, callback_url='http://backend/hooks/report')
+    job = _wait(queue, job_id, 'failed')
+    assert job['error'] == 'RuntimeError: Gemini unavailable'
+    assert job['stages'][report_jobs.STAGES.index('llm')]['status'] == 'failed'
+    queue.shutdown()
+    assert posted == [('http://backend/hooks/report', job)]
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    db = str(tmp_path / 'jobs.sqlite3')
+    queue = ReportJobQueue(_handler, db_path=db, workers=1)
+    queue.shutdown()
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("INSERT INTO report_jobs VALUES ('j1', 'k1', 'running', 'llm', '{\"filePath\": \"c.pdf\"}', NULL, NULL, NULL, 1, 1)")
+        conn.execute("INSERT INTO report_jobs VALUES ('j2', 'k2', 'queued', NULL, '{\"filePath\": \"d.pdf\"}', NULL, NULL, NULL, 2, 2)")
+        # Still renewing its lease: another live worker is running it
+        conn.execute("INSERT INTO report_jobs VALUES ('j3', 'k3', 'running', 'ocr', '{\"filePath\": \"e.pdf\"}', NULL, NULL, NULL, 3, ?)",
+                     (time.time(),))
+    conn.close()
+
+    restarted = ReportJobQueue(_handler, db_path=db, workers=1)
+    assert restarted.resume() == ['j1', 'j2']
+    assert _wait(restarted, 'j1', 'succeeded')['result'] == {'summary': 'report c.pdf'}
+    assert _wait(restarted, 'j2', 'succeeded')['result'] == {'summary': 'report d.pdf'}
+    assert restarted.get('j3')['status'] == 'running'
+    restarted.shutdown()
+
+
+def test_job_is_claimed_by_one_worker(tmp_path):
+    db = str(tmp_path / 'jobs.sqlite3')
+    runs = []
+
+    def handler(request, progress):
+        runs.append(request)
+        time.sleep(0.1)
+        return {}
+
+    # Two workers on the same file both try to run the queued job
+    first = ReportJobQueue(handler, db_path=db, workers=1)
+    second = ReportJobQueue(handler, db_path=db, workers=1)
+    job_id = first.submit({'filePath': 'f.pdf'})
+    second.resume()
+    second._run(job_id)
+    _wait(first, job_id, 'succeeded')
+    first.shutdown()
+    second.shutdown()
+    assert len(runs) == 1
+
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    queue = ReportJobQueue(report_processor._run_job, db_path=str(tmp_path / 'jobs.sqlite3'), workers=1)
+    monkeypatch.setattr(report_processor, '_job_queue', queue)
+    monkeypatch.setattr(report_processor, 'run_report_pipeline', lambda request, progress=None: {'summary': request.filePath})
+    client = TestClient(app)
+
+    payload = {'userId': 'u1', 'filePath': 'ml-services/test_data/sample_report.txt', 'originalName': 'sample_report.txt'}
+    response = client.post('/process-report/jobs', json=payload)
+    assert response.status_code == 202
+    job_id = response.json()['jobId']
+    _wait(queue, job_id, 'succeeded')
+    body = client.get(response.json()['statusUrl']).json()
+    assert body['result'] == {'summary': payload['filePath']}
+
+    assert client.get('/process-report/jobs/nope').status_code == 404
+    bad = client.post('/process-report/jobs', json={**payload, 'callbackUrl': 'file:///etc/passwd'})
+    assert bad.status_code == 400
+    # Results are only ever sent back to allowlisted hosts
+    monkeypatch.setattr(report_jobs, 'CALLBACK_HOSTS', {'localhost:3001'})
+    assert client.post('/process-report/jobs', json={**payload, 'callbackUrl': 'https://collector.example/r'}).status_code == 400
+    assert client.post('/process-report/jobs', json={**payload, 'callbackUrl': 'http://localhost:4000/r'}).status_code == 400
+    assert client.post('/process-report/jobs', json={**payload, 'callbackUrl': 'http://localhost:3001/r'}).status_code == 202
+    queue.shutdown()
+
+
+def test_finished_jobs_are_purged_after_retention(tmp_path, monkeypatch):
+    queue = ReportJobQueue(_handler, db_path=str(tmp_path / 'jobs.sqlite3'), workers=1)
+    done = queue.submit({'filePath': 'g.pdf'})
+    _wait(queue, done, 'succeeded')
+    with queue._conn:
+        queue._conn.execute("INSERT INTO report_jobs VALUES ('old', 'k', 'failed', 'llm', '{}', NULL, NULL, 'x', 1, 1)")
+        queue._conn.execute("INSERT INTO report_jobs VALUES ('live', 'k2', 'running', 'ocr', '{}', NULL, NULL, NULL, 1, ?)",
+                            (time.time(),))
+    monkeypatch.setattr(report_jobs, 'JOB_RETENTION_SECONDS', 60)
+    assert queue.purge() == 1
+    assert queue.get('old') is None and queue.get(done) is not None and queue.get('live') is not None
+    # With retention 0 nothing is deleted
+    monkeypatch.setattr(report_jobs, 'JOB_RETENTION_SECONDS', 0)
+    with queue._conn:
+        queue._conn.execute("UPDATE report_jobs SET updated_at = 1 WHERE id = ?", (done,))
+    assert queue.purge() == 0
+    monkeypatch.setattr(report_jobs, 'JOB_RETENTION_SECONDS', 60)
+    # A resubmission after the old result is gone runs the job again
+    assert queue.submit({'filePath': 'g.pdf'}) != done
+    queue.shutdown()
+
+
+def test_replaced_document_starts_a_new_job(tmp_path, monkeypatch):
+    queue = ReportJobQueue(report_processor._run_job, db_path=str(tmp_path / 'jobs.sqlite3'), workers=1)
+    monkeypatch.setattr(report_processor, '_job_queue', queue)
+    monkeypatch.setattr(report_processor, 'run_report_pipeline',
+                        lambda request, progress=None: {'summary': open(request.filePath).read()})
+    client = TestClient(app)
+    path = tmp_path / 'upload.txt'
+    payload = {'userId': 'u1', 'filePath': str(path), 'originalName': 'upload.txt'}
+
+    path.write_text('LDL 190 mg/dL')
+    first = client.post('/process-report/jobs', json=payload).json()['jobId']
+    assert _wait(queue, first, 'succeeded')['result'] == {'summary': 'LDL 190 mg/dL'}
+    assert client.post('/process-report/jobs', json=payload).json()['jobId'] == first
+
+    # A new document uploaded to the same path is processed, not answered from the old job
+    path.write_text('LDL 120 mg/dL')
+    second = client.post('/process-report/jobs', json=payload).json()['jobId']
+    assert second != first
+    assert _wait(queue, second, 'succeeded')['result'] == {'summary': 'LDL 120 mg/dL'}
+    queue.shutdown()
@@ -0,0 +1,67 @@
+import app.routes.report_processor as report_processor
+from app.services import prompt_builder
+from app.services.report_result_cache import ReportResultCache, report_result_key
+
+REPORT = 'Fasting Glucose: 130 mg/dL\nLDL: 180 mg/dL\nBlood Pressure: 150/95 mmHg\n'
+
+
+def _llm(calls, used_api=True):
+    def call(prompt):
+        calls.append(prompt)
+        return {'summary': 'Elevated glucose and LDL.', 'diet_plan': ['Eat more fiber'], 'used_api': used_api}
+    return call
+
+
+def _request(path):
+    return report_processor.ProcessReportRequest(userId='u1', filePath=str(path), originalName=None)
+
+
+def test_identical_documents_skip_the_pipeline(tmp_path, monkeypatch):
+    original = tmp_path / 'report.txt'
+    original.write_text(REPORT)
+    reupload = tmp_path / 'report-copy.txt'
+    reupload.write_text(REPORT)
+    calls = []
+    monkeypatch.setattr(report_processor, 'call_gemini', _llm(calls))
+    monkeypatch.setattr(report_processor, 'get_report_result_cache',
+                        lambda cache=ReportResultCache(str(tmp_path / 'results.sqlite3')): cache)
+
+    first = report_processor.run_report_pipeline(_request(original))
+    second = report_processor.run_report_pipeline(_request(reupload))
+    assert len(calls) == 1
+    assert second['metadata'].pop('cached') is True
+    assert second == first
+
+    # A prompt template change invalidates the entry
+    monkeypatch.setattr(prompt_builder, 'SYSTEM_MESSAGE', prompt_builder.SYSTEM_MESSAGE + ' Be brief.')
+    report_processor.run_report_pipeline(_request(original))
+    assert len(calls) == 2
+
+
+def test_fallback_llm_output_is_not_cached(tmp_path, monkeypatch):
+    path = tmp_path / 'report.txt'
+    path.write_text(REPORT)
+    calls = []
+    monkeypatch.setattr(report_processor, 'call_gemini', _llm(calls, used_api=False))
+    cache = ReportResultCache(str(tmp_path / 'results.sqlite3'))
+    monkeypatch.setattr(report_processor, 'get_report_result_cache', lambda: cache)
+
+    report_processor.run_report_pipeline(_request(path))
+    report_processor.run_report_pipeline(_request(path))
+    assert len(calls) == 2
+
+
+def test_cache_is_bounded_lru(tmp_path, monkeypatch):
+    cache = ReportResultCache(str(tmp_path / 'results.sqlite3'), max_entries=2)
+    for key in ('a', 'b'):
+        cache.put(key, {'summary': key})
+    assert cache.get('a') == {'summary': 'a'}  # a is now the most recently used
+    cache.put('c', {'summary': 'c'})
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+    path = tmp_path / 'r.txt'
+    path.write_text(REPORT)
+    key = report_result_key(str(path))
+    monkeypatch.setenv('GEMINI_MODEL', 'models/another-model')
+    assert report_result_key(str(path)) != key
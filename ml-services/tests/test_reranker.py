@@ -0,0 +1,18 @@
+from app.services.reranker import rerank_candidates, FactMatcher
+
+
+def test_rerank_boosts_name_and_value_mentions():
+    candidates = [
+        {'id': 'a', 'snippet': 'Narrative text only', 'score': 0.3},
+        {'id': 'b', 'snippet': 'LDL: 140 mg/dL', 'score': 0.1},
+    ]
+    reranked = rerank_candidates(candidates, {'ldl': 140, 'patient_name': 'JANE'})
+    assert [c['id'] for c in reranked] == ['b', 'a']
+    assert abs(reranked[0]['score'] - (0.1 + 0.15 + 0.25)) < 1e-9
+
+
+def test_boost_weights_are_configurable_and_shared_values_count_per_fact():
+    matcher = FactMatcher({'ldl': 140, 'total_cholesterol': 140}, name_boost=0.0, value_boost=1.0)
+    # 140 is the value of both facts; '1400' contains it as a substring
+    assert matcher.boost('Total: 1400') == 2.0
+    assert matcher.boost('nothing here') == 0.0
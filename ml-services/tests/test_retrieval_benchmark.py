@@ -0,0 +1,26 @@
+import json
+from app.services import retrieval_benchmark
+
+
+def test_synthetic_report_queries_have_relevant_chunks():
+    reports = retrieval_benchmark.generate_synthetic_reports(n=2, seed=1)
+    queries = retrieval_benchmark.build_report_queries(reports)
+    assert queries
+    for q in queries:
+        chunk_ids = {c['id'] for c in q['chunks']}
+        assert set(q['relevant_ids']) <= chunk_ids
+
+
+def test_run_benchmark_reports_quality_and_latency(tmp_path):
+    configs = [{'name': 'flat', 'index_type': 'flat', 'emb_weight': 0.65, 'rerank': True}]
+    run = retrieval_benchmark.run_benchmark(configs=configs, n_reports=2, k=5)
+    assert run['results']
+    for res in run['results']:
+        assert 0.0 <= res['recall@5'] <= 1.0
+        assert 0.0 <= res['ndcg@5'] <= 1.0
+        assert res['p50_ms'] <= res['p95_ms'] <= res['p99_ms']
+
+    trend = tmp_path / 'trend.json'
+    retrieval_benchmark.append_trend(run, str(trend))
+    retrieval_benchmark.append_trend(run, str(trend))
+    assert len(json.loads(trend.read_text())) == 2
@@ -0,0 +1,73 @@
+from app.services import faiss_service
+from app.services.faiss_service import FaissStore
+from app.services.retrieval_cache import RetrievalCache, cached_search, normalize_query
+
+
+class _FakeStore:
+    namespace = 'default'
+
+    def __init__(self):
+        self.version = 0
+        self.searches = 0
+
+    def search(self, vector, k=5):
+        self.searches += 1
+        return [{'id': 'doc1', 'content': 'cholesterol basics', 'metadata': {}, 'score': 0.1}]
+
+
+def _embed(text):
+    return [0.0, 1.0]
+
+
+def test_repeated_queries_are_served_from_cache():
+    cache = RetrievalCache()
+    store = _FakeStore()
+    first = cached_search(store, 'What does my cholesterol mean?', 4, _embed, cache)
+    second = cached_search(store, '  what does my   cholesterol mean ', 4, _embed, cache)
+    assert first == second
+    assert store.searches == 1
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_store_mutation_invalidates_namespace():
+    cache = RetrievalCache()
+    store = _FakeStore()
+    cached_search(store, 'platform features', 4, _embed, cache)
+    # FaissStore bumps its version and notifies listeners on every add
+    store.version += 1
+    cache.invalidate(store.namespace)
+    assert cache.stats()['entries'] == 0
+    cached_search(store, 'platform features', 4, _embed, cache)
+    assert store.searches == 2
+
+
+def test_real_store_add_invalidates_cached_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_service, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(faiss_service, 'INDEX_PATH', str(tmp_path / 'faiss.index'))
+    monkeypatch.setattr(faiss_service, 'DOCS_PATH', str(tmp_path / 'docs.json'))
+    cache = RetrievalCache()
+    store = FaissStore()
+    store.on_change(cache.invalidate)
+    store.add('doc1', 'cholesterol basics', {}, [1.0, 0.0])
+
+    first = cached_search(store, 'cholesterol', 4, _embed, cache)
+    assert [r['id'] for r in first] == ['doc1']
+    assert cached_search(store, 'cholesterol', 4, _embed, cache) == first
+    assert cache.stats()['hits'] == 1
+
+    store.add('doc2', 'ldl targets', {}, [0.0, 1.0])
+    assert cache.stats()['entries'] == 0
+    # The next search reaches the index and sees the new document, closest to the query
+    assert [r['id'] for r in cached_search(store, 'cholesterol', 4, _embed, cache)] == ['doc2', 'doc1']
+    assert cache.stats()['misses'] == 2
+
+
+def test_ttl_expiry():
+    cache = RetrievalCache(ttl_seconds=0)
+    store = _FakeStore()
+    cached_search(store, 'q', 4, _embed, cache)
+    cached_search(store, 'q', 4, _embed, cache)
+    assert store.searches == 2
+    assert normalize_query('Hello  World?!') == 'hello world'
@@ -0,0 +1,33 @@
+import numpy as np
+from app.services import scorer
+
+
+def test_ndcg_uses_ideal_ranking_of_relevant_ids():
+    assert scorer.ndcg_at_k(['a', 'b'], ['a'], k=5) == 1.0
+    assert 0.0 < scorer.ndcg_at_k(['x', 'a'], ['a'], k=5) < 1.0
+    assert scorer.ndcg_at_k(['x', 'y'], ['a'], k=5) == 0.0
+
+
+def test_batch_metrics_match_single_query_functions():
+    retrieved_lists = [['a', 'b', 'c'], ['x', 'a'], [], ['c', 'c', 'd', 'e']]
+    relevant_lists = [['b', 'c'], ['a'], ['a'], ['c', 'e']]
+    retrieved, relevant = scorer.encode_id_matrices(retrieved_lists, relevant_lists)
+    assert retrieved.shape == (4, 4)
+    assert (retrieved[2] == scorer.PAD_ID).all()
+
+    k = 3
+    metrics = scorer.batch_metrics(retrieved, relevant, k)
+    for i, (r, g) in enumerate(zip(retrieved_lists, relevant_lists)):
+        assert np.isclose(metrics['hit_rate'][i], scorer.hit_rate(r, g))
+        assert np.isclose(metrics['recall'][i], scorer.recall_at_k(r, g, k))
+        assert np.isclose(metrics['ndcg'][i], scorer.ndcg_at_k(r, g, k))
+        assert np.isclose(metrics['mrr'][i], scorer.mrr(r, g, k))
+
+    assert metrics['mrr'].tolist() == [0.5, 0.5, 0.0, 1.0]
+    assert metrics['recall'][3] == 0.5
+
+
+def test_queries_without_relevant_ids_score_zero():
+    retrieved, relevant = scorer.encode_id_matrices([['a']], [[]])
+    metrics = scorer.batch_metrics(retrieved, relevant, 5)
+    assert all(v[0] == 0.0 for v in metrics.values())